@@ -1,47 +1,37 @@
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, APIRouter
+from fastapi import FastAPI, HTTPException, APIRouter, Depends
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
-import mysql.connector
-from mysql.connector import Error
-from datetime import datetime
 
-from fastapi import BackgroundTasks
 from app.leads.lead_state_service import get_or_create_lead_state
 
 from app.leads.lead_state_service import (
     should_start_lead_flow,
     next_lead_question,
+    record_user_message,
 )
 
 from app.leads.lead_extractor import process_lead_input
-from app.integrations.google_sheets import append_lead_to_sheet
+from app.integrations.sheets_outbox import start_sheets_exporter, stop_sheets_exporter
+from app.services.intent_prediction import (
+    predict_intents, schedule_intent_export, set_intent_predictor, start_intent_worker, stop_intent_worker
+)
+from app.storage.factory import get_storage
+from app.api.chats import MAX_PAGE_SIZE, serialize_chat
+from app.core.logger import logger
+from app.core.security import require_admin_key
 
 def fetch_lead_by_session(session_id: str):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    cursor.execute(
-        "SELECT * FROM leads WHERE session_id = %s",
-        (session_id,)
-    )
-    lead = cursor.fetchone()
-
-    cursor.close()
-    conn.close()
-    return lead
+    return get_storage().get_lead(session_id)
 
 # Load environment variables (OPENAI_API_KEY)
 load_dotenv()
 
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-DB_HOSTNAME = os.getenv("DB_HOSTNAME")
-DB_USERNAME = os.getenv("DB_USERNAME")
-DB_DATABASENAME = os.getenv("DB_DATABASENAME")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
 
 
 # ---- Install required packages ----
@@ -72,21 +62,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ---------------------------------------------------
-# DATABASE CONNECTION
-# ---------------------------------------------------
-def get_db_connection():
-    try:
-        connection = mysql.connector.connect(
-            host=DB_HOSTNAME,  # Update with your MySQL host
-            user=DB_USERNAME,       # Update with your MySQL username
-            password=DB_PASSWORD,  # Update with your MySQL password
-            database=DB_DATABASENAME  # Update with your database name
-        )
-        return connection
-    except Error as e:
-        raise RuntimeError(f"Error connecting to MySQL: {e}")
-
 # ---------------------------------------------------
 # REQUEST / RESPONSE MODELS
 # ---------------------------------------------------
@@ -101,37 +76,17 @@ class ChatResponse(BaseModel):
 # SAVE CHAT FUNCTION
 # ---------------------------------------------------
 def save_chat(session_id: str, message: str, sender: str):
-    connection = get_db_connection()
-    try:
-        cursor = connection.cursor()
-        query = """
-        INSERT INTO chats (session_id, message, sender, timestamp)
-        VALUES (%s, %s, %s, %s)
-        """
-        cursor.execute(query, (session_id, message, sender, datetime.now()))
-        connection.commit()
-    finally:
-        cursor.close()
-        connection.close()
+    storage = get_storage()
+    with storage.transaction():
+        storage.save_chat_message(session_id, message, sender)
+        if sender == "user":
+            record_user_message(session_id, message)
 
 # ---------------------------------------------------
 # RETRIEVE CHATS FUNCTION
 # ---------------------------------------------------
 def retrieve_chats(session_id: str, k: int):
-    connection = get_db_connection()
-    try:
-        cursor = connection.cursor(dictionary=True)
-        query = """
-        SELECT message, sender FROM chats
-        WHERE session_id = %s
-        ORDER BY timestamp DESC
-        LIMIT %s
-        """
-        cursor.execute(query, (session_id, k))
-        return cursor.fetchall()
-    finally:
-        cursor.close()
-        connection.close()
+    return get_storage().retrieve_chats(session_id, k)
 
 # ---------------------------------------------------
 # 1. LOAD ALL DOCUMENTS FROM PDF FOLDER
@@ -285,6 +240,30 @@ llm = AzureChatOpenAI(
     api_version="2024-12-01-preview",
 )
 
+
+def predict_intents_with_llm(transcripts):
+    # One batched call; the client runs the requests concurrently.
+    prompts = [intent_prompt.invoke({"user_chats": transcript}) for transcript in transcripts]
+    responses = llm.batch(prompts, config={"max_concurrency": len(prompts)})
+    return [response.content for response in responses]
+
+
+set_intent_predictor(predict_intents_with_llm)
+
+
+@app.on_event("startup")
+def start_background_workers():
+    start_sheets_exporter()
+    # Re-queue completed leads still waiting on intent from a previous run.
+    start_intent_worker()
+
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    # Drain first so released rows are still seen by a running exporter.
+    stop_intent_worker()
+    stop_sheets_exporter()
+
 # ---------------------------------------------------
 # CHAT ENDPOINT
 # ---------------------------------------------------
@@ -332,11 +311,12 @@ llm = AzureChatOpenAI(
 # ---------------------------------------------------
 # RETRIEVE CHATS ENDPOINT
 # ---------------------------------------------------
-@app.get("/chats/{session_id}")
-def get_chats(session_id: str, k: int = 10):
+@app.get("/chats/{session_id}", dependencies=[Depends(require_admin_key)])
+def get_chats(session_id: str, k: int = 10, before_id: Optional[int] = None):
     try:
-        chats = retrieve_chats(session_id, k)
-        return {"chats": chats}
+        # Bounded keyset page; older messages via before_id
+        chats = get_storage().page_chats(session_id, before_id, max(1, min(k, MAX_PAGE_SIZE)))
+        return {"chats": [serialize_chat(chat) for chat in chats]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -346,23 +326,13 @@ def get_chats(session_id: str, k: int = 10):
 @app.get("/predict_intent/{session_id}")
 def predict_intent_api(session_id: str):
     try:
-        # Retrieve user chats (only user messages)
-        user_chats = retrieve_chats(session_id, k=50)
-        user_only_chats = [chat['message'] for chat in user_chats if chat['sender'] == 'user']
-        user_chat_context = "\n".join(user_only_chats)
-
-        # Build the final prompt
-        final_prompt = intent_prompt.invoke({
-            "user_chats": user_chat_context
-        })
-
-        response = llm.invoke(final_prompt)
-        return {"intent_summary": response.content}
+        # Cached per session until the user sends another message
+        return {"intent_summary": predict_intents([session_id])[session_id]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest, background_tasks: BackgroundTasks):
+def chat(request: ChatRequest):
     user_question = request.message.strip()
 
     if not user_question:
@@ -375,24 +345,18 @@ def chat(request: ChatRequest, background_tasks: BackgroundTasks):
     # --------------------------------------
     lead_result = process_lead_input(
         request.session_id,
-        user_question
+        user_question,
+        export=False
+    )
+    logger.debug(
+        "[LEAD] Result: handled={}, lead_completed={}",
+        lead_result["handled"], lead_result["lead_completed"]
     )
-    print(lead_result)
 
     if lead_result["handled"]:
         if lead_result["lead_completed"]:
-            lead = fetch_lead_by_session(request.session_id)
-            print(lead)
-            try:
-                intent_response = predict_intent_api(request.session_id)
-                lead["intent_summary"] = intent_response["intent_summary"]
-            except Exception:
-                lead["intent_summary"] = None
-
-            background_tasks.add_task(
-                append_lead_to_sheet,
-                lead
-            )
+            # Intent prediction + Sheets export run on the background worker.
+            schedule_intent_export(request.session_id)
 
         return ChatResponse(answer=lead_result["message"])
 
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Query
+
+from app.services.analytics import MAX_DAYS, build_analytics
+
+router = APIRouter()
+
+
+@router.get("/analytics")
+def get_analytics(days: int = Query(30, ge=1, le=MAX_DAYS)):
+    """
+    Leads per day, trigger mix, funnel drop-off and top topics.
+    Reads only the analytics_daily rollups.
+    """
+    return {"status": "success", "data": build_analytics(days)}
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.responses import DefaultJSONResponse
+from app.core.security import require_admin_key
+from app.storage.factory import get_storage
+
+# Full chat histories (names, emails, phones): admin key only.
+router = APIRouter(dependencies=[Depends(require_admin_key)])
+
+MAX_PAGE_SIZE = 100
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ["id", "session_id", "sender", "message", "timestamp"]
+
+
+def serialize_chat(chat: dict) -> dict:
+    timestamp = chat.get("timestamp")
+    return {**chat, "timestamp": timestamp.isoformat() if timestamp else None}
+
+
+# ----------------------------------------
+# PAGINATED HISTORY
+# ----------------------------------------
+@router.get("/chats/{session_id}")
+def get_chat_history(
+    session_id: str,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    before_id: Optional[int] = Query(None, ge=1),
+):
+    """
+    Keyset-paginated chat history, newest first.
+    Pass `next_before_id` from the previous page to fetch older messages.
+    """
+    chats = get_storage().page_chats(session_id, before_id, limit)
+    next_before_id = chats[-1]["id"] if len(chats) == limit else None
+    # Rows are already JSON-native; skip jsonable_encoder's per-field walk.
+    return DefaultJSONResponse({
+        "chats": [serialize_chat(chat) for chat in chats],
+        "next_before_id": next_before_id,
+    })
+
+
+# ----------------------------------------
+# STREAMING EXPORT
+# ----------------------------------------
+def ndjson_rows(chats):
+    for chat in chats:
+        yield json.dumps(serialize_chat(chat), ensure_ascii=False) + "\n"
+
+
+def csv_rows(chats):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(EXPORT_COLUMNS)
+    for chat in chats:
+        row = serialize_chat(chat)
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+@router.get("/export/chats")
+def export_chats(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    sender: Optional[str] = None,
+    session_id: Optional[str] = None,
+):
+    """
+    Stream chats as NDJSON or CSV, row by row.
+    Filters: [start, end) on timestamp, sender, session_id.
+    """
+    storage = get_storage()
+    if (start or end) and not storage.has_chat_timestamps():
+        raise HTTPException(status_code=400, detail="Date filters need a chats.timestamp column")
+
+    chats = storage.iter_chats(
+        start=start,
+        end=end,
+        sender=sender,
+        session_id=session_id,
+        batch_size=EXPORT_BATCH_SIZE,
+    )
+
+    if format == "csv":
+        return StreamingResponse(
+            csv_rows(chats),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="chats.csv"'},
+        )
+    return StreamingResponse(ndjson_rows(chats), media_type="application/x-ndjson")
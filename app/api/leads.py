@@ -1,8 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
 from typing import Optional
 
 from app.leads.lead_extractor import process_lead_input, get_lead_by_session_id
+from app.leads.lead_import import DEFAULT_BATCH_SIZE, import_leads
+from app.core.responses import DefaultJSONResponse
+from app.core.security import require_admin_key
 
 router = APIRouter()
 
@@ -37,6 +40,32 @@ async def get_lead(session_id: str):
     lead = get_lead_by_session_id(session_id)
     
     if not lead:
-        return {"status": "not_found", "data": None}
+        return DefaultJSONResponse({"status": "not_found", "data": None})
     
-    return {"status": "success", "data": lead}
+    # Plain strings once created_at is formatted; rendering the response
+    # directly skips jsonable_encoder's per-field walk.
+    created_at = lead.get("created_at")
+    lead = {**lead, "created_at": created_at.isoformat() if created_at else None}
+    return DefaultJSONResponse({"status": "success", "data": lead})
+
+@router.post("/leads/import", dependencies=[Depends(require_admin_key)])
+async def bulk_import_leads(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=1000),
+):
+    """
+    Bulk-load leads from a CSV (header row) or NDJSON body.
+    Columns: name, email, phone, optional session_id and intent_summary.
+    Returns counts and a per-row error report.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+
+    try:
+        report = await import_leads(request.stream(), format, batch_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"status": "success", **report}
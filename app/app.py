@@ -1,22 +1,39 @@
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import pymysql
+from typing import Optional
 
 # Load environment variables
 load_dotenv()
 
 # Import your routers
-from app.api import leads
-from app.leads.lead_extractor import process_lead_input
-from app.leads.lead_state_service import should_start_lead_flow, detect_lead_signal, detect_opportunistic_contact, update_lead_state, get_or_create_lead_state, count_user_messages, store_intent_summary
+from app.api import leads, chats, analytics
+from app.leads.lead_extractor import process_lead_input, load_lead_record
+from app.leads.lead_state_service import should_start_lead_flow, detect_lead_signal, detect_opportunistic_contact, update_lead_state, get_or_create_lead_state, count_user_messages, store_intent_summary, record_user_message
 from app.core.config import get_settings
+from app.core.logger import RequestContextMiddleware, logger
+from app.core.responses import CompressionMiddleware, DefaultJSONResponse
+from app.core.metrics import CONTENT_TYPE, FALLBACK_HITS, LLM_SHED, record_llm_usage, render_metrics, stage
+from app.core.tracing import TracingMiddleware, configure_tracing, shutdown_tracing, span
+from app.storage.factory import get_storage
+from app.utils.keyword_matcher import KeywordMatcher
+from app.services.retention import start_retention_worker, stop_retention_worker
+from app.integrations.sheets_outbox import start_sheets_exporter, stop_sheets_exporter
+from app.leads.lead_index import start_lead_index, stop_lead_index
+from app.services.admission import (
+    RateLimited, acquire_llm_slot, check_rate_limits, release_llm_slot, retry_after_header
+)
+from app.services.conversation_memory import build_prompt_memory, schedule_fold, set_summarizer
+from app.services.widget_assets import IMMUTABLE_CACHE_CONTROL, get_widget_asset
+
+# FastAPI App Setup (orjson-rendered JSON when orjson is installed)
+app = FastAPI(title="AI Chatbot Backend", default_response_class=DefaultJSONResponse)
 
-# FastAPI App Setup
-app = FastAPI(title="AI Chatbot Backend")
+# gzip/brotli for larger responses; innermost, so traces include its cost
+app.add_middleware(CompressionMiddleware)
 
 # CORS Middleware
 app.add_middleware(
@@ -27,72 +44,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request trace spans; added first so it runs inside the request-id middleware
+app.add_middleware(TracingMiddleware)
+
+# Request ids + per-request debug sampling for logs
+app.add_middleware(RequestContextMiddleware)
+
 # Include routers
 app.include_router(leads.router, prefix="/api", tags=["Leads"])
+app.include_router(chats.router, prefix="/api", tags=["Chats"])
+app.include_router(analytics.router, prefix="/api", tags=["Analytics"])
+
+@app.on_event("startup")
+def run_startup_migrations():
+    configure_tracing()
+    # Detect schema once and create indexes for hot queries.
+    try:
+        storage = get_storage()
+        schema = storage.migrate()
+        logger.info("Schema checked ({}): {}", storage.name, schema)
+    except Exception as e:
+        logger.warning("Schema migration skipped: {}", e)
+    start_retention_worker()
+    start_sheets_exporter()
+    start_lead_index()
+    # Minify, compress and hash the widget before the first page view asks for it.
+    get_widget_asset()
+
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    stop_retention_worker()
+    stop_sheets_exporter()
+    stop_lead_index()
+    shutdown_tracing()
+
 
 @app.get("/")
 def root():
     return {"message": "Welcome to AI Chatbot Backend!", "status": "running"}
 
 
-def get_db_connection():
-    settings = get_settings()
-    return pymysql.connect(
-        host=settings.db_host,
-        user=settings.db_user,
-        password=settings.db_password,
-        database=settings.db_name
-    )
-
-
 def save_chat_message(session_id: str, message: str, sender: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        try:
-            cursor.execute(
-                """
-                INSERT INTO chats (session_id, message, sender, timestamp)
-                VALUES (%s, %s, %s, NOW())
-                """,
-                (session_id, message, sender)
-            )
-        except pymysql.err.OperationalError as e:
-            # Support schemas where chats table does not have a timestamp column.
-            if e.args and e.args[0] == 1054:
-                cursor.execute(
-                    """
-                    INSERT INTO chats (session_id, message, sender)
-                    VALUES (%s, %s, %s)
-                    """,
-                    (session_id, message, sender)
-                )
-            else:
-                raise
-        conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
+    storage = get_storage()
+    # The aggregate bump commits (or rolls back) with the message itself.
+    with storage.transaction():
+        storage.save_chat_message(session_id, message, sender)
+        if sender == "user":
+            record_user_message(session_id, message)
 
 
 def retrieve_chats(session_id: str, limit: int = 20):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            """
-            SELECT message, sender FROM chats
-            WHERE session_id = %s
-            ORDER BY id DESC
-            LIMIT %s
-            """,
-            (session_id, limit)
-        )
-        rows = cursor.fetchall()
-        return [{"message": row[0], "sender": row[1]} for row in rows]
-    finally:
-        cursor.close()
-        conn.close()
+    return get_storage().retrieve_chats(session_id, limit)
+
+
+# Canned replies when the LLM is unavailable; earlier keys win on ties.
+FALLBACK_RESPONSES = {
+    "hi": "Hello! How can I help you today? Feel free to ask me questions or let us know if you'd like to get in touch.",
+    "hello": "Hi there! What can I help you with?",
+    "help": "I'm here to answer your questions! You can also ask about our services, pricing, or contact us if interested.",
+    "thanks": "You're welcome! Is there anything else I can help with?",
+    "thank you": "My pleasure! Let me know if you need anything else.",
+}
+FALLBACK_MATCHER = KeywordMatcher(FALLBACK_RESPONSES)
 
 
 def append_name_request(answer: str) -> str:
@@ -123,46 +137,31 @@ vector_store = None
 retriever = None
 llm = None
 embeddings_setup = False
+RETRIEVER_K = 4
 
 if AZURE_OPENAI_ENDPOINT and OPENAI_API_KEY:
     try:
-        from langchain_community.document_loaders import PyPDFLoader
-        from langchain_text_splitters import RecursiveCharacterTextSplitter
-        from langchain_community.vectorstores import FAISS
         from langchain_core.prompts import PromptTemplate
-        from langchain_openai import AzureOpenAIEmbeddings, AzureChatOpenAI
-
-        # Load PDFs if available
-        folder_path = "pdfs"
-        docs = []
-        if os.path.exists(folder_path) and os.listdir(folder_path):
-            for file in os.listdir(folder_path):
-                if file.lower().endswith(".pdf"):
-                    try:
-                        pdf_path = os.path.join(folder_path, file)
-                        loader = PyPDFLoader(pdf_path)
-                        docs.extend(loader.load())
-                        print(f"✓ Loaded PDF: {file}")
-                    except Exception as e:
-                        print(f"✗ Error loading {file}: {e}")
-
-        if docs:
-            print(f"✓ Found {len(docs)} document pages")
-            
-            splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            chunks = splitter.split_documents(docs)
-
-            embeddings = AzureOpenAIEmbeddings(
-                azure_endpoint=AZURE_OPENAI_ENDPOINT,
-                api_key=OPENAI_API_KEY,
-                deployment="text-embedding-3-small",
-                api_version="2024-12-01-preview"
-            )
-
-            vector_store = FAISS.from_documents(chunks, embeddings)
-            retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": 4})
+        from langchain_openai import AzureChatOpenAI
+        from app.services.knowledge_index import azure_embeddings, load_pdf_chunks, open_knowledge_index
+
+        settings = get_settings()
+        folder_path = settings.knowledge_pdf_dir
+        embeddings = azure_embeddings()
+
+        if settings.knowledge_index_enabled:
+            # Built once per node, then mapped read-only by every worker.
+            vector_store = open_knowledge_index(folder_path, embeddings)
+        else:
+            chunks = load_pdf_chunks(folder_path)
+            if chunks:
+                from langchain_community.vectorstores import FAISS
+                vector_store = FAISS.from_documents(chunks, embeddings)
+
+        if vector_store is not None:
+            retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": RETRIEVER_K})
             embeddings_setup = True
-            print("✓ Vector store ready")
+            logger.info("Vector store ready")
 
         llm = AzureChatOpenAI(
             azure_endpoint=AZURE_OPENAI_ENDPOINT,
@@ -171,13 +170,47 @@ if AZURE_OPENAI_ENDPOINT and OPENAI_API_KEY:
             api_version="2024-12-01-preview",
         )
         
+        memory_prompt = PromptTemplate(
+            template="""
+Update the running summary of a conversation between a user and a company assistant.
+Keep facts the user shared, their needs, questions already answered and open questions.
+Be concise and do not invent details.
+
+Current Summary:
+{summary}
+
+New Messages:
+{messages}
+
+Updated Summary:
+""",
+            input_variables=["summary", "messages"]
+        )
+
+        def summarize_with_llm(previous_summary, messages):
+            lines = "\n".join(f"{msg['sender']}: {msg['message']}" for msg in messages)
+            response = llm.invoke(memory_prompt.invoke({
+                "summary": previous_summary or "(empty)",
+                "messages": lines
+            }))
+            return str(response.content).strip()
+
+        set_summarizer(summarize_with_llm)
+
     except Exception as e:
-        print(f"⚠️  Error setting up Azure: {e}")
+        logger.warning("Error setting up Azure: {}", e)
         llm = None
 
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest):
+@stage("turn")
+def chat(request: ChatRequest, x_public_key: Optional[str] = Header(None)):
+    # ChatResponse is validated when it is built; rendering it directly
+    # skips response_model re-validation and jsonable_encoder.
+    return DefaultJSONResponse(answer_chat(request, x_public_key).model_dump())
+
+
+def answer_chat(request: ChatRequest, x_public_key: Optional[str]) -> ChatResponse:
     """
     Integrated chat endpoint that handles:
     1. Lead capture (email, phone, names, lead signals)
@@ -190,13 +223,29 @@ def chat(request: ChatRequest):
     if not user_message:
         raise HTTPException(status_code=400, detail="Empty message")
 
-    print(f"\n[CHAT] Session: {session_id}, Message length: {len(user_message)}")
+    logger.debug("[CHAT] Session: {}, message length: {}", session_id, len(user_message))
+
+    try:
+        check_rate_limits(session_id, x_public_key)
+    except RateLimited as e:
+        logger.warning("[CHAT] Rate limited ({}) for session {}", e.scope, session_id)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": retry_after_header(e)},
+        )
 
+    # A turn runs up to four transactions: the user message (with its
+    # aggregates), the lead stage, and on the LLM path the prompt-memory read
+    # and the AI message. The user message commits first so a lead pipeline
+    # failure cannot lose it; memory and the AI message stay apart so no
+    # connection (or SQLite write lock) is held across the LLM call.
     # Persist user messages so proactive lead rules can use message count.
     try:
-        save_chat_message(session_id, user_message, "user")
+        with span("persist", sender="user"):
+            save_chat_message(session_id, user_message, "user")
     except Exception as e:
-        print(f"[CHAT] Could not persist user message: {e}")
+        logger.warning("[CHAT] Could not persist user message: {}", e)
 
     # ===================================
     # 0. CHECK FOR STRONG LEAD SIGNALS FIRST
@@ -204,87 +253,107 @@ def chat(request: ChatRequest):
     # Even if in COMPLETED state, strong signals should restart lead flow
     
     append_name_at_end = False
+    lead_record = None
 
     try:
-        has_opportunistic = detect_opportunistic_contact(user_message)
-        has_keyword_signal = detect_lead_signal(user_message)
-        has_strong_signal = has_opportunistic or has_keyword_signal
+        # One transaction for the whole lead stage; process_lead_input joins it.
+        with stage("lead"), get_storage().transaction():
+            with span("lead_signal"):
+                has_opportunistic = detect_opportunistic_contact(user_message)
+                has_keyword_signal = detect_lead_signal(user_message)
+            has_strong_signal = has_opportunistic or has_keyword_signal
         
-        print(f"[LEAD] Strong signal check: opportunistic={has_opportunistic}, keyword={has_keyword_signal}, combined={has_strong_signal}")
+            logger.debug(
+                "[LEAD] Strong signal check: opportunistic={}, keyword={}, combined={}",
+                has_opportunistic, has_keyword_signal, has_strong_signal
+            )
         
-        current_state = get_or_create_lead_state(session_id)
-        print(f"[LEAD] Current state: {current_state}")
+            # Single read of lead state + lead row for the whole turn
+            with span("lead_state"):
+                lead_record = load_lead_record(session_id)
+            current_state = lead_record.state
+            logger.debug("[LEAD] Current state: {}", current_state)
         
-        # If lead is already completed, don't restart the flow
-        if current_state == "COMPLETED":
-            print(f"[LEAD] Lead already completed - skipping lead flow")
-            # Fall through directly to Azure/PDF chat
-
-        # ===================================
-        # 1. CHECK LEAD STATE
-        # ===================================
-        proactive_triggered_this_turn = False
+            # If lead is already completed, don't restart the flow
+            if current_state == "COMPLETED":
+                logger.debug("[LEAD] Lead already completed - skipping lead flow")
+                # Fall through directly to Azure/PDF chat
+
+            # ===================================
+            # 1. CHECK LEAD STATE
+            # ===================================
+            proactive_triggered_this_turn = False
         
-        # Check if we should start lead flow (only if currently NONE)
-        if current_state == "NONE":
-            user_turns = count_user_messages(session_id)
-            proactive_candidate = (not has_strong_signal) and (user_turns >= 4)
-
-            if proactive_candidate:
-                print(f"[LEAD] Proactive threshold reached at {user_turns} user messages")
-                update_lead_state(session_id, "ASKED_NAME")
-                store_intent_summary(session_id, "User showed sustained interest after multiple messages")
-                current_state = "ASKED_NAME"
-                proactive_triggered_this_turn = True
-                append_name_at_end = True
-                print("[LEAD] Proactive trigger: answer question first, append name request")
-            else:
-                should_start = should_start_lead_flow(session_id, user_message)
-                print(f"[LEAD] Should start lead flow: {should_start}")
-                if should_start:
-                    # State was updated by should_start_lead_flow
-                    current_state = get_or_create_lead_state(session_id)
-                    print(f"[LEAD] State updated to: {current_state}")
+            # Check if we should start lead flow (only if currently NONE)
+            if current_state == "NONE":
+                user_turns = count_user_messages(session_id)
+                proactive_candidate = (not has_strong_signal) and (user_turns >= 4)
+
+                if proactive_candidate:
+                    logger.info("[LEAD] Proactive threshold reached at {} user messages", user_turns)
+                    update_lead_state(session_id, "ASKED_NAME", trigger="proactive")
+                    store_intent_summary(session_id, "User showed sustained interest after multiple messages")
+                    current_state = lead_record.state = "ASKED_NAME"
+                    proactive_triggered_this_turn = True
+                    append_name_at_end = True
+                    logger.debug("[LEAD] Proactive trigger: answer question first, append name request")
+                else:
+                    should_start = should_start_lead_flow(session_id, user_message, current_state)
+                    logger.debug("[LEAD] Should start lead flow: {}", should_start)
+                    if should_start:
+                        # State was moved NONE -> ASKED_NAME by should_start_lead_flow
+                        current_state = lead_record.state = "ASKED_NAME"
+                        logger.debug("[LEAD] State updated to: {}", current_state)
         
-        # ===================================
-        # 2. PROCESS LEAD FLOW IF ACTIVE
-        # ===================================
-        if current_state != "NONE" and not proactive_triggered_this_turn:
-            print(f"[LEAD] Processing lead input in state: {current_state}")
-            # We're in lead flow, process the input
-            result = process_lead_input(session_id, user_message)
-            print(f"[LEAD] Result: handled={result['handled']}, lead_completed={result.get('lead_completed', False)}, message={result['message'][:50] if result['message'] else None}")
-            if result["handled"]:
-                return ChatResponse(
-                    answer=result["message"],
-                    lead_completed=result.get("lead_completed", False),
-                    is_lead_flow=True
+            # ===================================
+            # 2. PROCESS LEAD FLOW IF ACTIVE
+            # ===================================
+            if current_state != "NONE" and not proactive_triggered_this_turn:
+                logger.debug("[LEAD] Processing lead input in state: {}", current_state)
+                # We're in lead flow, process the input
+                result = process_lead_input(session_id, user_message, lead_record)
+                logger.debug(
+                    "[LEAD] Result: handled={}, lead_completed={}",
+                    result["handled"], result.get("lead_completed", False)
                 )
-            print(f"[LEAD] Lead input not handled, falling through to Azure/PDF")
+                if result["handled"]:
+                    return ChatResponse(
+                        answer=result["message"],
+                        lead_completed=result.get("lead_completed", False),
+                        is_lead_flow=True
+                    )
+                logger.debug("[LEAD] Lead input not handled, falling through to Azure/PDF")
     except Exception as e:
         # Keep chatbot available even if lead/DB pipeline is down.
-        print(f"[LEAD] Lead pipeline error. Continuing with chat fallback. Error: {e}")
+        logger.error("[LEAD] Lead pipeline error. Continuing with chat fallback. Error: {}", e)
 
     # ===================================
     # 3. TRY PDF/AZURE CHAT
     # ===================================
-    print(f"[CHAT] Trying Azure/PDF (embeddings_setup={embeddings_setup})")
-    if embeddings_setup and retriever and llm:
+    logger.debug("[CHAT] Trying Azure/PDF (embeddings_setup={})", embeddings_setup)
+    use_llm = bool(embeddings_setup and retriever and llm)
+    if use_llm and not acquire_llm_slot():
+        logger.warning("[CHAT] LLM at capacity; shedding to fallback responses")
+        LLM_SHED.inc()
+        use_llm = False
+    if use_llm:
         try:
-            retrieved_docs = retriever.invoke(user_message)
+            # Same search as `retriever`, split so embedding and FAISS are timed apart.
+            with span("retrieval", k=RETRIEVER_K):
+                with stage("embedding"):
+                    query_vector = embeddings.embed_query(user_message)
+                with stage("faiss"):
+                    retrieved_docs = vector_store.similarity_search_by_vector(query_vector, k=RETRIEVER_K)
             context_text = "\n\n".join(doc.page_content for doc in retrieved_docs)
 
-            # Get previous chat history
-            previous_chats = retrieve_chats(session_id, 20)
-            previous_chat_context = "\n".join(
-                f"{chat['sender']}: {chat['message']}"
-                for chat in reversed(previous_chats)
-            )
+            with span("prompt"):
+                # Running summary of older turns + last few turns verbatim
+                conversation_summary, recent_chat_context = build_prompt_memory(session_id)
 
-            lead_step = get_or_create_lead_state(session_id)
+                lead_step = lead_record.state if lead_record else get_or_create_lead_state(session_id)
 
-            chat_prompt = PromptTemplate(
-                template="""
+                chat_prompt = PromptTemplate(
+                    template="""
 You are a helpful company assistant that answers user questions based on the provided context.
 
 CURRENT_LEAD_STEP: {lead_step}
@@ -297,7 +366,7 @@ Guidelines:
 - If CURRENT_LEAD_STEP is ASK_PHONE:
   Politely ask the user for their phone number.
 - If CURRENT_LEAD_STEP is NONE or COMPLETED:
-  Answer the user's question using the provided context and previous chats.
+  Answer the user's question using the provided context, the conversation summary and recent chats.
 
 Please ask for only one detail at a time and follow the order above.
 Please avoid mentioning lead collection to the user.
@@ -305,68 +374,76 @@ Please avoid mentioning lead collection to the user.
 Context:
 {context}
 
-Previous Chats:
-{previous_20}
+Conversation Summary:
+{conversation_summary}
+
+Recent Chats:
+{recent_chats}
 
 User Question:
 {question}
 """,
-                input_variables=["context", "question", "previous_20", "lead_step"]
-            )
-
-            final_prompt = chat_prompt.invoke({
-                "context": context_text,
-                "question": user_message,
-                "previous_20": previous_chat_context,
-                "lead_step": lead_step
-            })
+                    input_variables=["context", "question", "conversation_summary", "recent_chats", "lead_step"]
+                )
 
-            response = llm.invoke(final_prompt)
+                final_prompt = chat_prompt.invoke({
+                    "context": context_text,
+                    "question": user_message,
+                    "conversation_summary": conversation_summary,
+                    "recent_chats": recent_chat_context,
+                    "lead_step": lead_step
+                })
+
+            with stage("llm") as llm_span:
+                response = llm.invoke(final_prompt)
+                usage = record_llm_usage(response)
+                if llm_span is not None and usage:
+                    llm_span.set(**usage)
             answer_text = str(response.content)
             if append_name_at_end:
                 answer_text = append_name_request(answer_text)
 
-            print(f"[CHAT] Azure response: {answer_text}")
+            logger.debug("[CHAT] Azure response: {} chars", len(answer_text))
             try:
-                save_chat_message(session_id, answer_text, "ai")
+                with span("persist", sender="ai"):
+                    save_chat_message(session_id, answer_text, "ai")
+                    schedule_fold(session_id)
             except Exception as e:
-                print(f"[CHAT] Could not persist AI message: {e}")
+                logger.warning("[CHAT] Could not persist AI message: {}", e)
             return ChatResponse(answer=answer_text, is_lead_flow=False)
         except Exception as e:
-            print(f"[ERROR] Azure error: {e}")
+            logger.error("[CHAT] Azure error: {}", e)
             # Fall through to generic response
+        finally:
+            release_llm_slot()
     
     # ===================================
     # 4. FALLBACK GENERIC RESPONSES
     # ===================================
-    print(f"[CHAT] Using fallback responses")
-    fallback_responses = {
-        "hi": "Hello! How can I help you today? Feel free to ask me questions or let us know if you'd like to get in touch.",
-        "hello": "Hi there! What can I help you with?",
-        "help": "I'm here to answer your questions! You can also ask about our services, pricing, or contact us if interested.",
-        "thanks": "You're welcome! Is there anything else I can help with?",
-        "thank you": "My pleasure! Let me know if you need anything else.",
-    }
-
-    user_lower = user_message.lower()
-    for key, response in fallback_responses.items():
-        if key in user_lower:
-            print(f"[CHAT] Fallback match: {key}")
-            answer_text = append_name_request(response) if append_name_at_end else response
-            try:
+    logger.debug("[CHAT] Using fallback responses")
+    fallback_key = FALLBACK_MATCHER.first(user_message)
+    if fallback_key:
+        logger.debug("[CHAT] Fallback match: {}", fallback_key)
+        FALLBACK_HITS.labels("keyword").inc()
+        response = FALLBACK_RESPONSES[fallback_key]
+        answer_text = append_name_request(response) if append_name_at_end else response
+        try:
+            with span("persist", sender="ai"):
                 save_chat_message(session_id, answer_text, "ai")
-            except Exception as e:
-                print(f"[CHAT] Could not persist AI message: {e}")
-            return ChatResponse(answer=answer_text, is_lead_flow=False)
+        except Exception as e:
+            logger.warning("[CHAT] Could not persist AI message: {}", e)
+        return ChatResponse(answer=answer_text, is_lead_flow=False)
 
     # Default fallback
-    print(f"[CHAT] Default fallback")
+    logger.debug("[CHAT] Default fallback")
+    FALLBACK_HITS.labels("default").inc()
     default_answer = "I'm not sure how to answer that. Could you ask something more specific, or would you like to provide your contact information?"
     answer_text = append_name_request(default_answer) if append_name_at_end else default_answer
     try:
-        save_chat_message(session_id, answer_text, "ai")
+        with span("persist", sender="ai"):
+            save_chat_message(session_id, answer_text, "ai")
     except Exception as e:
-        print(f"[CHAT] Could not persist AI message: {e}")
+        logger.warning("[CHAT] Could not persist AI message: {}", e)
 
     return ChatResponse(
         answer=answer_text,
@@ -382,13 +459,46 @@ def health_check():
     return {"status": "healthy", "service": "AI Chatbot Backend"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus text format: per-stage latency histograms, lead/fallback/cache
+    counters, DB connection gauges and LLM token counts.
+    """
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
 # ---------------------------------------------------
 # SERVE CHATBOT WIDGET JS
 # ---------------------------------------------------
-CHATBOT_JS_PATH = os.path.join(os.path.dirname(__file__), "chatbot.js")
+def widget_response(asset, request: Request, cache_control: str) -> Response:
+    headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    encoding, body = asset.select(request.headers.get("accept-encoding"))
+    headers["ETag"] = asset.etag_for(encoding)
+    if asset.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=asset.media_type, headers=headers)
+
 
 @app.get("/chatbot.js")
-def serve_chatbot_widget():
-    if not os.path.exists(CHATBOT_JS_PATH):
+def serve_chatbot_widget(request: Request):
+    asset = get_widget_asset()
+    if asset is None:
+        raise HTTPException(status_code=404, detail="chatbot.js not found")
+    # Embedded URL: browsers and CDNs revalidate cheaply (304) after max-age.
+    max_age = get_settings().widget_cache_seconds
+    return widget_response(
+        asset, request, f"public, max-age={max_age}, stale-while-revalidate={max_age * 24}"
+    )
+
+
+@app.get("/chatbot.{version}.js")
+def serve_versioned_chatbot_widget(version: str, request: Request):
+    asset = get_widget_asset()
+    if asset is None:
         raise HTTPException(status_code=404, detail="chatbot.js not found")
-    return FileResponse(CHATBOT_JS_PATH, media_type="application/javascript")
+    if version != asset.digest:
+        return RedirectResponse(asset.versioned_path, status_code=302, headers={"Cache-Control": "no-cache"})
+    return widget_response(asset, request, IMMUTABLE_CACHE_CONTROL)
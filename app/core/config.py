@@ -14,25 +14,117 @@ DB_DATABASENAME = os.getenv("DB_DATABASENAME")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 GOOGLE_SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
 GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
+GOOGLE_SHEETS_API_ENDPOINT = os.getenv("GOOGLE_SHEETS_API_ENDPOINT")
 
 class Settings(BaseSettings):
     app_name: str = "AI Chatbot Backend"
     app_env: str = "development"
     
-    # Database
-    db_host: str = DB_HOSTNAME
-    db_user: str = DB_USERNAME
-    db_password: str = DB_PASSWORD
-    db_name: str = DB_DATABASENAME
+    # Database (MySQL only; required when storage_backend is "mysql")
+    db_host: str | None = DB_HOSTNAME
+    db_user: str | None = DB_USERNAME
+    db_password: str | None = DB_PASSWORD
+    db_name: str | None = DB_DATABASENAME
     
+    # Storage backend: "mysql" or "sqlite" (embedded, WAL mode)
+    storage_backend: str = "mysql"
+    sqlite_path: str = "data/chatbot.db"
+
+    # Admin routes (chat history/export, lead import) need this key in the
+    # X-Admin-Key header; unset, they answer 403
+    admin_api_key: str | None = None
+
     # Google Sheets
     google_service_account_file: str | None = GOOGLE_SERVICE_ACCOUNT_FILE
     google_sheet_id: str | None = GOOGLE_SHEET_ID
+    # Fake/local Sheets server for tests and benchmarks; no credentials needed
+    google_sheets_api_endpoint: str | None = GOOGLE_SHEETS_API_ENDPOINT
     
+    # Sheets export outbox (the exporter also needs a sheet id and credentials)
+    sheets_export_enabled: bool = True
+    sheets_export_batch_size: int = 50
+    sheets_export_poll_seconds: float = 5.0
+    sheets_export_lease_seconds: int = 120
+    sheets_export_max_attempts: int = 8
+    sheets_export_backoff_seconds: float = 10.0
+    sheets_export_max_backoff_seconds: float = 3600.0
+
+    # Admission control: per-session / per-public-key token buckets
+    # ("memory" per worker, or "redis" shared; needs the redis package)
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    # After a Redis error, stay on per-worker buckets this long before retrying
+    rate_limit_redis_retry_seconds: float = 30.0
+    rate_limit_session_per_minute: float = 20.0
+    rate_limit_session_burst: int = 10
+    rate_limit_key_per_minute: float = 600.0
+    rate_limit_key_burst: int = 100
+    # Global cap on in-flight LLM calls; waiters past the timeout get fallbacks
+    llm_max_concurrency: int = 8
+    llm_queue_wait_seconds: float = 2.0
+
     # Azure OpenAI
     azure_openai_endpoint: str | None = AZURE_OPENAI_ENDPOINT
     openai_api_key: str | None = OPENAI_API_KEY
 
+    # Background LLM intent prediction for completed leads
+    intent_batch_size: int = 8
+    intent_batch_wait_seconds: float = 0.5
+    intent_drain_seconds: float = 20.0
+
+    # Conversation memory (rolling summary + last few verbatim turns)
+    memory_enabled: bool = True
+    memory_recent_messages: int = 6
+    memory_max_verbatim_messages: int = 20
+    memory_fold_threshold: int = 6
+    memory_summary_max_chars: int = 1500
+
+    # In-memory email/phone -> lead index for merging repeat visitors
+    lead_index_enabled: bool = True
+    lead_index_reconcile_seconds: float = 300.0
+    lead_index_batch_size: int = 1000
+
+    # Extra lead-signal keywords: comma-separated and/or a file with one per line
+    lead_signal_keywords: str = ""
+    lead_signal_keywords_file: str | None = None
+
+    # Logging: level, "text" | "json", and the share of requests whose
+    # DEBUG lines are kept (e.g. 0.01 on busy nodes running at DEBUG)
+    log_level: str = "INFO"
+    log_format: str = "text"
+    log_debug_sample_rate: float = 1.0
+
+    # Request tracing: exporter "none" | "memory" | "file" (JSON lines);
+    # requests slower than slow_request_seconds log their span tree
+    tracing_enabled: bool = True
+    trace_exporter: str = "none"
+    trace_file_path: str = "logs/traces.jsonl"
+    slow_request_seconds: float = 2.0
+    slow_request_log_path: str | None = "logs/slow_requests.log"
+
+    # PDF knowledge base: embedded once into versioned files and memory-mapped
+    # read-only, so every worker on a node shares one copy. Disable to build
+    # an in-memory FAISS index per process instead.
+    knowledge_index_enabled: bool = True
+    knowledge_index_dir: str = "data/knowledge_index"
+    knowledge_pdf_dir: str = "pdfs"
+
+    # gzip / brotli (if installed) for responses of at least this many bytes
+    response_compression_enabled: bool = True
+    response_compression_min_bytes: int = 1024
+
+    # max-age for /chatbot.js; the hashed /chatbot.<hash>.js URL is immutable
+    widget_cache_seconds: int = 3600
+
+    # Session retention
+    retention_enabled: bool = False
+    session_idle_ttl_hours: int = 72
+    retention_archive_dir: str = "archive/chats"
+    retention_batch_size: int = 500
+    retention_max_sessions_per_run: int = 200
+    retention_interval_seconds: int = 3600
+
     model_config = ConfigDict(env_file=".env", extra="ignore")
 
 @lru_cache
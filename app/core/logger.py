@@ -1,8 +1,118 @@
-from loguru import logger
+import random
 import sys
+import uuid
+from contextvars import ContextVar
+
+from loguru import logger
+
+from app.core.config import get_settings
+
+# ----------------------------------------
+# LOGGING
+# ----------------------------------------
+# Sinks use enqueue=True: a log call only puts the record on a queue and a
+# background thread does the write, so disk/terminal I/O stays off the
+# request path. Per-turn detail is logged at DEBUG and sampled per request
+# (LOG_DEBUG_SAMPLE_RATE), so a sampled request keeps its full trace and
+# the rest cost nothing. Every record carries the request id.
+#
+#   LOG_LEVEL=INFO | DEBUG | WARNING ...
+#   LOG_FORMAT=text | json
+#   LOG_DEBUG_SAMPLE_RATE=1.0    (share of requests whose DEBUG lines are kept;
+#                                 e.g. 0.01 on busy nodes running at DEBUG)
+#
+# These are Settings fields (app/core/config.py), so .env works too.
+
+_settings = get_settings()
+LOG_LEVEL = _settings.log_level.upper()
+LOG_FORMAT = _settings.log_format.lower()
+LOG_DEBUG_SAMPLE_RATE = _settings.log_debug_sample_rate
+
+REQUEST_ID_HEADER = "x-request-id"
+DEBUG_LEVEL_NO = 10
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+# Outside a request (startup, workers) debug lines are kept.
+debug_sampled_var: ContextVar[bool] = ContextVar("debug_sampled", default=True)
+
+
+def _add_context(record):
+    record["extra"].setdefault("request_id", request_id_var.get())
+    record["extra"]["debug_sampled"] = debug_sampled_var.get()
+
+
+def _sampling_filter(record) -> bool:
+    if record["extra"].get("slow_request"):
+        # Full span trees go to the slow-request log only (see app.core.tracing).
+        return False
+    if record["level"].no <= DEBUG_LEVEL_NO:
+        return record["extra"].get("debug_sampled", True)
+    return True
+
+
+TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <7}</level> | "
+    "{extra[request_id]} | <level>{message}</level>"
+)
 
 logger.remove()
-logger.add(sys.stderr, level="INFO", format="<green>{time}</green> | <level>{message}</level>")
+logger.configure(patcher=_add_context)
+logger.add(
+    sys.stderr,
+    level=LOG_LEVEL,
+    format=TEXT_FORMAT,
+    serialize=LOG_FORMAT == "json",
+    filter=_sampling_filter,
+    enqueue=True,
+    backtrace=False,
+    diagnose=False,
+)
+
 
 def get_logger():
     return logger
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+# ----------------------------------------
+# REQUEST CONTEXT MIDDLEWARE (pure ASGI)
+# ----------------------------------------
+class RequestContextMiddleware:
+    """
+    Tags each HTTP request with an id (incoming X-Request-ID or a new one),
+    echoes it in the response and decides once whether its DEBUG lines are sampled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or new_request_id()
+
+        id_token = request_id_var.set(request_id)
+        sample_token = debug_sampled_var.set(random.random() < LOG_DEBUG_SAMPLE_RATE)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER.encode(), request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(id_token)
+            debug_sampled_var.reset(sample_token)
@@ -0,0 +1,287 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.tracing import span
+
+# ----------------------------------------
+# METRICS (Prometheus text exposition)
+# ----------------------------------------
+# A small in-process registry: counters, gauges and histograms with labels,
+# rendered by GET /metrics. Recording is a dict lookup, a bisect and a few
+# additions under a per-series lock, so it stays on in production.
+#
+# Series are per process; with several workers scrape each one (or use a
+# per-worker port) the same way as any other multi-process Python service.
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # Unlabelled series are exported (as 0) before the first update.
+            self.labels()
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                series = self._series.setdefault(key, self._new_series())
+        return series
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_series(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(series.value)}"
+            for key, series in sorted(self._series.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "total", "count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self._series.items()):
+            with series._lock:
+                counts, total, count = list(series.counts), series.total, series.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+# ----------------------------------------
+# CHATBOT METRICS
+# ----------------------------------------
+# Stages: turn (whole /chat call), db, lead, embedding, faiss, llm, sheets
+STAGE_SECONDS = histogram(
+    "chatbot_stage_seconds", "Time spent per pipeline stage", ("stage",)
+)
+LEAD_TRIGGERS = counter(
+    "chatbot_lead_triggers_total", "Lead flows started, by trigger", ("trigger",)
+)
+FALLBACK_HITS = counter(
+    "chatbot_fallback_responses_total", "Canned replies served instead of the LLM", ("kind",)
+)
+LLM_SHED = counter(
+    "chatbot_llm_shed_total", "Turns sent to fallbacks because the LLM gate was full"
+)
+CACHE_REQUESTS = counter(
+    "chatbot_cache_requests_total", "Cache and index lookups", ("cache", "result")
+)
+LLM_TOKENS = counter(
+    "chatbot_llm_tokens_total", "LLM tokens reported by the API", ("kind",)
+)
+DB_CONNECTIONS_IN_USE = gauge(
+    "chatbot_db_connections_in_use", "DB connections currently checked out"
+)
+DB_CONNECTIONS_OPENED = counter(
+    "chatbot_db_connections_opened_total", "DB connections checked out"
+)
+DB_ERRORS = counter(
+    "chatbot_db_errors_total", "DB transactions rolled back"
+)
+SHEETS_ROWS = counter(
+    "chatbot_sheets_rows_total", "Rows sent to Google Sheets", ("result",)
+)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block (or, as a decorator, a function) into chatbot_stage_seconds.
+    Also opens a trace span of the same name; yields it (None outside a trace).
+    """
+    series = STAGE_SECONDS.labels(name)
+    started = time.perf_counter()
+    try:
+        with span(name) as current:
+            yield current
+    finally:
+        series.observe(time.perf_counter() - started)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_llm_usage(response) -> Optional[Dict[str, int]]:
+    """
+    Count prompt/completion tokens from a LangChain chat response, if reported.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        prompt, completion = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    else:
+        usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    if not (prompt or completion):
+        return None
+    LLM_TOKENS.labels("prompt").inc(prompt)
+    LLM_TOKENS.labels("completion").inc(completion)
+    return {"prompt": prompt, "completion": completion}
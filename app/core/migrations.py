@@ -0,0 +1,260 @@
+from typing import Dict, List, Set, Tuple
+
+from app.core.logger import logger
+
+# ----------------------------------------
+# INDEXES NEEDED BY HOT QUERIES
+# ----------------------------------------
+# table -> [(index_name, columns)]
+REQUIRED_INDEXES: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = {
+    # retrieve_chats / get_conversation_messages: WHERE session_id ORDER BY id
+    "chats": [
+        ("idx_chats_session_id", ("session_id", "id")),
+        # count_user_messages: WHERE session_id AND sender = 'user'
+        ("idx_chats_session_sender", ("session_id", "sender")),
+    ],
+    # every lead read/write filters on session_id
+    "leads": [
+        ("idx_leads_session_id", ("session_id",)),
+    ],
+    # exporter claims: WHERE status = 'pending' AND next_attempt_at <= now
+    # (also serves the startup scan for status = 'awaiting_intent')
+    "lead_export_outbox": [
+        ("idx_outbox_due", ("status", "next_attempt_at")),
+        ("idx_outbox_claim", ("claim_token",)),
+        # lead_export_exists: skip re-exporting a merged lead
+        ("idx_outbox_session", ("session_id",)),
+    ],
+}
+
+# Unique keys that enable single-statement upserts.
+# table -> [(key_name, columns)]; skipped (with a warning) if existing rows collide.
+REQUIRED_UNIQUE_KEYS: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = {
+    "leads": [
+        ("unique_session_id", ("session_id",)),
+    ],
+}
+
+# ----------------------------------------
+# TABLES OWNED BY THE BACKEND
+# ----------------------------------------
+REQUIRED_TABLES: Dict[str, str] = {
+    # One compact row per archived session (see app/services/retention.py)
+    "chat_archives": """
+        CREATE TABLE IF NOT EXISTS chat_archives (
+            session_id VARCHAR(255) PRIMARY KEY,
+            message_count INT NOT NULL DEFAULT 0,
+            user_message_count INT NOT NULL DEFAULT 0,
+            first_message_at DATETIME NULL,
+            last_message_at DATETIME NULL,
+            lead_step VARCHAR(50) NULL,
+            archive_path VARCHAR(1024) NOT NULL,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    # Durable queue of completed leads for Google Sheets (see app/integrations/sheets_outbox.py)
+    "lead_export_outbox": """
+        CREATE TABLE IF NOT EXISTS lead_export_outbox (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            session_id VARCHAR(255) NOT NULL,
+            payload TEXT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            attempts INT NOT NULL DEFAULT 0,
+            next_attempt_at DATETIME NOT NULL,
+            claim_token VARCHAR(64) NULL,
+            last_error TEXT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME NULL
+        )
+    """,
+    # Rolling summary of older turns (see app/services/conversation_memory.py)
+    "conversation_memory": """
+        CREATE TABLE IF NOT EXISTS conversation_memory (
+            session_id VARCHAR(255) PRIMARY KEY,
+            summary TEXT NOT NULL,
+            summarized_through_id INT NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    # Sessions merged into another session's lead (same email/phone)
+    "lead_sessions": """
+        CREATE TABLE IF NOT EXISTS lead_sessions (
+            session_id VARCHAR(255) PRIMARY KEY,
+            lead_session_id VARCHAR(255) NOT NULL,
+            merged_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    # Daily analytics counters (see app/services/analytics.py)
+    "analytics_daily": """
+        CREATE TABLE IF NOT EXISTS analytics_daily (
+            day VARCHAR(10) NOT NULL,
+            metric VARCHAR(128) NOT NULL,
+            count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, metric)
+        )
+    """,
+    # Running per-session counters behind the lead intent summary
+    "session_aggregates": """
+        CREATE TABLE IF NOT EXISTS session_aggregates (
+            session_id VARCHAR(255) PRIMARY KEY,
+            user_message_count INT NOT NULL DEFAULT 0,
+            question_count INT NOT NULL DEFAULT 0,
+            has_contact TINYINT NOT NULL DEFAULT 0,
+            topics TEXT,
+            latest_need VARCHAR(255),
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+}
+
+# ----------------------------------------
+# INTROSPECTION
+# ----------------------------------------
+def get_table_columns(cursor, table: str) -> Set[str]:
+    cursor.execute(
+        """
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """,
+        (table,)
+    )
+    return {row[0].lower() for row in cursor.fetchall()}
+
+
+def get_table_indexes(cursor, table: str, unique_only: bool = False) -> Dict[str, Tuple[str, ...]]:
+    cursor.execute(
+        f"""
+        SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        {'AND NON_UNIQUE = 0' if unique_only else ''}
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+        """,
+        (table,)
+    )
+    indexes: Dict[str, List[str]] = {}
+    for index_name, column_name in cursor.fetchall():
+        indexes.setdefault(index_name, []).append(column_name.lower())
+    return {name: tuple(columns) for name, columns in indexes.items()}
+
+
+def is_index_covered(columns: Tuple[str, ...], existing: Dict[str, Tuple[str, ...]]) -> bool:
+    """
+    An index is redundant if an existing index starts with the same columns.
+    """
+    return any(cols[:len(columns)] == columns for cols in existing.values())
+
+
+def inspect_schema(cursor) -> Dict:
+    """
+    Read-only facts the hot paths depend on. Needs no DDL privileges, so it
+    is safe to call from request handlers.
+    """
+    return {
+        "chats_has_timestamp": "timestamp" in get_table_columns(cursor, "chats"),
+        "leads_session_unique": ("session_id",) in get_table_indexes(cursor, "leads", unique_only=True).values(),
+        "has_lead_sessions": bool(get_table_columns(cursor, "lead_sessions")),
+    }
+
+
+# ----------------------------------------
+# MIGRATIONS
+# ----------------------------------------
+def try_ddl(cursor, sql: str, description: str) -> bool:
+    """
+    Run one DDL statement; a failure (missing privileges, lock timeout, ...)
+    is logged and skipped so the remaining steps still run.
+    """
+    try:
+        cursor.execute(sql)
+        return True
+    except Exception as e:
+        logger.warning("[MIGRATE] Could not {}: {}", description, e)
+        return False
+
+
+def ensure_indexes(cursor, table: str, wanted: List[Tuple[str, Tuple[str, ...]]]) -> List[str]:
+    columns = get_table_columns(cursor, table)
+    if not columns:
+        logger.info("[MIGRATE] Table {} not found, skipping indexes", table)
+        return []
+
+    existing = get_table_indexes(cursor, table)
+    created = []
+    for index_name, index_columns in wanted:
+        if not set(index_columns) <= columns:
+            logger.info("[MIGRATE] {} lacks columns for {}, skipping", table, index_name)
+            continue
+        if index_name in existing or is_index_covered(index_columns, existing):
+            continue
+
+        if not try_ddl(
+            cursor,
+            f"CREATE INDEX {index_name} ON {table} ({', '.join(index_columns)})",
+            f"create index {index_name} on {table}",
+        ):
+            continue
+        existing[index_name] = index_columns
+        created.append(index_name)
+        logger.info("[MIGRATE] Created index {} on {}{}", index_name, table, index_columns)
+    return created
+
+
+def has_duplicates(cursor, table: str, columns: Tuple[str, ...]) -> bool:
+    column_list = ", ".join(columns)
+    cursor.execute(
+        f"""
+        SELECT 1 FROM {table}
+        WHERE {' AND '.join(f'{column} IS NOT NULL' for column in columns)}
+        GROUP BY {column_list}
+        HAVING COUNT(*) > 1
+        LIMIT 1
+        """
+    )
+    return cursor.fetchone() is not None
+
+
+def ensure_unique_key(cursor, table: str, key_name: str, key_columns: Tuple[str, ...]) -> bool:
+    """
+    Make sure a unique key exists on exactly these columns.
+    Returns False if it is missing and could not be created.
+    """
+    if not get_table_columns(cursor, table):
+        return False
+
+    if key_columns in get_table_indexes(cursor, table, unique_only=True).values():
+        return True
+
+    if has_duplicates(cursor, table, key_columns):
+        logger.warning("[MIGRATE] {}{} has duplicate rows, cannot add {}", table, key_columns, key_name)
+        return False
+
+    if not try_ddl(
+        cursor,
+        f"ALTER TABLE {table} ADD UNIQUE KEY {key_name} ({', '.join(key_columns)})",
+        f"add unique key {key_name} on {table}",
+    ):
+        return False
+    logger.info("[MIGRATE] Created unique key {} on {}{}", key_name, table, key_columns)
+    return True
+
+
+def run_migrations(conn) -> Dict:
+    """
+    Create missing tables, unique keys and indexes on a MySQL schema.
+    Every step is best-effort: a DML-only user or colliding rows leave the
+    schema as it was and the app runs on whatever is already there.
+    Returns inspect_schema() of the result.
+    """
+    cursor = conn.cursor()
+    try:
+        for table, create_sql in REQUIRED_TABLES.items():
+            try_ddl(cursor, create_sql, f"create table {table}")
+        for table, keys in REQUIRED_UNIQUE_KEYS.items():
+            for key_name, key_columns in keys:
+                ensure_unique_key(cursor, table, key_name, key_columns)
+        for table, wanted in REQUIRED_INDEXES.items():
+            ensure_indexes(cursor, table, wanted)
+        conn.commit()
+        return inspect_schema(cursor)
+    finally:
+        cursor.close()
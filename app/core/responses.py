@@ -0,0 +1,146 @@
+import warnings
+from typing import Optional
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.utils.compression import StreamCompressor, available_encodings, choose_encoding, compress
+
+# orjson is optional; without it responses use the stdlib encoder.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ----------------------------------------
+# JSON RESPONSES
+# ----------------------------------------
+# FastAPI's ORJSONResponse: several times less CPU than json.dumps on chat
+# history and lead payloads. Newer FastAPI releases flag it as deprecated in
+# favour of response_model serialization, which still runs the validation
+# pass the hot handlers skip by returning this class directly.
+warnings.filterwarnings("ignore", message="ORJSONResponse is deprecated")
+
+DefaultJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
+
+
+# ----------------------------------------
+# RESPONSE COMPRESSION (pure ASGI)
+# ----------------------------------------
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type == "text/event-stream":
+        return False  # buffering proxies + compression delay events
+    return media_type in COMPRESSIBLE_TYPES or media_type.startswith("text/") or media_type.endswith("+json")
+
+
+class CompressionMiddleware:
+    """
+    gzip / brotli (when installed) for responses of at least minimum_size
+    bytes, negotiated from Accept-Encoding. Responses that already carry a
+    Content-Encoding (the precompressed widget) pass through untouched;
+    streamed bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None, enabled: Optional[bool] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.enabled = enabled
+
+    def _configure(self):
+        from app.core.config import get_settings
+
+        settings = get_settings()
+        if self.enabled is None:
+            self.enabled = settings.response_compression_enabled
+        if self.minimum_size is None:
+            self.minimum_size = settings.response_compression_min_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.enabled is None or self.minimum_size is None:
+            self._configure()
+
+        encoding = None
+        if self.enabled:
+            encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), available_encodings())
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        pending = []
+        state = "undecided"  # -> "identity" | "compress"
+        compressor: Optional[StreamCompressor] = None
+
+        async def send_compressed(message):
+            nonlocal start_message, state, compressor
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or state == "identity":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if state == "compress":
+                chunk = compressor.compress(body) if body else b""
+                if not more_body:
+                    chunk += compressor.finish()
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            if (
+                start_message["status"] in (204, 304)
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+            ):
+                state = "identity"
+                await send(start_message)
+                await send(message)
+                return
+
+            pending.append(body)
+            size = sum(len(part) for part in pending)
+            if more_body and size < self.minimum_size:
+                return  # wait for enough bytes to decide
+
+            data = b"".join(pending)
+            pending.clear()
+            if not more_body and size < self.minimum_size:
+                state = "identity"
+                await send(start_message)
+                await send({"type": "http.response.body", "body": data, "more_body": False})
+                return
+
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                data = compress(data, encoding)
+                headers["Content-Length"] = str(len(data))
+                state = "identity"
+                await send(start_message)
+                await send({"type": "http.response.body", "body": data, "more_body": False})
+                return
+
+            del headers["Content-Length"]
+            state = "compress"
+            compressor = StreamCompressor(encoding)
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressor.compress(data), "more_body": True})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,20 @@
+import secrets
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app.core.config import get_settings
+
+ADMIN_KEY_HEADER = "X-Admin-Key"
+
+
+def require_admin_key(x_admin_key: Optional[str] = Header(None)):
+    """
+    Dependency for routes that expose or bulk-write lead data. The widget
+    never calls them, so they stay closed unless ADMIN_API_KEY is set.
+    """
+    expected = get_settings().admin_api_key
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail=f"Missing or invalid {ADMIN_KEY_HEADER}")
@@ -0,0 +1,261 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from app.core.logger import logger, new_request_id, request_id_var
+
+# ----------------------------------------
+# REQUEST TRACING
+# ----------------------------------------
+# TracingMiddleware opens a root span per HTTP request; span(...) blocks
+# (and every metrics.stage(...)) nest under whatever span is current, so a
+# /chat turn becomes a tree: lead_signal, lead_state, db, retrieval,
+# prompt, llm, persist ... Finished traces go to the configured exporter;
+# traces slower than slow_request_seconds also get their full tree written
+# to the slow-request log. Outside a request span() does nothing.
+#
+#   trace_exporter = none | memory | file
+#   trace_file_path, slow_request_seconds, slow_request_log_path
+
+
+class Span:
+    __slots__ = ("name", "attributes", "children", "started", "ended")
+
+    def __init__(self, name: str, attributes: Optional[Dict] = None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.children: List["Span"] = []
+        self.started = time.perf_counter()
+        self.ended: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.ended or time.perf_counter()) - self.started
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict:
+        origin = self.started if origin is None else origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.started - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict(origin) for child in list(self.children)],
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Child span of the current one; yields the Span (or None outside a trace).
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        child.ended = time.perf_counter()
+        _current_span.reset(token)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def render_span_tree(root: Span) -> str:
+    lines = []
+
+    def walk(node: Span, depth: int):
+        attributes = " ".join(f"{key}={value}" for key, value in node.attributes.items())
+        offset_ms = (node.started - root.started) * 1000
+        lines.append(
+            f"{'  ' * depth}{node.name} +{offset_ms:.1f}ms {node.duration * 1000:.1f}ms {attributes}".rstrip()
+        )
+        for child in list(node.children):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
+
+
+# ----------------------------------------
+# EXPORTERS
+# ----------------------------------------
+class TraceExporter:
+    def export(self, trace: Dict):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class InMemoryExporter(TraceExporter):
+    """
+    Keeps the last `max_traces` traces; handy for tests and ad-hoc debugging.
+    """
+
+    def __init__(self, max_traces: int = 1000):
+        self.traces: "deque[Dict]" = deque(maxlen=max_traces)
+
+    def export(self, trace: Dict):
+        self.traces.append(trace)
+
+
+class FileExporter(TraceExporter):
+    """
+    JSON lines, written by a background thread so requests never wait on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Dict):
+        self._queue.put(trace)
+
+    def _write_loop(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as handle:
+            while True:
+                trace = self._queue.get()
+                if trace is None:
+                    return
+                handle.write(json.dumps(trace, default=str) + "\n")
+                if self._queue.empty():
+                    handle.flush()
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+_exporter: Optional[TraceExporter] = None
+_enabled = False
+_slow_request_seconds = float("inf")
+_slow_sink_id: Optional[int] = None
+
+
+def set_trace_exporter(exporter: Optional[TraceExporter]):
+    global _exporter
+    if _exporter is not None and _exporter is not exporter:
+        _exporter.shutdown()
+    _exporter = exporter
+
+
+def get_trace_exporter() -> Optional[TraceExporter]:
+    return _exporter
+
+
+def configure_tracing():
+    """
+    Apply tracing settings: exporter, slow threshold and slow-request log sink.
+    """
+    from app.core.config import get_settings
+
+    global _enabled, _slow_request_seconds, _slow_sink_id
+    settings = get_settings()
+    _enabled = settings.tracing_enabled
+    _slow_request_seconds = settings.slow_request_seconds
+
+    kind = settings.trace_exporter.lower()
+    if kind == "memory":
+        set_trace_exporter(InMemoryExporter())
+    elif kind == "file":
+        set_trace_exporter(FileExporter(settings.trace_file_path))
+    elif kind == "none":
+        set_trace_exporter(None)
+    else:
+        raise ValueError(f"Unknown trace exporter: {kind}")
+
+    if settings.slow_request_log_path and _slow_sink_id is None:
+        _slow_sink_id = logger.add(
+            settings.slow_request_log_path,
+            level="WARNING",
+            format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {extra[request_id]} | {message}",
+            filter=lambda record: record["extra"].get("slow_request", False),
+            enqueue=True,
+            rotation="50 MB",
+        )
+
+
+def shutdown_tracing():
+    set_trace_exporter(None)
+
+
+def finish_trace(root: Span, trace_id: str):
+    root.ended = root.ended or time.perf_counter()
+    if _exporter is not None:
+        try:
+            trace = root.to_dict()
+            trace["trace_id"] = trace_id
+            _exporter.export(trace)
+        except Exception as e:
+            logger.warning("[TRACE] Export failed: {}", e)
+
+    if root.duration >= _slow_request_seconds:
+        logger.warning("[TRACE] Slow request {:.0f}ms: {}", root.duration * 1000, root.attributes.get("path"))
+        logger.bind(slow_request=True).warning(
+            "{:.0f}ms {}\n{}", root.duration * 1000, root.attributes.get("path"), render_span_tree(root)
+        )
+
+
+# ----------------------------------------
+# MIDDLEWARE (pure ASGI)
+# ----------------------------------------
+class TracingMiddleware:
+    """
+    Root span per HTTP request, keyed by the request id.
+    Register it inside RequestContextMiddleware so the id is already set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _enabled:
+            await self.app(scope, receive, send)
+            return
+
+        root = Span("request", {"method": scope.get("method"), "path": scope.get("path")})
+        token = _current_span.set(root)
+        trace_id = request_id_var.get()
+        if trace_id == "-":
+            trace_id = new_request_id()
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                root.attributes["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            root.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            finish_trace(root, trace_id)
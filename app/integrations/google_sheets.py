@@ -1,10 +1,15 @@
 import os
+import threading
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List
 
+import httplib2
 from google.oauth2.service_account import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 
+from app.core.metrics import SHEETS_ROWS, stage
+
 # ----------------------------------------
 # CONFIG
 # ----------------------------------------
@@ -12,27 +17,74 @@ SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
 SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
 SPREADSHEET_ID = os.getenv("GOOGLE_SHEET_ID")
+# Point at a local fake Sheets server in tests/benchmarks, e.g. http://127.0.0.1:8089/
+SHEETS_API_ENDPOINT = os.getenv("GOOGLE_SHEETS_API_ENDPOINT")
 
 SHEET_NAME = "Leads"  # change if needed
 
+HTTP_TIMEOUT_SECONDS = 30
+
+_service = None
+_service_pid = None
+_service_lock = threading.RLock()
+
 # ----------------------------------------
 # AUTH
 # ----------------------------------------
-def get_sheets_service():
-    if not SERVICE_ACCOUNT_FILE or not SPREADSHEET_ID:
+def get_credentials():
+    if SERVICE_ACCOUNT_FILE:
+        return Credentials.from_service_account_file(
+            SERVICE_ACCOUNT_FILE, scopes=SCOPES
+        )
+
+    from google.auth.credentials import AnonymousCredentials
+    return AnonymousCredentials()
+
+
+def build_sheets_service():
+    """
+    Build a new Sheets client: bundled (static) discovery document and a
+    single keep-alive HTTP connection whose token refreshes automatically.
+    """
+    if not SPREADSHEET_ID or not (SERVICE_ACCOUNT_FILE or SHEETS_API_ENDPOINT):
         raise RuntimeError("Google Sheets env variables missing")
 
-    creds = Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SCOPES
+    client_options = None
+    if SHEETS_API_ENDPOINT:
+        client_options = {"api_endpoint": SHEETS_API_ENDPOINT}
+
+    authed_http = AuthorizedHttp(get_credentials(), http=httplib2.Http(timeout=HTTP_TIMEOUT_SECONDS))
+    return build(
+        "sheets",
+        "v4",
+        http=authed_http,
+        client_options=client_options,
+        static_discovery=True,
+        cache_discovery=False,
     )
 
-    service = build("sheets", "v4", credentials=creds)
-    return service
+
+def get_sheets_service():
+    """
+    Process-wide client, built once (and again after a fork).
+    """
+    global _service, _service_pid
+    with _service_lock:
+        if _service is None or _service_pid != os.getpid():
+            _service = build_sheets_service()
+            _service_pid = os.getpid()
+        return _service
+
+
+def reset_sheets_service():
+    global _service
+    with _service_lock:
+        _service = None
 
 # ----------------------------------------
-# APPEND LEAD
+# APPEND LEADS
 # ----------------------------------------
-def append_lead_to_sheet(lead: Dict):
+def lead_to_row(lead: Dict) -> List:
     """
     lead dict must contain:
     - session_id
@@ -40,26 +92,49 @@ def append_lead_to_sheet(lead: Dict):
     - email
     - phone
     - intent_summary
+    Optional completed_at (defaults to now).
     """
-
-    service = get_sheets_service()
-    sheet = service.spreadsheets()
-
-    values = [[
-        datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+    completed_at = lead.get("completed_at") or datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    return [
+        completed_at,
         lead.get("session_id"),
         lead.get("name"),
         lead.get("email"),
         lead.get("phone"),
         lead.get("intent_summary"),
-    ]]
+    ]
 
-    body = {"values": values}
 
-    sheet.values().append(
-        spreadsheetId=SPREADSHEET_ID,
-        range=f"{SHEET_NAME}!A1",
-        valueInputOption="RAW",
-        insertDataOption="INSERT_ROWS",
-        body=body
-    ).execute()
+def append_rows_to_sheet(rows: List[List]):
+    """
+    Append many rows with a single values.append call.
+    """
+    if not rows:
+        return
+
+    body = {"values": rows}
+
+    # httplib2 connections are not thread-safe; serialize calls on the shared client.
+    with _service_lock, stage("sheets"):
+        sheet = get_sheets_service().spreadsheets()
+        try:
+            sheet.values().append(
+                spreadsheetId=SPREADSHEET_ID,
+                range=f"{SHEET_NAME}!A1",
+                valueInputOption="RAW",
+                insertDataOption="INSERT_ROWS",
+                body=body
+            ).execute()
+        except (OSError, httplib2.HttpLib2Error):
+            # Drop a broken keep-alive connection; the next call rebuilds it.
+            SHEETS_ROWS.labels("error").inc(len(rows))
+            reset_sheets_service()
+            raise
+        except Exception:
+            SHEETS_ROWS.labels("error").inc(len(rows))
+            raise
+    SHEETS_ROWS.labels("sent").inc(len(rows))
+
+
+def append_lead_to_sheet(lead: Dict):
+    append_rows_to_sheet([lead_to_row(lead)])
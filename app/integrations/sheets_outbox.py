@@ -0,0 +1,180 @@
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+from app.storage.factory import get_storage
+from app.core.logger import logger
+
+# ----------------------------------------
+# SHEETS EXPORT OUTBOX
+# ----------------------------------------
+# Completed leads are written to `lead_export_outbox` in the request and
+# shipped to Google Sheets by a background exporter: one batched
+# values.append per flush, exponential backoff on failure, dead-lettered
+# after `sheets_export_max_attempts`.
+
+_worker_thread: Optional[threading.Thread] = None
+_wake_event = threading.Event()
+_stop_event = threading.Event()
+
+
+def serialize_lead(lead: Dict, chat_session_id: Optional[str] = None) -> str:
+    payload = {
+        "session_id": lead.get("session_id"),
+        "name": lead.get("name"),
+        "email": lead.get("email"),
+        "phone": lead.get("phone"),
+        "intent_summary": lead.get("intent_summary"),
+        "completed_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    if chat_session_id:
+        # Which conversation to summarise when a held row is recovered.
+        payload["chat_session_id"] = chat_session_id
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def enqueue_lead_export(lead: Dict, hold_for_session: Optional[str] = None) -> int:
+    """
+    Durably queue a completed lead for export. Cheap: one INSERT.
+    With hold_for_session the row waits (status "awaiting_intent") until
+    release_lead_export() attaches that session's predicted intent.
+    """
+    if hold_for_session:
+        return get_storage().enqueue_lead_export(
+            lead.get("session_id"), serialize_lead(lead, hold_for_session), status="awaiting_intent"
+        )
+    storage = get_storage()
+    export_id = storage.enqueue_lead_export(lead.get("session_id"), serialize_lead(lead))
+    # Inside a turn's transaction the row is not visible until it commits.
+    storage.after_commit(_wake_event.set)
+    return export_id
+
+
+def release_lead_export(export_id: int, lead: Dict) -> bool:
+    """
+    Hand a held export to the exporter with the lead as it is now.
+    """
+    released = get_storage().release_lead_export(export_id, serialize_lead(lead))
+    if released:
+        _wake_event.set()
+    return released
+
+
+def next_backoff(attempts: int) -> float:
+    settings = get_settings()
+    delay = settings.sheets_export_backoff_seconds * (2 ** max(0, attempts - 1))
+    delay = min(delay, settings.sheets_export_max_backoff_seconds)
+    # Jitter so exporters on several nodes don't retry in lockstep.
+    return delay * random.uniform(0.8, 1.2)
+
+
+def flush_once() -> Dict:
+    """
+    Send one batch of due exports. Returns counters for logging/benchmarks.
+    """
+    # Imported here so the outbox can be queued without Google libraries loaded.
+    from app.integrations.google_sheets import append_rows_to_sheet, lead_to_row
+
+    settings = get_settings()
+    storage = get_storage()
+    claimed = storage.claim_lead_exports(
+        settings.sheets_export_batch_size,
+        settings.sheets_export_lease_seconds
+    )
+    if not claimed:
+        return {"sent": 0, "failed": 0, "dead": 0}
+
+    rows: List[List] = []
+    sendable = []
+    dead = 0
+    for export in claimed:
+        try:
+            rows.append(lead_to_row(json.loads(export["payload"])))
+            sendable.append(export)
+        except (TypeError, ValueError) as e:
+            # A payload we can never send; dead-letter immediately.
+            storage.mark_lead_export_failed(export["id"], export["attempts"] + 1, f"Bad payload: {e}", None)
+            dead += 1
+
+    try:
+        append_rows_to_sheet(rows)
+    except Exception as e:
+        error = str(e) or e.__class__.__name__
+        logger.warning("[SHEETS] Batch of {} failed: {}", len(sendable), error)
+        for export in sendable:
+            attempts = export["attempts"] + 1
+            if attempts >= settings.sheets_export_max_attempts:
+                storage.mark_lead_export_failed(export["id"], attempts, error, None)
+                dead += 1
+            else:
+                retry_at = datetime.utcnow() + timedelta(seconds=next_backoff(attempts))
+                storage.mark_lead_export_failed(export["id"], attempts, error, retry_at)
+        return {"sent": 0, "failed": len(sendable), "dead": dead}
+
+    storage.mark_lead_exports_sent([export["id"] for export in sendable])
+    return {"sent": len(sendable), "failed": 0, "dead": dead}
+
+
+# ----------------------------------------
+# BACKGROUND EXPORTER
+# ----------------------------------------
+def _exporter_loop(poll_seconds: float):
+    while not _stop_event.is_set():
+        _wake_event.wait(poll_seconds)
+        _wake_event.clear()
+        try:
+            # Keep flushing while full batches are coming back.
+            while not _stop_event.is_set():
+                result = flush_once()
+                if result["sent"] + result["failed"] + result["dead"] < get_settings().sheets_export_batch_size:
+                    break
+        except Exception as e:
+            logger.error("[SHEETS] Exporter error: {}", e)
+
+
+def missing_sheets_config(settings) -> List[str]:
+    """
+    Settings the exporter still needs before it can reach a sheet.
+    """
+    missing = []
+    if not settings.google_sheet_id:
+        missing.append("GOOGLE_SHEET_ID")
+    if not (settings.google_service_account_file or settings.google_sheets_api_endpoint):
+        missing.append("GOOGLE_SERVICE_ACCOUNT_FILE")
+    return missing
+
+
+def start_sheets_exporter():
+    global _worker_thread
+    settings = get_settings()
+    if not settings.sheets_export_enabled:
+        logger.info("[SHEETS] Exporter disabled (SHEETS_EXPORT_ENABLED=false); leads stay in the outbox")
+        return
+    missing = missing_sheets_config(settings)
+    if missing:
+        # Without these every flush would fail and walk leads to dead-letter.
+        logger.warning(
+            "[SHEETS] Exporter not started: {} not set; leads stay in the outbox",
+            ", ".join(missing),
+        )
+        return
+    if _worker_thread and _worker_thread.is_alive():
+        return
+
+    _stop_event.clear()
+    _worker_thread = threading.Thread(
+        target=_exporter_loop,
+        args=(settings.sheets_export_poll_seconds,),
+        name="sheets-exporter",
+        daemon=True,
+    )
+    _worker_thread.start()
+    logger.info("Sheets exporter started")
+
+
+def stop_sheets_exporter():
+    _stop_event.set()
+    _wake_event.set()
@@ -1,29 +1,24 @@
-from datetime import datetime
 from typing import Optional, Dict
-import pymysql
 
-from app.utils.validators import is_valid_email, is_valid_indian_phone, is_valid_name, normalize_indian_phone
+from app.utils.validators import (
+    is_valid_email, is_valid_indian_phone, is_valid_name, normalize_email, normalize_indian_phone
+)
 
 from app.leads.lead_state_service import (
-    get_or_create_lead_state,
-    update_lead_state,
-    refresh_intent_summary_from_conversation
+    LEAD_STATES,
+    INTENT_SUMMARY_MAX_LEN,
+    get_conversation_summary
 )
+from app.leads.lead_flow import LEAD_FLOW, LeadRecord, TurnInput, compile_flow, run_lead_turn
+from app.leads.lead_index import get_lead_index
 
-from app.core.config import get_settings
-from app.integrations.google_sheets import append_lead_to_sheet
+from app.storage.factory import get_storage
+from app.integrations.sheets_outbox import enqueue_lead_export
+from app.services.analytics import record_lead_merged, record_transition
+from app.core.logger import logger
+from app.core.metrics import record_cache
 
-# ----------------------------------------
-# DB CONNECTION
-# ----------------------------------------
-def get_db_connection():
-    settings = get_settings()
-    return pymysql.connect(
-        host=settings.db_host,
-        user=settings.db_user,
-        password=settings.db_password,
-        database=settings.db_name
-    )
+COMPILED_LEAD_FLOW = compile_flow(LEAD_FLOW, LEAD_STATES)
 
 # ----------------------------------------
 # RETRIEVE COMPLETE LEAD
@@ -32,268 +27,137 @@ def get_lead_by_session_id(session_id: str) -> Optional[Dict]:
     """
     Fetch complete lead data from database.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        SELECT session_id, name, email, phone, intent_summary, created_at
-        FROM leads
-        WHERE session_id = %s
-        """,
-        (session_id,)
-    )
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
-
-    if not row:
-        return None
-
-    return {
-        "session_id": row[0],
-        "name": row[1],
-        "email": row[2],
-        "phone": row[3],
-        "intent_summary": row[4],
-        "created_at": row[5]
-    }
+    return get_storage().get_lead(session_id)
 
 # ----------------------------------------
 # SAVE / UPDATE LEAD FIELD
 # ----------------------------------------
 def upsert_lead_field(session_id: str, field: str, value: str):
-    allowed_fields = {"name", "email", "phone", "intent_summary"}
-    if field not in allowed_fields:
-        raise ValueError(f"Invalid lead field: {field}")
+    get_storage().upsert_lead_field(session_id, field, value)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT id FROM leads WHERE session_id = %s",
-        (session_id,)
-    )
-    row = cursor.fetchone()
+# ----------------------------------------
+# LOAD / SAVE TURN RECORD
+# ----------------------------------------
+def load_lead_record(session_id: str) -> LeadRecord:
+    """
+    Lead state + lead row in a single read, for one turn.
+    """
+    loaded = get_storage().load_lead_record(session_id)
+    record = LeadRecord(session_id=session_id, state=loaded["state"])
+    if loaded["lead"]:
+        record.adopt(loaded["lead"])
+    return record
 
-    if row:
-        cursor.execute(
-            f"UPDATE leads SET {field} = %s WHERE session_id = %s",
-            (value, session_id)
-        )
-    else:
-        cursor.execute(
-            f"""
-            INSERT INTO leads (session_id, {field}, created_at)
-            VALUES (%s, %s, %s)
-            """,
-            (session_id, value, datetime.utcnow())
-        )
 
-    conn.commit()
-    cursor.close()
-    conn.close()
+def merge_into_existing_lead(lead: LeadRecord, owner_session_id: str) -> bool:
+    """
+    Attach this session to the lead that already owns its email/phone,
+    instead of writing a second, partial lead.
+    """
+    storage = get_storage()
+    merged = storage.merge_lead_session(lead.session_id, owner_session_id, lead.changes)
+    if merged is None:
+        if storage.has_lead_sessions():
+            # The owner's lead is gone; stop pointing at it.
+            get_lead_index().discard(owner_session_id, lead.email, lead.phone)
+        return False
+
+    logger.info("[LEAD] Merged session {} into lead {}", lead.session_id, merged["session_id"])
+    # The session's own partial lead row is gone.
+    get_lead_index().discard(lead.session_id, lead.email, lead.phone)
+    lead.adopt(merged)
+    lead.changes = {}
+    return True
+
+def export_completed_lead(session_id: str, lead: Dict, hold: bool = False) -> Optional[int]:
+    """
+    Queue a completed lead for Sheets, unless this session was merged into a
+    lead that has already been exported. With hold=True the outbox row waits
+    for the predicted intent (see app/services/intent_prediction.py).
+    Returns the outbox id, or None when skipped.
+    """
+    if lead["session_id"] != session_id and get_storage().lead_export_exists(lead["session_id"]):
+        logger.info("[LEAD] Lead {} already exported; skipping duplicate row", lead["session_id"])
+        return None
+    return enqueue_lead_export(lead, hold_for_session=session_id if hold else None)
 
 # ----------------------------------------
 # PROCESS USER INPUT
 # ----------------------------------------
-def process_lead_input(session_id: str, user_message: str) -> Dict:
+def process_lead_input(
+    session_id: str,
+    user_message: str,
+    record: Optional[LeadRecord] = None,
+    export: bool = True,
+) -> Dict:
     """
     Fast-forward aware lead processor.
+    Runs the LEAD_FLOW transition table on an in-memory record and persists
+    field and state changes, analytics and the export in a single transaction.
+    Pass export=False when the caller queues the export itself
+    (e.g. after background intent prediction).
     """
+    # The whole turn - state, fields, merge, rollups, outbox row - is one commit.
+    with get_storage().transaction():
+        lead = record or load_lead_record(session_id)
+        initial_state = lead.state
+        was_merged = lead.lead_session_id is not None
+        text = user_message.strip()
+
+        extracted = extract_contact_fields(text)
+        turn = TurnInput(
+            name=extracted["name"],
+            email=extracted["email"],
+            phone=extracted["phone"],
+            is_casual=is_casual_message(text),
+        )
 
-    state = get_or_create_lead_state(session_id)
-    text = user_message.strip()
-    is_casual = is_casual_message(text)
-
-    extracted = extract_contact_fields(text)
-
-    # -----------------------------------------
-    # Opportunistic storage (fast-forward)
-    # -----------------------------------------
-    if extracted["email"]:
-        upsert_lead_field(session_id, "email", extracted["email"])
-
-    if extracted["phone"]:
-        upsert_lead_field(session_id, "phone", extracted["phone"])
-
-    # Note: Don't store name here - it's handled in the state-based flow below
-
-    # -----------------------------------------
-    # STATE-BASED FLOW
-    # -----------------------------------------
-
-    # ASK NAME
-    if state == "ASKED_NAME":
-        if is_casual:
-            return {
-                "handled": False,
-                "message": None,
-                "lead_completed": False
-            }
-
-        if extracted["name"]:
-            # User provided name
-            upsert_lead_field(session_id, "name", extracted["name"])
-
-            # Check what else we already have in DB (not just this message)
-            lead_data = get_lead_by_session_id(session_id) or {}
-            has_email = bool(lead_data.get("email"))
-            has_phone = bool(lead_data.get("phone"))
-
-            if has_email and has_phone:
-                update_lead_state(session_id, "COMPLETED")
-                refresh_intent_summary_from_conversation(session_id)
-                lead_data = get_lead_by_session_id(session_id)
-                if lead_data:
-                    try:
-                        append_lead_to_sheet(lead_data)
-                    except Exception as e:
-                        print(f"Error appending lead to Google Sheets: {e}")
-                return {
-                    "handled": True,
-                    "message": "Thank you! Our team will reach out to you shortly!",
-                    "lead_completed": True
-                }
-            elif has_email:
-                update_lead_state(session_id, "ASKED_PHONE")
-                return {
-                    "handled": True,
-                    "message": "Great! May I also have your phone number?",
-                    "lead_completed": False
-                }
-            else:
-                update_lead_state(session_id, "ASKED_EMAIL")
-                return {
-                    "handled": True,
-                    "message": "Thanks! Could you please share your email address?",
-                    "lead_completed": False
-                }
-
-        # User didn't provide a name, but might have provided email or phone
-        elif extracted["email"] and extracted["phone"]:
-            # They provided email+phone but not name, ask for name again
-            return {
-                "handled": True,
-                "message": "I got your email and phone! Now, could you please tell me your name?",
-                "lead_completed": False
-            }
-        elif extracted["email"]:
-            # They provided email instead of name
-            upsert_lead_field(session_id, "email", extracted["email"])
-            return {
-                "handled": True,
-                "message": "Got your email! Still need your name though. What's your name?",
-                "lead_completed": False
-            }
-        elif extracted["phone"]:
-            # They provided phone instead of name
-            upsert_lead_field(session_id, "phone", extracted["phone"])
-            return {
-                "handled": True,
-                "message": "Got your phone! But I still need your name. What's your name?",
-                "lead_completed": False
-            }
-        else:
-            # No valid input
-            return {
-                "handled": True,
-                "message": "Could you please tell me your name?",
-                "lead_completed": False
-            }
-
-    # ASK EMAIL
-    if state == "ASKED_EMAIL":
-        if extracted["email"]:
-            upsert_lead_field(session_id, "email", extracted["email"])
-
-            lead_data = get_lead_by_session_id(session_id) or {}
-            if lead_data.get("phone"):
-                update_lead_state(session_id, "COMPLETED")
-                refresh_intent_summary_from_conversation(session_id)
-                
-                # Get full lead data and push to Google Sheets
-                lead_data = get_lead_by_session_id(session_id)
-                if lead_data:
-                    try:
-                        append_lead_to_sheet(lead_data)
-                    except Exception as e:
-                        print(f"Error appending lead to Google Sheets: {e}")
-                
-                return {
-                    "handled": True,
-                    "message": "Thank you! Our team will reach out to you shortly!",
-                    "lead_completed": True
-                }
-
-            update_lead_state(session_id, "ASKED_PHONE")
-            return {
-                "handled": True,
-                "message": "Great. May I also have your phone number?",
-                "lead_completed": False
-            }
-        
-        elif extracted["phone"]:
-            # They provided phone instead of email
-            upsert_lead_field(session_id, "phone", extracted["phone"])
-            return {
-                "handled": True,
-                "message": "Got your phone! I still need your email address. What's your email?",
-                "lead_completed": False
-            }
-
-        elif is_casual:
-            return {
-                "handled": False,
-                "message": None,
-                "lead_completed": False
-            }
-
-        else:
-            return {
-                "handled": True,
-                "message": "That doesn't seem like a valid email. Could you re-enter it?",
-                "lead_completed": False
-            }
-
-    # ASK PHONE
-    if state == "ASKED_PHONE":
-        if extracted["phone"]:
-            upsert_lead_field(session_id, "phone", extracted["phone"])
-            update_lead_state(session_id, "COMPLETED")
-            refresh_intent_summary_from_conversation(session_id)
-
-            # Get full lead data and push to Google Sheets
-            lead_data = get_lead_by_session_id(session_id)
-            if lead_data:
-                try:
-                    append_lead_to_sheet(lead_data)
-                except Exception as e:
-                    print(f"Error appending lead to Google Sheets: {e}")
-
-            return {
-                "handled": True,
-                "message": "Thank you! Our team will reach out to you shortly!",
-                "lead_completed": True
-            }
-
-        if is_casual:
-            return {
-                "handled": False,
-                "message": None,
-                "lead_completed": False
-            }
-
-        return {
-            "handled": True,
-            "message": "Please enter a valid 10-digit Indian phone number.",
-            "lead_completed": False
-        }
+        transition = run_lead_turn(COMPILED_LEAD_FLOW, lead, turn)
+
+        if transition.completes:
+            summary = get_conversation_summary(session_id)
+            if summary:
+                lead.set("intent_summary", summary[:INTENT_SUMMARY_MAX_LEN])
+
+        # Same person as an existing lead (index hit): merge instead of
+        # colliding with the unique email/phone keys.
+        lead_index = get_lead_index()
+        if "email" in lead.changes or "phone" in lead.changes:
+            owner = lead_index.find(lead.changes.get("email"), lead.changes.get("phone"))
+            record_cache("lead_index", owner is not None)
+            if owner and owner != (lead.lead_session_id or session_id):
+                merge_into_existing_lead(lead, owner)
+
+        new_state = lead.state if lead.state != initial_state else None
+        pending = dict(lead.changes)
+        saved = get_storage().save_lead_turn(session_id, new_state, lead.changes, lead.lead_session_id)
+        lead.changes = {}
+        if saved["conflicts"]:
+            # Index was stale (lead written by another worker); merge now.
+            logger.info("[LEAD] Contact already owned by another lead: {}", saved["conflicts"])
+            lead.changes = pending
+            merge_into_existing_lead(lead, next(iter(saved["conflicts"].values())))
+            lead.changes = {}
+        if lead_index.warmed:
+            lead_index.add(lead.lead_session_id or session_id, lead.email, lead.phone)
+        if lead.lead_session_id is not None:
+            # Repeat visitor: the lead was counted by the session that owns it.
+            if not was_merged:
+                record_lead_merged(initial_state)
+        elif new_state is not None:
+            record_transition(initial_state, new_state)
+
+        if transition.completes and export:
+            # Durable outbox; the Sheets call happens off the request path.
+            try:
+                export_completed_lead(session_id, lead.as_lead())
+            except Exception as e:
+                logger.error("[LEAD] Error queueing lead for Google Sheets: {}", e)
 
     return {
-        "handled": False,
-        "message": None,
-        "lead_completed": False
+        "handled": transition.handled,
+        "message": transition.message,
+        "lead_completed": transition.completes
     }
 
 def extract_contact_fields(text: str):
@@ -307,7 +171,7 @@ def extract_contact_fields(text: str):
             normalized_phone = None
 
     return {
-        "email": text if is_valid_email(text) else None,
+        "email": normalize_email(text) if is_valid_email(text) else None,
         "phone": normalized_phone,
         "name": name_candidate
     }
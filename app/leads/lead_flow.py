@@ -0,0 +1,158 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ----------------------------------------
+# LEAD RECORD (loaded once per turn)
+# ----------------------------------------
+@dataclass
+class LeadRecord:
+    session_id: str
+    state: str = "NONE"
+    name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    intent_summary: Optional[str] = None
+    created_at: Optional[datetime] = None
+    # Set when this session was merged into another session's lead
+    lead_session_id: Optional[str] = None
+    changes: Dict[str, str] = field(default_factory=dict)
+
+    def set(self, field_name: str, value: Optional[str]):
+        if value is None or getattr(self, field_name) == value:
+            return
+        setattr(self, field_name, value)
+        self.changes[field_name] = value
+
+    def adopt(self, lead: Dict):
+        """
+        Take over a stored lead's fields (e.g. after a merge) without marking changes.
+        """
+        for field_name in ("name", "email", "phone", "intent_summary", "created_at"):
+            setattr(self, field_name, lead.get(field_name))
+        if lead.get("session_id") != self.session_id:
+            self.lead_session_id = lead.get("session_id")
+
+    def as_lead(self) -> Dict:
+        return {
+            "session_id": self.lead_session_id or self.session_id,
+            "name": self.name,
+            "email": self.email,
+            "phone": self.phone,
+            "intent_summary": self.intent_summary,
+            "created_at": self.created_at,
+        }
+
+
+@dataclass(frozen=True)
+class TurnInput:
+    name: Optional[str]
+    email: Optional[str]
+    phone: Optional[str]
+    is_casual: bool
+
+
+@dataclass(frozen=True)
+class Transition:
+    # None keeps the current state
+    next_state: Optional[str]
+    # None means "not handled": the message falls through to normal chat
+    message: Optional[str]
+    save_name: bool = False
+
+    @property
+    def handled(self) -> bool:
+        return self.message is not None
+
+    @property
+    def completes(self) -> bool:
+        return self.next_state == "COMPLETED"
+
+
+THANK_YOU = "Thank you! Our team will reach out to you shortly!"
+PASS = Transition(None, None)
+
+# ----------------------------------------
+# GUARDS
+# ----------------------------------------
+# Evaluated against this turn's input and the record *after* opportunistic
+# email/phone from this turn were merged into it.
+GUARDS: Dict[str, Callable[[TurnInput, LeadRecord], bool]] = {
+    "casual": lambda turn, lead: turn.is_casual,
+    "name": lambda turn, lead: bool(turn.name),
+    "name+email+phone": lambda turn, lead: bool(turn.name and lead.email and lead.phone),
+    "name+email": lambda turn, lead: bool(turn.name and lead.email),
+    "gave_email+gave_phone": lambda turn, lead: bool(turn.email and turn.phone),
+    "gave_email+phone": lambda turn, lead: bool(turn.email and lead.phone),
+    "gave_email": lambda turn, lead: bool(turn.email),
+    "gave_phone": lambda turn, lead: bool(turn.phone),
+    "otherwise": lambda turn, lead: True,
+}
+
+# ----------------------------------------
+# TRANSITION TABLE
+# ----------------------------------------
+# state -> ordered (guard, transition); first matching guard wins.
+LEAD_FLOW: Dict[str, List[Tuple[str, Transition]]] = {
+    "ASKED_NAME": [
+        ("casual", PASS),
+        ("name+email+phone", Transition("COMPLETED", THANK_YOU, save_name=True)),
+        ("name+email", Transition("ASKED_PHONE", "Great! May I also have your phone number?", save_name=True)),
+        ("name", Transition("ASKED_EMAIL", "Thanks! Could you please share your email address?", save_name=True)),
+        ("gave_email+gave_phone", Transition(None, "I got your email and phone! Now, could you please tell me your name?")),
+        ("gave_email", Transition(None, "Got your email! Still need your name though. What's your name?")),
+        ("gave_phone", Transition(None, "Got your phone! But I still need your name. What's your name?")),
+        ("otherwise", Transition(None, "Could you please tell me your name?")),
+    ],
+    "ASKED_EMAIL": [
+        ("gave_email+phone", Transition("COMPLETED", THANK_YOU)),
+        ("gave_email", Transition("ASKED_PHONE", "Great. May I also have your phone number?")),
+        ("gave_phone", Transition(None, "Got your phone! I still need your email address. What's your email?")),
+        ("casual", PASS),
+        ("otherwise", Transition(None, "That doesn't seem like a valid email. Could you re-enter it?")),
+    ],
+    "ASKED_PHONE": [
+        ("gave_phone", Transition("COMPLETED", THANK_YOU)),
+        ("casual", PASS),
+        ("otherwise", Transition(None, "Please enter a valid 10-digit Indian phone number.")),
+    ],
+}
+
+
+def compile_flow(flow: Dict[str, List[Tuple[str, Transition]]], states) -> Dict:
+    """
+    Resolve guard names once and validate every target state.
+    """
+    compiled = {}
+    for state, rules in flow.items():
+        if state not in states:
+            raise ValueError(f"Unknown lead state in flow: {state}")
+        compiled_rules = []
+        for guard_name, transition in rules:
+            if guard_name not in GUARDS:
+                raise ValueError(f"Unknown guard {guard_name!r} in state {state}")
+            if transition.next_state is not None and transition.next_state not in states:
+                raise ValueError(f"Unknown target state {transition.next_state!r} from {state}")
+            compiled_rules.append((GUARDS[guard_name], transition))
+        compiled[state] = tuple(compiled_rules)
+    return compiled
+
+
+def run_lead_turn(compiled_flow: Dict, lead: LeadRecord, turn: TurnInput) -> Transition:
+    """
+    Apply one user turn to the in-memory record. No I/O.
+    """
+    # Opportunistic storage (fast-forward) in every state
+    lead.set("email", turn.email)
+    lead.set("phone", turn.phone)
+
+    for guard, transition in compiled_flow.get(lead.state, ()):
+        if not guard(turn, lead):
+            continue
+        if transition.save_name:
+            lead.set("name", turn.name)
+        if transition.next_state is not None:
+            lead.state = transition.next_state
+        return transition
+
+    return PASS
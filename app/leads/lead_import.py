@@ -0,0 +1,264 @@
+import codecs
+import csv
+import hashlib
+import json
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.leads.lead_state_service import INTENT_SUMMARY_MAX_LEN
+from app.storage.factory import get_storage
+from app.utils.validators import is_valid_email, is_valid_name, normalize_email, normalize_indian_phone
+
+# ----------------------------------------
+# BULK LEAD IMPORT
+# ----------------------------------------
+# CSV / NDJSON bodies are parsed as they stream in, validated and
+# normalized in batches, deduped against the file itself and the leads
+# table's unique email/phone keys, and written with multi-row inserts.
+
+IMPORT_FORMATS = {"csv", "ndjson"}
+DEFAULT_BATCH_SIZE = 500
+
+Record = Tuple[int, Optional[Dict], Optional[str]]
+
+
+# ----------------------------------------
+# STREAMING PARSERS
+# ----------------------------------------
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """
+    Yields (row_number, fields, parse_error). The first record is the header.
+    Quoted fields may span lines; a record is complete once its quotes balance.
+    """
+    header: Optional[List[str]] = None
+    row_number = 0
+    buffered: List[str] = []
+
+    async for line in iter_lines(chunks):
+        buffered.append(line)
+        record = "\n".join(buffered)
+        if record.count('"') % 2:
+            continue
+        buffered = []
+        if not record.strip():
+            continue
+
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [value.strip().lower() for value in values]
+            continue
+
+        row_number += 1
+        if len(values) > len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, dict(zip(header, values)), None
+
+    if buffered:
+        yield row_number + 1, None, "Unterminated quoted field"
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(fields, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, fields, None
+
+
+# ----------------------------------------
+# VALIDATION / NORMALIZATION
+# ----------------------------------------
+def import_session_id(email: Optional[str], phone: Optional[str]) -> str:
+    # Stable per contact so re-importing a file is idempotent.
+    digest = hashlib.sha1(f"{email or ''}|{phone or ''}".encode("utf-8")).hexdigest()
+    return f"import-{digest[:20]}"
+
+
+def normalize_lead_row(fields: Dict) -> Tuple[Optional[Dict], List[str]]:
+    """
+    Returns (lead, errors). lead is None when the row cannot be imported.
+    """
+    def text(column: str) -> str:
+        value = fields.get(column)
+        return str(value).strip() if value is not None else ""
+
+    errors = []
+    name = text("name")
+    email = normalize_email(text("email"))
+    phone = text("phone")
+
+    if name and not is_valid_name(name):
+        errors.append("invalid name")
+    if email and not is_valid_email(email):
+        errors.append("invalid email")
+    if phone:
+        try:
+            phone = normalize_indian_phone(phone)
+        except ValueError:
+            errors.append("invalid phone")
+    if not email and not phone:
+        errors.append("email or phone is required")
+
+    if errors:
+        return None, errors
+
+    return {
+        "session_id": text("session_id") or import_session_id(email, phone),
+        "name": name or None,
+        "email": email or None,
+        "phone": phone or None,
+        "intent_summary": text("intent_summary")[:INTENT_SUMMARY_MAX_LEN] or None,
+    }, []
+
+
+# ----------------------------------------
+# BATCH WRITER
+# ----------------------------------------
+class LeadImport:
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.rows = 0
+        self.imported = 0
+        self.errors: List[Dict] = []
+        self._batch: List[Tuple[int, Dict]] = []
+        self._seen: Dict[str, Set[str]] = {"email": set(), "phone": set(), "session_id": set()}
+
+    def _reject(self, row_number: int, errors: List[str]):
+        self.errors.append({"row": row_number, "errors": errors})
+
+    def add(self, row_number: int, fields: Optional[Dict], parse_error: Optional[str]) -> bool:
+        """
+        Validate one record. Returns True when a batch is ready to flush.
+        """
+        self.rows += 1
+        if parse_error:
+            self._reject(row_number, [parse_error])
+            return False
+
+        lead, errors = normalize_lead_row(fields)
+        if errors:
+            self._reject(row_number, errors)
+            return False
+
+        duplicates = [
+            f"duplicate {column} in file"
+            for column in ("email", "phone", "session_id")
+            if lead[column] and lead[column] in self._seen[column]
+        ]
+        if duplicates:
+            self._reject(row_number, duplicates)
+            return False
+
+        for column in ("email", "phone", "session_id"):
+            if lead[column]:
+                self._seen[column].add(lead[column])
+        self._batch.append((row_number, lead))
+        return len(self._batch) >= self.batch_size
+
+    def flush(self):
+        """
+        Drop rows whose contacts already have a lead, then insert the rest at once.
+        Runs in a worker thread; storage calls block.
+        """
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+
+        storage = get_storage()
+        existing = storage.find_existing_contacts(
+            [lead["email"] for _, lead in batch if lead["email"]],
+            [lead["phone"] for _, lead in batch if lead["phone"]],
+        )
+
+        new_leads = []
+        for row_number, lead in batch:
+            duplicates = [
+                f"{column} already exists"
+                for column in ("email", "phone")
+                if lead[column] and lead[column] in existing[column]
+            ]
+            if duplicates:
+                self._reject(row_number, duplicates)
+            else:
+                new_leads.append((row_number, lead))
+
+        inserted = storage.insert_leads([lead for _, lead in new_leads])
+        self.imported += inserted
+        if inserted < len(new_leads):
+            # Lost a race with a concurrent write (or the session_id was taken).
+            self._report_skipped(storage, new_leads)
+
+    def _report_skipped(self, storage, attempted: List[Tuple[int, Dict]]):
+        """
+        Find which attempted rows the insert skipped and why, by reading back
+        the leads now stored under their session ids.
+        """
+        stored = storage.find_lead_contacts([lead["session_id"] for _, lead in attempted])
+        skipped = []
+        for row_number, lead in attempted:
+            row = stored.get(lead["session_id"])
+            if row and (row["email"] or "").lower() == (lead["email"] or "") and row["phone"] == lead["phone"]:
+                continue
+            skipped.append((row_number, lead, row is not None))
+        if not skipped:
+            return
+
+        existing = storage.find_existing_contacts(
+            [lead["email"] for _, lead, _ in skipped if lead["email"]],
+            [lead["phone"] for _, lead, _ in skipped if lead["phone"]],
+        )
+        for row_number, lead, session_taken in skipped:
+            errors = [
+                f"{column} already exists"
+                for column in ("email", "phone")
+                if lead[column] and lead[column] in existing[column]
+            ]
+            if session_taken:
+                errors.append("session_id already exists")
+            self._reject(row_number, errors or ["skipped on unique key conflict"])
+
+    def report(self) -> Dict:
+        self.errors.sort(key=lambda error: error["row"] or 0)
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "rejected": self.rows - self.imported,
+            "errors": self.errors,
+        }
+
+
+async def import_leads(chunks: AsyncIterator[bytes], fmt: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict:
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    records = iter_csv_records(chunks) if fmt == "csv" else iter_ndjson_records(chunks)
+    job = LeadImport(batch_size)
+    async for row_number, fields, parse_error in records:
+        if job.add(row_number, fields, parse_error):
+            await run_in_threadpool(job.flush)
+    await run_in_threadpool(job.flush)
+    return job.report()
@@ -0,0 +1,157 @@
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core.config import get_settings
+from app.storage.factory import get_storage
+from app.utils.validators import normalize_indian_phone
+from app.core.logger import logger
+
+# ----------------------------------------
+# LEAD DEDUPE INDEX
+# ----------------------------------------
+# Normalized email / phone -> the lead that owns it, addressed by the lead's
+# unique session_id key. Warmed from the DB at startup, kept current by the
+# lead flow, and rebuilt periodically so writes from other workers show up.
+# The DB unique keys stay the source of truth; a stale entry only costs a
+# fallback to the normal write path.
+
+_worker_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    return email.strip().lower() if email and email.strip() else None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    if not phone or not phone.strip():
+        return None
+    try:
+        return normalize_indian_phone(phone)
+    except ValueError:
+        return phone.strip()
+
+
+class LeadIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_email: Dict[str, str] = {}
+        self._by_phone: Dict[str, str] = {}
+        self.warmed = False
+
+    def __len__(self) -> int:
+        return len(self._by_email) + len(self._by_phone)
+
+    def find(self, email: Optional[str] = None, phone: Optional[str] = None) -> Optional[str]:
+        """
+        session_id of the lead owning this email or phone (email checked first).
+        """
+        email, phone = normalize_email(email), normalize_phone(phone)
+        return (email and self._by_email.get(email)) or (phone and self._by_phone.get(phone)) or None
+
+    def add(self, lead_session_id: str, email: Optional[str] = None, phone: Optional[str] = None):
+        email, phone = normalize_email(email), normalize_phone(phone)
+        with self._lock:
+            # First owner wins, matching the DB unique keys.
+            if email:
+                self._by_email.setdefault(email, lead_session_id)
+            if phone:
+                self._by_phone.setdefault(phone, lead_session_id)
+
+    def discard(self, lead_session_id: str, email: Optional[str] = None, phone: Optional[str] = None):
+        """
+        Drop stale entries for these contacts if they still point at lead_session_id.
+        """
+        email, phone = normalize_email(email), normalize_phone(phone)
+        with self._lock:
+            if email and self._by_email.get(email) == lead_session_id:
+                del self._by_email[email]
+            if phone and self._by_phone.get(phone) == lead_session_id:
+                del self._by_phone[phone]
+
+    def replace(self, leads: Iterable[Dict]) -> Tuple[int, int]:
+        """
+        Swap in a full snapshot. Returns (entries added, entries dropped) vs the old one.
+        """
+        by_email: Dict[str, str] = {}
+        by_phone: Dict[str, str] = {}
+        for lead in leads:
+            email, phone = normalize_email(lead.get("email")), normalize_phone(lead.get("phone"))
+            if email:
+                by_email.setdefault(email, lead["session_id"])
+            if phone:
+                by_phone.setdefault(phone, lead["session_id"])
+
+        with self._lock:
+            old = set(self._by_email.items()) | {("phone", item) for item in self._by_phone.items()}
+            new = set(by_email.items()) | {("phone", item) for item in by_phone.items()}
+            self._by_email, self._by_phone = by_email, by_phone
+            self.warmed = True
+        return len(new - old), len(old - new)
+
+
+_index = LeadIndex()
+
+
+def get_lead_index() -> LeadIndex:
+    return _index
+
+
+def iter_all_lead_contacts(batch_size: int):
+    storage = get_storage()
+    after_id = 0
+    while True:
+        rows = storage.iter_lead_contacts(after_id, batch_size)
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1]["id"]
+
+
+def reconcile_lead_index() -> Dict:
+    """
+    Rebuild the index from the leads table.
+    """
+    added, dropped = _index.replace(iter_all_lead_contacts(get_settings().lead_index_batch_size))
+    return {"entries": len(_index), "added": added, "dropped": dropped}
+
+
+# ----------------------------------------
+# BACKGROUND RECONCILIATION
+# ----------------------------------------
+def _reconcile_loop(interval_seconds: float):
+    while not _stop_event.wait(interval_seconds):
+        try:
+            result = reconcile_lead_index()
+            if result["added"] or result["dropped"]:
+                logger.info("[LEAD INDEX] Reconciled: {}", result)
+        except Exception as e:
+            logger.error("[LEAD INDEX] Reconcile error: {}", e)
+
+
+def start_lead_index():
+    global _worker_thread
+    settings = get_settings()
+    if not settings.lead_index_enabled:
+        return
+    if _worker_thread and _worker_thread.is_alive():
+        return
+
+    try:
+        result = reconcile_lead_index()
+        logger.info("Lead index warmed: {} contact(s)", result["entries"])
+    except Exception as e:
+        logger.warning("Lead index warm-up failed: {}", e)
+
+    _stop_event.clear()
+    _worker_thread = threading.Thread(
+        target=_reconcile_loop,
+        args=(settings.lead_index_reconcile_seconds,),
+        name="lead-index-reconciler",
+        daemon=True,
+    )
+    _worker_thread.start()
+
+
+def stop_lead_index():
+    _stop_event.set()
@@ -1,25 +1,18 @@
-from datetime import datetime
+from functools import lru_cache
 from typing import Optional
-import pymysql
 
-from app.utils.validators import is_valid_email, is_valid_indian_phone
 from app.core.config import get_settings
+from app.services.analytics import record_lead_started
+from app.utils.keyword_matcher import KeywordMatcher, load_keyword_file
+from app.utils.validators import is_valid_email, is_valid_indian_phone
+from app.storage.factory import get_storage
+from app.core.logger import logger
+from app.core.metrics import LEAD_TRIGGERS
 
 INTENT_SUMMARY_MAX_LEN = 500
+LATEST_NEED_MAX_LEN = 120
 
 
-# ----------------------------------------
-# DB CONNECTION
-# ----------------------------------------
-def get_db_connection():
-    settings = get_settings()
-    return pymysql.connect(
-        host=settings.db_host,
-        user=settings.db_user,
-        password=settings.db_password,
-        database=settings.db_name
-    )
-
 # ----------------------------------------
 # LEAD STATES (ENUM-LIKE)
 # ----------------------------------------
@@ -42,92 +35,73 @@ LEAD_SIGNALS = [
     "services", "partnership"
 ]
 
+
+@lru_cache(maxsize=1)
+def get_lead_signal_matcher() -> KeywordMatcher:
+    """
+    Built-in signals plus any configured tenant keywords, compiled once.
+    """
+    settings = get_settings()
+    keywords = list(LEAD_SIGNALS)
+    keywords.extend(k for k in settings.lead_signal_keywords.split(",") if k.strip())
+    if settings.lead_signal_keywords_file:
+        keywords.extend(load_keyword_file(settings.lead_signal_keywords_file))
+    return KeywordMatcher(keywords, plurals=True)
+
 # ----------------------------------------
 # STATE FETCH / CREATE
 # ----------------------------------------
 def get_or_create_lead_state(session_id: str) -> str:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT current_step FROM lead_states WHERE session_id = %s",
-        (session_id,)
-    )
-    row = cursor.fetchone()
-
-    if row:
-        cursor.close()
-        conn.close()
-        return row[0]
-
-    cursor.execute(
-        """
-        INSERT INTO lead_states (session_id, current_step, updated_at)
-        VALUES (%s, %s, %s)
-        """,
-        (session_id, "NONE", datetime.utcnow())
-    )
-    conn.commit()
-
-    cursor.close()
-    conn.close()
-    return "NONE"
+    return get_storage().get_or_create_lead_state(session_id)
 
 # ----------------------------------------
 # UPDATE STATE
 # ----------------------------------------
-def update_lead_state(session_id: str, new_state: str):
+def update_lead_state(session_id: str, new_state: str, trigger: Optional[str] = None):
+    """
+    Pass trigger ("opportunistic" / "keyword" / "proactive") when this starts the lead flow.
+    """
     if new_state not in LEAD_STATES:
         raise ValueError(f"Invalid lead state: {new_state}")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        UPDATE lead_states
-        SET current_step = %s, updated_at = %s
-        WHERE session_id = %s
-        """,
-        (new_state, datetime.utcnow(), session_id)
-    )
-    conn.commit()
-
-    cursor.close()
-    conn.close()
+    get_storage().update_lead_state(session_id, new_state)
+    if trigger:
+        LEAD_TRIGGERS.labels(trigger).inc()
+        record_lead_started(session_id, trigger)
 
 # ----------------------------------------
 # SIGNAL DETECTION
 # ----------------------------------------
 def detect_lead_signal(user_message: str) -> bool:
-    msg = user_message.lower()
-    return any(keyword in msg for keyword in LEAD_SIGNALS)
+    return get_lead_signal_matcher().search(user_message)
 
 # ----------------------------------------
 # SHOULD START LEAD COLLECTION?
 # ----------------------------------------
-def should_start_lead_flow(session_id: str, user_message: str) -> bool:
+def should_start_lead_flow(session_id: str, user_message: str, current_state: Optional[str] = None) -> bool:
     """
     Decides whether to flip lead_state from NONE → ASK_NAME
     using 3 triggers:
     1. Opportunistic (email/phone dropped)
     2. Explicit intent
     3. Proactive engagement
+    Pass current_state when the caller already loaded it this turn.
     """
 
-    current_state = get_or_create_lead_state(session_id)
+    if current_state is None:
+        current_state = get_or_create_lead_state(session_id)
 
     # Lead flow already active
     if current_state != "NONE":
-        print(f"[DETECT] Lead flow already active: {current_state}")
+        logger.debug("[DETECT] Lead flow already active: {}", current_state)
         return True
 
     # --------------------------------
     # 1. Opportunistic trigger
     # --------------------------------
     if detect_opportunistic_contact(user_message):
-        print(f"[DETECT] Opportunistic contact detected")
-        update_lead_state(session_id, "ASKED_NAME")
+        logger.debug("[DETECT] Opportunistic contact detected")
+        update_lead_state(session_id, "ASKED_NAME", trigger="opportunistic")
         store_intent_summary(session_id, user_message)
         return True
 
@@ -135,8 +109,8 @@ def should_start_lead_flow(session_id: str, user_message: str) -> bool:
     # 2. Explicit intent trigger
     # --------------------------------
     if detect_lead_signal(user_message):
-        print(f"[DETECT] Lead signal detected")
-        update_lead_state(session_id, "ASKED_NAME")
+        logger.debug("[DETECT] Lead signal detected")
+        update_lead_state(session_id, "ASKED_NAME", trigger="keyword")
         store_intent_summary(session_id, user_message)
         return True
 
@@ -144,15 +118,15 @@ def should_start_lead_flow(session_id: str, user_message: str) -> bool:
     # 3. Proactive engagement trigger
     # --------------------------------
     user_turns = count_user_messages(session_id)
-    print(f"[DETECT] User turns: {user_turns}")
+    logger.debug("[DETECT] User turns: {}", user_turns)
 
     if user_turns >= 4:  # safe default
-        print(f"[DETECT] Threshold reached (4+ messages)")
-        update_lead_state(session_id, "ASKED_NAME")
+        logger.debug("[DETECT] Threshold reached (4+ messages)")
+        update_lead_state(session_id, "ASKED_NAME", trigger="proactive")
         store_intent_summary(session_id, "User showed sustained interest after multiple messages")
         return True
 
-    print(f"[DETECT] No lead trigger")
+    logger.debug("[DETECT] No lead trigger")
     return False
 
 # ----------------------------------------
@@ -171,21 +145,7 @@ def next_lead_question(session_id: str) -> Optional[str]:
     return None
 
 def count_user_messages(session_id: str) -> int:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        SELECT COUNT(*) FROM chats
-        WHERE session_id = %s AND sender = 'user'
-        """,
-        (session_id,)
-    )
-
-    count = cursor.fetchone()[0]
-    cursor.close()
-    conn.close()
-    return count
+    return get_storage().count_user_messages(session_id)
 
 def detect_opportunistic_contact(user_message: str) -> bool:
     text = user_message.strip()
@@ -193,58 +153,98 @@ def detect_opportunistic_contact(user_message: str) -> bool:
 
 def get_conversation_summary(session_id: str) -> str:
     """
-    Build a concise intent summary from user conversation.
+    Build a concise intent summary from the session's running aggregates.
     """
-    messages = get_conversation_messages(session_id)
-    if not messages:
-        return ""
-
-    user_msgs = [
-        msg.strip()
-        for sender, msg in messages
-        if str(sender).lower() == "user" and msg and msg.strip()
-    ]
-    if not user_msgs:
+    aggregates = get_storage().get_session_aggregates(session_id)
+    if aggregates is None:
+        # Session predates the aggregates table; seed it once from history.
+        aggregates = aggregate_messages(get_conversation_messages(session_id))
+        if not aggregates["user_message_count"]:
+            return ""
+        get_storage().save_session_aggregates(session_id, aggregates)
+
+    if not aggregates["user_message_count"]:
         return ""
 
     parts = []
-    detected_topics = extract_lead_topics(" ".join(user_msgs))
+    detected_topics = sorted(aggregates["topics"], key=get_lead_signal_matcher().priority)[:5]
     if detected_topics:
         parts.append(f"User intent: interested in {', '.join(detected_topics)}")
     else:
         parts.append("User intent: seeking information and support")
 
-    parts.append(f"Engagement: {len(user_msgs)} user message(s)")
+    parts.append(f"Engagement: {aggregates['user_message_count']} user message(s)")
 
-    question_count = sum(1 for msg in user_msgs if "?" in msg)
-    if question_count:
-        parts.append(f"Questioning behavior: asked {question_count} question(s)")
+    if aggregates["question_count"]:
+        parts.append(f"Questioning behavior: asked {aggregates['question_count']} question(s)")
 
-    if any(detect_opportunistic_contact(msg) for msg in user_msgs):
+    if aggregates["has_contact"]:
         parts.append("Contact signal: user shared direct contact details")
 
-    latest_need = shorten_text(user_msgs[-1], 120)
-    parts.append(f"Latest user need: {latest_need}")
+    parts.append(f"Latest user need: {aggregates['latest_need']}")
 
     return shorten_text(" | ".join(parts), INTENT_SUMMARY_MAX_LEN)
 
 
-def get_conversation_messages(session_id: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        SELECT sender, message FROM chats
-        WHERE session_id = %s
-        ORDER BY id ASC
-        """,
-        (session_id,)
+# ----------------------------------------
+# SESSION AGGREGATES
+# ----------------------------------------
+def record_user_message(session_id: str, user_message: str):
+    """
+    Fold a just-saved user message into the session aggregates (O(1)),
+    so summaries never rescan the chat history.
+    """
+    text = (user_message or "").strip()
+    if not text:
+        return
+
+    storage = get_storage()
+    created = storage.record_session_message(
+        session_id,
+        find_lead_topics(text),
+        "?" in text,
+        detect_opportunistic_contact(text),
+        shorten_text(text, LATEST_NEED_MAX_LEN),
     )
-    messages = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return messages
+
+    # First aggregate for a session that already had messages: rebuild once.
+    if created and count_user_messages(session_id) > 1:
+        storage.save_session_aggregates(
+            session_id, aggregate_messages(get_conversation_messages(session_id))
+        )
+
+
+def aggregate_messages(messages) -> dict:
+    """
+    Aggregates for a full (sender, message) history; used only for seeding.
+    """
+    aggregates = {
+        "user_message_count": 0,
+        "question_count": 0,
+        "has_contact": False,
+        "topics": [],
+        "latest_need": "",
+    }
+    for sender, msg in messages:
+        text = msg.strip() if msg else ""
+        if str(sender).lower() != "user" or not text:
+            continue
+
+        aggregates["user_message_count"] += 1
+        if "?" in text:
+            aggregates["question_count"] += 1
+        if not aggregates["has_contact"] and detect_opportunistic_contact(text):
+            aggregates["has_contact"] = True
+        for topic in find_lead_topics(text):
+            if topic not in aggregates["topics"]:
+                aggregates["topics"].append(topic)
+        aggregates["latest_need"] = shorten_text(text, LATEST_NEED_MAX_LEN)
+
+    return aggregates
+
+
+def get_conversation_messages(session_id: str):
+    return get_storage().get_conversation_messages(session_id)
 
 
 def shorten_text(text: str, max_len: int) -> str:
@@ -258,16 +258,13 @@ def shorten_text(text: str, max_len: int) -> str:
     return text[: max_len - len(marker)].rstrip() + marker
 
 
-def extract_lead_topics(text: str):
-    text_lower = text.lower()
-    topics = []
+def find_lead_topics(text: str):
+    return get_lead_signal_matcher().find_all(text)
 
-    for topic in LEAD_SIGNALS:
-        if topic in text_lower and topic not in topics:
-            topics.append(topic)
 
+def extract_lead_topics(text: str):
     # Keep summary compact and stable.
-    return topics[:5]
+    return find_lead_topics(text)[:5]
 
 # ----------------------------------------
 # STORE INTENT SUMMARY
@@ -278,46 +275,15 @@ def store_intent_summary(session_id: str, intent_message: str):
     Includes the trigger message + conversation context.
     Updates existing summary so context is not stale.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Check existing lead row
-    cursor.execute(
-        "SELECT intent_summary FROM leads WHERE session_id = %s",
-        (session_id,)
-    )
-    row = cursor.fetchone()
-    
     # Build intent summary with conversation context
     conversation = get_conversation_summary(session_id)
     if conversation:
         full_intent = f"Trigger: {intent_message} | {conversation}"
     else:
         full_intent = f"Trigger: {intent_message}"
-    
-    # Insert or update so summary keeps improving over the session.
-    if row:
-        cursor.execute(
-            """
-            UPDATE leads
-            SET intent_summary = %s
-            WHERE session_id = %s
-            """,
-            (full_intent[:INTENT_SUMMARY_MAX_LEN], session_id)
-        )
-    else:
-        # Insert new record with intent
-        cursor.execute(
-            """
-            INSERT INTO leads (session_id, intent_summary, created_at)
-            VALUES (%s, %s, %s)
-            """,
-            (session_id, full_intent[:INTENT_SUMMARY_MAX_LEN], datetime.utcnow())
-        )
 
-    conn.commit()
-    cursor.close()
-    conn.close()
+    # Insert or update so summary keeps improving over the session.
+    get_storage().save_intent_summary(session_id, full_intent[:INTENT_SUMMARY_MAX_LEN])
 
 
 def refresh_intent_summary_from_conversation(session_id: str):
@@ -329,34 +295,4 @@ def refresh_intent_summary_from_conversation(session_id: str):
     if not conversation:
         return
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "SELECT id FROM leads WHERE session_id = %s",
-            (session_id,)
-        )
-        row = cursor.fetchone()
-
-        if row:
-            cursor.execute(
-                """
-                UPDATE leads
-                SET intent_summary = %s
-                WHERE session_id = %s
-                """,
-                (conversation[:INTENT_SUMMARY_MAX_LEN], session_id)
-            )
-        else:
-            cursor.execute(
-                """
-                INSERT INTO leads (session_id, intent_summary, created_at)
-                VALUES (%s, %s, %s)
-                """,
-                (session_id, conversation[:INTENT_SUMMARY_MAX_LEN], datetime.utcnow())
-            )
-        conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
-
+    get_storage().save_intent_summary(session_id, conversation[:INTENT_SUMMARY_MAX_LEN])
@@ -0,0 +1,199 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.logger import logger
+
+# ----------------------------------------
+# ADMISSION CONTROL
+# ----------------------------------------
+# 1. Token buckets per session_id and per X-Public-Key reject floods with
+#    429 before they reach the DB or Azure. Buckets live in-process by
+#    default; rate_limit_backend="redis" shares them across workers
+#    (needs the optional `redis` package).
+# 2. A global gate caps in-flight LLM calls. A request waits briefly for a
+#    slot, then is shed to the canned fallback replies.
+
+MAX_LOCAL_BUCKETS = 100_000
+
+
+class RateLimited(Exception):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded for {scope}")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class LocalBuckets:
+    """
+    In-process token buckets; least recently used keys are evicted.
+    """
+
+    def __init__(self, max_keys: int = MAX_LOCAL_BUCKETS):
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+
+    def take(self, key: str, capacity: int, rate_per_second: float) -> Tuple[bool, float]:
+        """
+        Spend one token. Returns (allowed, seconds until a token is available).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - updated) * rate_per_second)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1.0 - tokens) / rate_per_second
+
+
+# Atomic refill-and-take on the Redis server clock.
+REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(retry)}
+"""
+
+
+class RedisBuckets:
+    """
+    Token buckets shared through Redis. While Redis is unreachable, limits
+    fall back to per-worker buckets for `retry_seconds` at a time, so
+    requests don't each pay a connect timeout; one request then probes.
+    """
+
+    def __init__(self, url: str, retry_seconds: float = 30.0):
+        # Optional dependency, only needed for shared limits.
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._script = self._client.register_script(REDIS_TOKEN_BUCKET)
+        self._fallback = LocalBuckets()
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._healthy = True
+        self._retry_at = 0.0
+
+    def _use_redis(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._retry_at:
+                return False
+            if not self._healthy:
+                # This request probes; the rest stay local until it answers.
+                self._retry_at = now + self.retry_seconds
+            return True
+
+    def _mark(self, healthy: bool, error: Optional[Exception] = None):
+        with self._lock:
+            self._retry_at = 0.0 if healthy else time.monotonic() + self.retry_seconds
+            changed = healthy != self._healthy
+            self._healthy = healthy
+        # Logged on state changes only, not per request.
+        if changed and healthy:
+            logger.info("[ADMISSION] Redis limiter reachable again; using shared buckets")
+        elif changed:
+            logger.warning(
+                "[ADMISSION] Redis limiter unavailable, using local buckets (retry every {}s): {}",
+                self.retry_seconds, error,
+            )
+
+    def take(self, key: str, capacity: int, rate_per_second: float) -> Tuple[bool, float]:
+        if self._use_redis():
+            try:
+                allowed, retry = self._script(keys=[f"ratelimit:{key}"], args=[capacity, rate_per_second])
+            except Exception as e:
+                # Redis down: keep limiting per worker rather than failing requests.
+                self._mark(False, e)
+            else:
+                if not self._healthy:
+                    self._mark(True)
+                return bool(int(allowed)), float(retry)
+        return self._fallback.take(key, capacity, rate_per_second)
+
+
+@lru_cache(maxsize=1)
+def get_buckets():
+    settings = get_settings()
+    if settings.rate_limit_backend == "redis":
+        try:
+            return RedisBuckets(settings.rate_limit_redis_url, settings.rate_limit_redis_retry_seconds)
+        except ImportError:
+            logger.warning("redis package not installed; using in-process rate limits")
+    return LocalBuckets()
+
+
+def check_rate_limits(session_id: str, public_key: Optional[str] = None):
+    """
+    Raise RateLimited if the session or the public key is over its budget.
+    """
+    settings = get_settings()
+    if not settings.rate_limit_enabled:
+        return
+
+    buckets = get_buckets()
+    limits = [(
+        "session", f"session:{session_id}",
+        settings.rate_limit_session_burst, settings.rate_limit_session_per_minute,
+    )]
+    if public_key:
+        limits.append((
+            "public_key", f"key:{public_key}",
+            settings.rate_limit_key_burst, settings.rate_limit_key_per_minute,
+        ))
+
+    for scope, key, burst, per_minute in limits:
+        allowed, retry_after = buckets.take(key, burst, per_minute / 60.0)
+        if not allowed:
+            raise RateLimited(scope, retry_after)
+
+
+def retry_after_header(error: RateLimited) -> str:
+    return str(max(1, math.ceil(error.retry_after)))
+
+
+# ----------------------------------------
+# LLM CONCURRENCY GATE
+# ----------------------------------------
+@lru_cache(maxsize=1)
+def _llm_gate() -> threading.BoundedSemaphore:
+    return threading.BoundedSemaphore(max(1, get_settings().llm_max_concurrency))
+
+
+def acquire_llm_slot(blocking: bool = True) -> bool:
+    """
+    Wait up to llm_queue_wait_seconds for an LLM slot. False means shed load.
+    blocking=False only takes a free slot, so background work never queues
+    ahead of requests. Pair a True result with release_llm_slot().
+    """
+    if not blocking:
+        return _llm_gate().acquire(blocking=False)
+    return _llm_gate().acquire(timeout=get_settings().llm_queue_wait_seconds)
+
+
+def release_llm_slot():
+    _llm_gate().release()
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.storage.factory import get_storage
+from app.core.logger import logger
+
+# ----------------------------------------
+# LEAD ANALYTICS ROLLUPS
+# ----------------------------------------
+# Counters are bumped as lead states change, one multi-row upsert into
+# analytics_daily per transition. /api/analytics reads only these rows,
+# never chats or lead_states.
+#
+# Metrics per UTC day:
+#   leads_started, leads_completed
+#   trigger:<opportunistic|keyword|proactive>
+#   funnel:<ASKED_NAME|ASKED_EMAIL|ASKED_PHONE|COMPLETED>  sessions reaching the step
+#   topic:<keyword>                                        topics of started leads
+#
+# A session that turns out to be a repeat visitor (merged into another
+# session's lead) is taken back out of leads_started, leads_completed and
+# the funnel; trigger and topic counts still describe its conversation.
+
+TRIGGERS = ("opportunistic", "keyword", "proactive")
+FUNNEL = ("ASKED_NAME", "ASKED_EMAIL", "ASKED_PHONE", "COMPLETED")
+TOP_TOPICS = 10
+MAX_DAYS = 366
+
+
+def today() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d")
+
+
+def _record(counts: Dict[str, int]):
+    # Analytics must never break the chat path.
+    try:
+        get_storage().increment_rollups(today(), counts)
+    except Exception as e:
+        logger.warning("[ANALYTICS] Could not record {}: {}", sorted(counts), e)
+
+
+def record_lead_started(session_id: str, trigger: str):
+    counts = {"leads_started": 1, f"trigger:{trigger}": 1, "funnel:ASKED_NAME": 1}
+    try:
+        aggregates = get_storage().get_session_aggregates(session_id) or {}
+    except Exception:
+        aggregates = {}
+    for topic in aggregates.get("topics", []):
+        counts[f"topic:{topic}"] = 1
+    _record(counts)
+
+
+def record_transition(old_state: str, new_state: str):
+    """
+    Count every funnel step passed, so fast-forwards (ASKED_NAME -> COMPLETED)
+    still show up at ASKED_EMAIL and ASKED_PHONE.
+    """
+    if new_state not in FUNNEL:
+        return
+    start = FUNNEL.index(old_state) + 1 if old_state in FUNNEL else 0
+    end = FUNNEL.index(new_state) + 1
+    counts = {f"funnel:{state}": 1 for state in FUNNEL[start:end]}
+    if new_state == "COMPLETED" and old_state != "COMPLETED":
+        counts["leads_completed"] = 1
+    if counts:
+        _record(counts)
+
+
+def record_lead_merged(state_before: str):
+    """
+    Undo what a session counted as a lead of its own once it is merged into
+    an existing lead. Callers skip record_transition for merged sessions.
+    """
+    if state_before not in FUNNEL:
+        return  # flow never started for this session, nothing was counted
+    counts = {f"funnel:{state}": -1 for state in FUNNEL[:FUNNEL.index(state_before) + 1]}
+    counts["leads_started"] = -1
+    if state_before == "COMPLETED":
+        counts["leads_completed"] = -1
+    _record(counts)
+
+
+# ----------------------------------------
+# READ SIDE
+# ----------------------------------------
+def build_analytics(days: int = 30, since: Optional[str] = None) -> Dict:
+    days = max(1, min(days, MAX_DAYS))
+    since = since or (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+
+    per_day: Dict[str, Dict[str, int]] = {}
+    totals: Dict[str, int] = {}
+    for day, metric, count in get_storage().fetch_rollups(since):
+        per_day.setdefault(day, {})[metric] = count
+        totals[metric] = totals.get(metric, 0) + count
+
+    funnel: List[Dict] = []
+    previous = None
+    for state in FUNNEL:
+        sessions = totals.get(f"funnel:{state}", 0)
+        step = {"state": state, "sessions": sessions}
+        if previous is not None:
+            step["drop_off"] = round(1 - sessions / previous, 4) if previous else None
+        funnel.append(step)
+        previous = sessions
+
+    topics = sorted(
+        ((metric.split(":", 1)[1], count) for metric, count in totals.items() if metric.startswith("topic:")),
+        key=lambda item: (-item[1], item[0]),
+    )
+
+    return {
+        "since": since,
+        "leads_per_day": [
+            {
+                "day": day,
+                "started": metrics.get("leads_started", 0),
+                "completed": metrics.get("leads_completed", 0),
+            }
+            for day, metrics in sorted(per_day.items())
+        ],
+        "triggers": {trigger: totals.get(f"trigger:{trigger}", 0) for trigger in TRIGGERS},
+        "funnel": funnel,
+        "top_topics": [{"topic": topic, "leads": count} for topic, count in topics[:TOP_TOPICS]],
+    }
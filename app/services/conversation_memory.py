@@ -0,0 +1,171 @@
+import queue
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.storage.factory import get_storage
+from app.core.logger import logger
+from app.services.admission import acquire_llm_slot, release_llm_slot
+
+# ----------------------------------------
+# CONVERSATION MEMORY
+# ----------------------------------------
+# The prompt carries a running summary of older turns plus the last few
+# messages verbatim. Folding older turns into the summary happens on a
+# background thread after the reply is sent, never on the request path.
+
+# (previous_summary, [{"sender", "message"}]) -> new summary
+Summarizer = Callable[[str, List[Dict]], str]
+
+FOLD_BATCH_MAX = 50
+
+_summarizer: Optional[Summarizer] = None
+_jobs: "queue.Queue[str]" = queue.Queue()
+_pending = set()
+_pending_lock = threading.Lock()
+_worker_thread: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+
+
+def format_chat_lines(chats: List[Dict]) -> str:
+    return "\n".join(f"{chat['sender']}: {chat['message']}" for chat in chats)
+
+
+def extractive_summary(previous_summary: str, messages: List[Dict]) -> str:
+    """
+    Fallback when no LLM summarizer is configured:
+    keep the most recent lines that fit the budget.
+    """
+    max_chars = get_settings().memory_summary_max_chars
+    lines = [previous_summary] if previous_summary else []
+    lines.extend(
+        f"{msg['sender']}: {' '.join(str(msg['message']).split())[:200]}"
+        for msg in messages
+    )
+    summary = "\n".join(lines)
+    if len(summary) <= max_chars:
+        return summary
+    return summary[-max_chars:].split("\n", 1)[-1]
+
+
+def set_summarizer(summarizer: Optional[Summarizer]):
+    global _summarizer
+    _summarizer = summarizer
+
+
+# ----------------------------------------
+# PROMPT SIDE (request path, reads only)
+# ----------------------------------------
+def build_prompt_memory(session_id: str) -> Tuple[str, str]:
+    """
+    Returns (summary, recent_chats) for the prompt.
+    Verbatim turns are the ones not yet folded into the summary, capped so the
+    prompt never exceeds the old 20-message window even if folding lags.
+    """
+    settings = get_settings()
+    storage = get_storage()
+
+    if not settings.memory_enabled:
+        chats = storage.retrieve_chats(session_id, settings.memory_max_verbatim_messages)
+        return "", format_chat_lines(reversed(chats))
+
+    # Summary and recent chats from one connection (and one snapshot).
+    with storage.transaction():
+        memory = storage.get_conversation_memory(session_id) or {}
+        chats = storage.retrieve_chats(session_id, settings.memory_max_verbatim_messages)
+    through_id = memory.get("summarized_through_id") or 0
+
+    verbatim = [chat for chat in chats if chat["id"] > through_id]
+    # Always keep the last few turns verbatim, even if they were folded.
+    if len(verbatim) < settings.memory_recent_messages:
+        verbatim = chats[:settings.memory_recent_messages]
+
+    return memory.get("summary") or "", format_chat_lines(reversed(verbatim))
+
+
+# ----------------------------------------
+# FOLDING (background)
+# ----------------------------------------
+def fold_session(session_id: str) -> bool:
+    """
+    Fold turns older than the verbatim window into the running summary.
+    Returns True if the summary was updated.
+    """
+    settings = get_settings()
+    storage = get_storage()
+
+    recent = storage.retrieve_chats(session_id, settings.memory_recent_messages)
+    if len(recent) < settings.memory_recent_messages:
+        return False
+    window_start_id = min(chat["id"] for chat in recent)
+
+    memory = storage.get_conversation_memory(session_id) or {}
+    through_id = memory.get("summarized_through_id") or 0
+
+    pending = [
+        chat for chat in storage.fetch_chats_after(session_id, through_id, FOLD_BATCH_MAX)
+        if chat["id"] < window_start_id
+    ]
+    if len(pending) < settings.memory_fold_threshold:
+        return False
+
+    summarizer = _summarizer or extractive_summary
+    if summarizer is not extractive_summary and not acquire_llm_slot(blocking=False):
+        # Chat requests hold every LLM slot; the next turn schedules this again.
+        logger.debug("[MEMORY] No free LLM slot, skipping fold for {}", session_id)
+        return False
+    try:
+        summary = summarizer(memory.get("summary") or "", pending)
+    except Exception as e:
+        logger.warning("[MEMORY] Summarizer failed, using extractive fallback: {}", e)
+        summary = extractive_summary(memory.get("summary") or "", pending)
+    finally:
+        if summarizer is not extractive_summary:
+            release_llm_slot()
+
+    storage.save_conversation_memory(
+        session_id,
+        summary[:settings.memory_summary_max_chars],
+        pending[-1]["id"]
+    )
+    return True
+
+
+def _memory_loop():
+    while True:
+        session_id = _jobs.get()
+        with _pending_lock:
+            _pending.discard(session_id)
+        try:
+            # Drain in case a long backlog accumulated for this session.
+            while fold_session(session_id):
+                pass
+        except Exception as e:
+            logger.error("[MEMORY] Fold failed for {}: {}", session_id, e)
+        finally:
+            _jobs.task_done()
+
+
+def _ensure_worker():
+    global _worker_thread
+    with _worker_lock:
+        if _worker_thread and _worker_thread.is_alive():
+            return
+        _worker_thread = threading.Thread(target=_memory_loop, name="memory-worker", daemon=True)
+        _worker_thread.start()
+
+
+def schedule_fold(session_id: str):
+    """
+    Queue a background fold for this session (deduplicated while queued).
+    """
+    if not get_settings().memory_enabled:
+        return
+
+    with _pending_lock:
+        if session_id in _pending:
+            return
+        _pending.add(session_id)
+
+    _ensure_worker()
+    _jobs.put(session_id)
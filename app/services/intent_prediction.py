@@ -0,0 +1,277 @@
+import json
+import queue
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.storage.factory import get_storage
+from app.core.logger import logger
+from app.core.metrics import record_cache
+
+# ----------------------------------------
+# LLM INTENT PREDICTION (off the request path)
+# ----------------------------------------
+# Completed leads are queued here instead of waiting on a second LLM round
+# trip inside /chat. The request writes the outbox row straight away, held
+# back as "awaiting_intent"; the worker drains several sessions per run,
+# asks the predictor for all of them in one batch call, attaches the
+# summaries and releases the rows to the Sheets exporter. Rows still held
+# after a crash or restart are re-queued by start_intent_worker().
+
+# [user transcript, ...] -> [intent summary, ...] (same order)
+IntentPredictor = Callable[[List[str]], List[str]]
+
+INTENT_CHAT_WINDOW = 50
+INTENT_CACHE_MAX = 1024
+
+_predictor: Optional[IntentPredictor] = None
+# (session_id, outbox id); None tells the worker to stop.
+_jobs: "queue.Queue[Optional[Tuple[str, int]]]" = queue.Queue()
+_pending = set()
+_pending_lock = threading.Lock()
+_worker_thread: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+_stopping = threading.Event()
+
+RECOVER_BATCH = 500
+
+# (session_id, user message count) -> summary; a new message invalidates it.
+_cache: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def set_intent_predictor(predictor: Optional[IntentPredictor]):
+    global _predictor
+    _predictor = predictor
+
+
+def load_user_transcript(session_id: str) -> Tuple[int, str]:
+    """
+    (watermark, transcript): the session's user message count and its last
+    INTENT_CHAT_WINDOW chats' user lines, oldest first.
+    """
+    storage = get_storage()
+    chats = storage.retrieve_chats(session_id, INTENT_CHAT_WINDOW)
+    lines = [chat["message"] for chat in reversed(chats) if chat["sender"] == "user"]
+    return storage.count_user_messages(session_id), "\n".join(lines)
+
+
+def _cache_get(key: Tuple[str, int]) -> Optional[str]:
+    with _cache_lock:
+        summary = _cache.get(key)
+        if summary is not None:
+            _cache.move_to_end(key)
+        return summary
+
+
+def _cache_put(key: Tuple[str, int], summary: str):
+    with _cache_lock:
+        _cache[key] = summary
+        _cache.move_to_end(key)
+        while len(_cache) > INTENT_CACHE_MAX:
+            _cache.popitem(last=False)
+
+
+def predict_intents(session_ids: List[str]) -> Dict[str, str]:
+    """
+    Intent summary per session. Cache hits skip the LLM; misses go to the
+    predictor in a single batch call.
+    """
+    if _predictor is None:
+        raise RuntimeError("No intent predictor configured")
+
+    results: Dict[str, str] = {}
+    misses: List[Tuple[Tuple[str, int], str]] = []
+    for session_id in dict.fromkeys(session_ids):
+        watermark, transcript = load_user_transcript(session_id)
+        key = (session_id, watermark)
+        cached = _cache_get(key)
+        record_cache("intent", cached is not None)
+        if cached is not None:
+            results[session_id] = cached
+        else:
+            misses.append((key, transcript))
+
+    if misses:
+        summaries = _predictor([transcript for _, transcript in misses])
+        for (key, _), summary in zip(misses, summaries):
+            _cache_put(key, summary)
+            results[key[0]] = summary
+
+    return results
+
+
+# ----------------------------------------
+# ATTACH + EXPORT
+# ----------------------------------------
+def attach_and_export(session_id: str, summary: Optional[str], export_id: Optional[int] = None):
+    """
+    Save the summary on the session's lead and export it: release the held
+    outbox row `export_id`, or queue a new one when there is none.
+    """
+    # Imported here: lead_extractor pulls in the lead flow and outbox.
+    from app.integrations.sheets_outbox import release_lead_export
+    from app.leads.lead_extractor import export_completed_lead
+    from app.leads.lead_state_service import INTENT_SUMMARY_MAX_LEN
+
+    storage = get_storage()
+    lead = storage.get_lead(session_id)
+    if lead is None:
+        logger.warning("[INTENT] No lead for {}; nothing to export", session_id)
+        return
+
+    if summary:
+        # The leads column keeps a bounded copy; the export gets it in full.
+        storage.save_intent_summary(lead["session_id"], summary[:INTENT_SUMMARY_MAX_LEN])
+        lead["intent_summary"] = summary
+    if export_id is None:
+        export_completed_lead(session_id, lead)
+    else:
+        release_lead_export(export_id, lead)
+
+
+def process_intent_batch(jobs: List[Tuple[str, int]]):
+    try:
+        summaries = predict_intents([session_id for session_id, _ in jobs])
+    except Exception as e:
+        # Export anyway with the rule-based summary already on the lead.
+        logger.error("[INTENT] Prediction failed for {} session(s): {}", len(jobs), e)
+        summaries = {}
+
+    for session_id, export_id in jobs:
+        try:
+            attach_and_export(session_id, summaries.get(session_id), export_id)
+        except Exception as e:
+            # The row stays held and is picked up again on the next start.
+            logger.error("[INTENT] Export failed for {}: {}", session_id, e)
+
+
+# ----------------------------------------
+# BACKGROUND WORKER
+# ----------------------------------------
+def _next_batch() -> Tuple[List[Tuple[str, int]], bool]:
+    """
+    (jobs, stop): up to intent_batch_size jobs, and whether the stop marker
+    was reached.
+    """
+    settings = get_settings()
+    job = _jobs.get()
+    if job is None:
+        return [], True
+
+    batch, stop = [job], False
+    # Give other completions a moment to join this LLM call.
+    while len(batch) < settings.intent_batch_size:
+        try:
+            job = _jobs.get(timeout=settings.intent_batch_wait_seconds)
+        except queue.Empty:
+            break
+        if job is None:
+            stop = True
+            break
+        batch.append(job)
+
+    with _pending_lock:
+        _pending.difference_update(session_id for session_id, _ in batch)
+    return batch, stop
+
+
+def _intent_loop():
+    while True:
+        batch, stop = _next_batch()
+        try:
+            if batch:
+                process_intent_batch(batch)
+        finally:
+            for _ in range(len(batch) + stop):
+                _jobs.task_done()
+        if stop:
+            return
+
+
+def _ensure_worker():
+    global _worker_thread
+    with _worker_lock:
+        if _worker_thread and _worker_thread.is_alive():
+            return
+        _worker_thread = threading.Thread(target=_intent_loop, name="intent-worker", daemon=True)
+        _worker_thread.start()
+
+
+def _enqueue(session_id: str, export_id: int):
+    with _pending_lock:
+        if session_id in _pending:
+            return
+        _pending.add(session_id)
+
+    _ensure_worker()
+    _jobs.put((session_id, export_id))
+
+
+def schedule_intent_export(session_id: str):
+    """
+    Write the completed lead's outbox row now, held for its predicted intent,
+    and queue the prediction (deduplicated while queued).
+    Without a predictor the lead is exported straight away.
+    """
+    if _predictor is None or _stopping.is_set():
+        attach_and_export(session_id, None)
+        return
+
+    # Imported here: lead_extractor pulls in the lead flow and outbox.
+    from app.leads.lead_extractor import export_completed_lead
+
+    lead = get_storage().get_lead(session_id)
+    if lead is None:
+        logger.warning("[INTENT] No lead for {}; nothing to export", session_id)
+        return
+    export_id = export_completed_lead(session_id, lead, hold=True)
+    if export_id is not None:
+        _enqueue(session_id, export_id)
+
+
+def recover_held_exports() -> int:
+    """
+    Re-queue outbox rows left awaiting intent by a previous process; without
+    a predictor they are released as they are. Releasing is conditional, so
+    a row also picked up by a sibling worker is only exported once.
+    """
+    held = get_storage().list_held_lead_exports(RECOVER_BATCH)
+    for row in held:
+        try:
+            session_id = json.loads(row["payload"]).get("chat_session_id") or row["session_id"]
+        except (TypeError, ValueError):
+            session_id = row["session_id"]
+        if _predictor is None:
+            attach_and_export(session_id, None, row["id"])
+        else:
+            _enqueue(session_id, row["id"])
+    if held:
+        logger.info("[INTENT] Re-queued {} held export(s)", len(held))
+    return len(held)
+
+
+def start_intent_worker():
+    _stopping.clear()
+    try:
+        recover_held_exports()
+    except Exception as e:
+        logger.warning("[INTENT] Could not recover held exports: {}", e)
+
+
+def stop_intent_worker():
+    """
+    Stop taking new jobs and let the worker finish what is queued, up to
+    intent_drain_seconds. Anything left is still held in the outbox.
+    """
+    _stopping.set()
+    with _worker_lock:
+        worker = _worker_thread
+    if worker is None or not worker.is_alive():
+        return
+    _jobs.put(None)
+    worker.join(get_settings().intent_drain_seconds)
+    if worker.is_alive():
+        logger.warning("[INTENT] Worker still busy after {}s; {} job(s) left for the next start",
+                       get_settings().intent_drain_seconds, _jobs.qsize())
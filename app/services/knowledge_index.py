@@ -0,0 +1,278 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy
+
+from app.core.config import get_settings
+from app.core.logger import logger
+
+# ----------------------------------------
+# SHARED KNOWLEDGE INDEX
+# ----------------------------------------
+# The PDF knowledge base is embedded once and written to versioned files:
+#
+#   <knowledge_index_dir>/<fingerprint>/
+#       manifest.json   counts, dimensions, chunking, embedding deployment
+#       vectors.npy     float32 [chunks, dimensions]
+#       chunks.jsonl    one {"page_content", "metadata"} per line
+#       offsets.npy     int64 byte offsets of each line (+ end)
+#
+# Every process maps these read-only, so N gunicorn workers share one copy of
+# the vectors and chunk text in the page cache instead of each building its
+# own FAISS index and Document list. The fingerprint covers the PDF bytes,
+# chunking and embedding deployment; changing any of them builds a new
+# version. A file lock makes sure only one process on the node builds it.
+
+FORMAT_VERSION = 1
+EMBEDDING_DEPLOYMENT = "text-embedding-3-small"
+EMBEDDING_API_VERSION = "2024-12-01-preview"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+
+def azure_embeddings():
+    from langchain_openai import AzureOpenAIEmbeddings
+
+    settings = get_settings()
+    return AzureOpenAIEmbeddings(
+        azure_endpoint=settings.azure_openai_endpoint,
+        api_key=settings.openai_api_key,
+        deployment=EMBEDDING_DEPLOYMENT,
+        api_version=EMBEDDING_API_VERSION,
+    )
+
+
+def list_pdfs(folder: str) -> List[str]:
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name for name in os.listdir(folder) if name.lower().endswith(".pdf"))
+
+
+def load_pdf_chunks(folder: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+    """
+    PDF pages split into LangChain Documents, as the retriever has always indexed them.
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    docs = []
+    for file in list_pdfs(folder):
+        try:
+            docs.extend(PyPDFLoader(os.path.join(folder, file)).load())
+            logger.info("Loaded PDF: {}", file)
+        except Exception as e:
+            logger.warning("Error loading {}: {}", file, e)
+
+    if not docs:
+        return []
+    logger.info("Found {} document pages", len(docs))
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return splitter.split_documents(docs)
+
+
+def index_fingerprint(folder: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> str:
+    digest = hashlib.sha256(
+        f"v{FORMAT_VERSION}|{EMBEDDING_DEPLOYMENT}|{chunk_size}|{chunk_overlap}".encode("utf-8")
+    )
+    for name in list_pdfs(folder):
+        digest.update(name.encode("utf-8"))
+        with open(os.path.join(folder, name), "rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+# ----------------------------------------
+# BUILD
+# ----------------------------------------
+def write_index(path: str, chunks, vectors, manifest: Dict):
+    """
+    Write a complete index into `path` (a directory that must not exist yet).
+    """
+    os.makedirs(path)
+    matrix = numpy.asarray(vectors, dtype=numpy.float32)
+    numpy.save(os.path.join(path, "vectors.npy"), matrix)
+
+    offsets = [0]
+    with open(os.path.join(path, "chunks.jsonl"), "wb") as handle:
+        for chunk in chunks:
+            line = json.dumps(
+                {"page_content": chunk.page_content, "metadata": chunk.metadata},
+                ensure_ascii=False, default=str,
+            ).encode("utf-8") + b"\n"
+            handle.write(line)
+            offsets.append(offsets[-1] + len(line))
+    numpy.save(os.path.join(path, "offsets.npy"), numpy.asarray(offsets, dtype=numpy.int64))
+
+    manifest = {**manifest, "count": int(matrix.shape[0]), "dimensions": int(matrix.shape[1])}
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2)
+
+
+def build_knowledge_index(folder: str, embeddings, index_dir: str, fingerprint: Optional[str] = None) -> Optional[str]:
+    """
+    Embed the PDFs and publish them as <index_dir>/<fingerprint>.
+    Returns the version directory, or None when there is nothing to index.
+    """
+    fingerprint = fingerprint or index_fingerprint(folder)
+    chunks = load_pdf_chunks(folder)
+    if not chunks:
+        return None
+
+    started = time.perf_counter()
+    vectors = embeddings.embed_documents([chunk.page_content for chunk in chunks])
+    target = os.path.join(index_dir, fingerprint)
+    staging = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    write_index(staging, chunks, vectors, {
+        "format": FORMAT_VERSION,
+        "fingerprint": fingerprint,
+        "embedding_deployment": EMBEDDING_DEPLOYMENT,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "sources": list_pdfs(folder),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    })
+    # Readers only ever look at complete directories.
+    os.rename(staging, target)
+    logger.info("[KB] Built index {}: {} chunks in {:.1f}s", fingerprint, len(chunks), time.perf_counter() - started)
+
+    # Old versions stay readable by processes that already mapped them.
+    for name in os.listdir(index_dir):
+        old = os.path.join(index_dir, name)
+        if name != fingerprint and not name.startswith(".") and os.path.isdir(old):
+            shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+class _BuildLock:
+    """
+    Exclusive flock on <index_dir>/.build.lock; a no-op where fcntl is missing.
+    """
+
+    def __init__(self, index_dir: str):
+        self.path = os.path.join(index_dir, ".build.lock")
+        self._handle = None
+
+    def __enter__(self):
+        try:
+            import fcntl
+        except ImportError:
+            return self
+        self._handle = open(self.path, "a")
+        fcntl.flock(self._handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._handle is not None:
+            self._handle.close()  # releases the lock
+
+
+def ensure_knowledge_index(folder: str, embeddings, index_dir: str) -> Optional[str]:
+    """
+    Path of the current index version, building it first if no process has.
+    """
+    if not list_pdfs(folder):
+        return None
+
+    fingerprint = index_fingerprint(folder)
+    target = os.path.join(index_dir, fingerprint)
+    if os.path.exists(os.path.join(target, "manifest.json")):
+        return target
+
+    os.makedirs(index_dir, exist_ok=True)
+    with _BuildLock(index_dir):
+        # Another worker may have finished while we waited for the lock.
+        if os.path.exists(os.path.join(target, "manifest.json")):
+            return target
+        return build_knowledge_index(folder, embeddings, index_dir, fingerprint)
+
+
+# ----------------------------------------
+# READ (memory-mapped)
+# ----------------------------------------
+class MappedVectorStore:
+    """
+    Exact L2 search over a memory-mapped vectors.npy (the same ranking as
+    FAISS IndexFlatL2, which FAISS.from_documents uses). Chunk text is read
+    from the mapped chunks.jsonl only for the hits. Read-only, thread-safe.
+    """
+
+    def __init__(self, path: str, embeddings):
+        from langchain_core.documents import Document
+
+        self._document = Document
+        self.path = path
+        self.embeddings = embeddings
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as handle:
+            self.manifest = json.load(handle)
+
+        self.vectors = numpy.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.offsets = numpy.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        # One small private array per worker; the matrix itself stays shared.
+        self.norms = numpy.einsum("ij,ij->i", self.vectors, self.vectors)
+        with open(os.path.join(path, "chunks.jsonl"), "rb") as handle:
+            self._chunks = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return int(self.vectors.shape[0])
+
+    def _chunk(self, index: int):
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        record = json.loads(self._chunks[start:end])
+        return self._document(page_content=record["page_content"], metadata=record["metadata"])
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[object, float]]:
+        query = numpy.asarray(embedding, dtype=numpy.float32)
+        # |v - q|^2 = |v|^2 - 2 v.q + |q|^2, without materialising v - q.
+        distances = self.norms - 2.0 * (self.vectors @ query) + float(query @ query)
+        k = min(k, len(distances))
+        if k <= 0:
+            return []
+        nearest = numpy.argpartition(distances, k - 1)[:k]
+        nearest = nearest[numpy.argsort(distances[nearest])]
+        return [(self._chunk(int(index)), float(distances[index])) for index in nearest]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4):
+        return [document for document, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4):
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k)
+
+    def as_retriever(self, search_kwargs: Optional[Dict] = None, **_):
+        return MappedRetriever(self, (search_kwargs or {}).get("k", 4))
+
+
+class MappedRetriever:
+    def __init__(self, store: MappedVectorStore, k: int):
+        self.store = store
+        self.k = k
+
+    def invoke(self, query: str, **_):
+        return self.store.similarity_search(query, self.k)
+
+
+def open_knowledge_index(folder: str, embeddings, index_dir: Optional[str] = None) -> Optional[MappedVectorStore]:
+    """
+    Map the current index for `folder`, building it once per node if needed.
+    """
+    index_dir = index_dir or get_settings().knowledge_index_dir
+    path = ensure_knowledge_index(folder, embeddings, index_dir)
+    if path is None:
+        return None
+    store = MappedVectorStore(path, embeddings)
+    logger.info("[KB] Mapped index {} ({} chunks, {} dims)", os.path.basename(path), len(store), store.vectors.shape[1])
+    return store
+
+
+if __name__ == "__main__":
+    # Build ahead of deploy:  python -m app.services.knowledge_index [pdf_folder]
+    import sys
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else get_settings().knowledge_pdf_dir
+    print(ensure_knowledge_index(folder, azure_embeddings(), get_settings().knowledge_index_dir))
@@ -0,0 +1,188 @@
+import gzip
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+from app.storage.base import StorageBackend
+from app.storage.factory import get_storage
+from app.core.logger import logger
+
+# ----------------------------------------
+# SESSION RETENTION
+# ----------------------------------------
+# Idle sessions are moved out of the hot `chats` table into gzipped JSONL
+# files partitioned by the day of the session's last message:
+#
+#   <archive_dir>/YYYY-MM-DD/chats-<run_id>.jsonl.gz
+#
+# A compact row per session is kept in `chat_archives`, then the hot rows
+# are deleted in bounded batches so no single statement holds locks for long,
+# along with the session's derived state (conversation memory summary and
+# the running aggregates behind its intent summary).
+
+_worker_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+
+
+def archive_path_for(archive_dir: str, day: datetime, run_id: str) -> str:
+    return os.path.join(archive_dir, day.strftime("%Y-%m-%d"), f"chats-{run_id}.jsonl.gz")
+
+
+def write_session_archive(storage: StorageBackend, session: Dict, archive_file, batch_size: int) -> Dict:
+    """
+    Stream one session's chats into an open gzip file, batch by batch.
+    Returns counters plus the highest archived id (rows above it are left alone).
+    """
+    session_id = session["session_id"]
+    last_id = 0
+    message_count = 0
+    user_message_count = 0
+
+    while True:
+        rows = storage.fetch_chats_after(session_id, last_id, batch_size)
+        if not rows:
+            break
+
+        for row in rows:
+            timestamp = row["timestamp"]
+            record = {
+                "id": row["id"],
+                "session_id": session_id,
+                "sender": row["sender"],
+                "message": row["message"],
+                "timestamp": timestamp.isoformat() if timestamp else None,
+            }
+            archive_file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            message_count += 1
+            if str(row["sender"]).lower() == "user":
+                user_message_count += 1
+        last_id = rows[-1]["id"]
+
+    return {
+        "max_id": last_id,
+        "message_count": message_count,
+        "user_message_count": user_message_count,
+    }
+
+
+def save_archive_summary(storage: StorageBackend, session: Dict, archived: Dict, archive_path: str):
+    session_id = session["session_id"]
+    storage.save_chat_archive({
+        "session_id": session_id,
+        "message_count": archived["message_count"],
+        "user_message_count": archived["user_message_count"],
+        "first_message_at": session["first_message_at"],
+        "last_message_at": session["last_message_at"],
+        "lead_step": storage.get_lead_state(session_id),
+        "archive_path": archive_path,
+        "archived_at": datetime.utcnow(),
+    })
+    storage.delete_lead_state(session_id)
+
+
+def purge_session_state(storage: StorageBackend, session_id: str):
+    """
+    Drop per-session rows derived from the purged chats. A session that comes
+    back starts them afresh from whatever history is left.
+    """
+    storage.delete_conversation_memory(session_id)
+    storage.delete_session_aggregates(session_id)
+
+
+def run_retention_once(now: Optional[datetime] = None) -> Dict:
+    """
+    Archive and purge sessions idle for longer than the configured TTL.
+    Safe to re-run: rows are only deleted after their archive file is fsynced.
+    """
+    settings = get_settings()
+    storage = get_storage()
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=settings.session_idle_ttl_hours)
+    batch_size = max(1, settings.retention_batch_size)
+    run_id = now.strftime("%Y%m%d%H%M%S") + f"-{os.getpid()}"
+
+    if not storage.has_chat_timestamps():
+        logger.warning("[RETENTION] chats has no timestamp column, cannot detect idle sessions")
+        return {"sessions": 0, "messages": 0}
+
+    open_files: Dict[str, tuple] = {}
+    archived_sessions = []
+    purged = 0
+    try:
+        sessions = storage.find_idle_sessions(cutoff, settings.retention_max_sessions_per_run)
+
+        # Phase 1: copy to cold storage
+        for session in sessions:
+            day = session["last_message_at"] or now
+            path = archive_path_for(settings.retention_archive_dir, day, run_id)
+            if path not in open_files:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                raw = open(path, "ab")
+                open_files[path] = (raw, gzip.GzipFile(fileobj=raw, mode="ab"))
+            archived = write_session_archive(storage, session, open_files[path][1], batch_size)
+            if archived["message_count"]:
+                archived_sessions.append((session, archived, path))
+
+        for raw, archive_file in open_files.values():
+            archive_file.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+            raw.close()
+        open_files.clear()
+
+        # Phase 2: summarize and purge hot rows
+        for session, archived, path in archived_sessions:
+            save_archive_summary(storage, session, archived, path)
+            purged += storage.delete_chats_through(session["session_id"], archived["max_id"], batch_size)
+            purge_session_state(storage, session["session_id"])
+    except Exception as e:
+        logger.error("[RETENTION] Run failed: {}", e)
+        raise
+    finally:
+        for raw, archive_file in open_files.values():
+            archive_file.close()
+            raw.close()
+
+    logger.info("[RETENTION] Archived {} session(s), purged {} chat row(s)", len(archived_sessions), purged)
+    return {"sessions": len(archived_sessions), "messages": purged}
+
+
+# ----------------------------------------
+# BACKGROUND WORKER
+# ----------------------------------------
+def _retention_loop(interval_seconds: int):
+    while not _stop_event.wait(interval_seconds):
+        try:
+            run_retention_once()
+        except Exception as e:
+            logger.error("[RETENTION] Error: {}", e)
+
+
+def start_retention_worker():
+    global _worker_thread
+    settings = get_settings()
+    if not settings.retention_enabled:
+        return
+    if _worker_thread and _worker_thread.is_alive():
+        return
+
+    _stop_event.clear()
+    _worker_thread = threading.Thread(
+        target=_retention_loop,
+        args=(max(60, settings.retention_interval_seconds),),
+        name="retention-worker",
+        daemon=True,
+    )
+    _worker_thread.start()
+    logger.info("Retention worker started")
+
+
+def stop_retention_worker():
+    _stop_event.set()
+
+
+if __name__ == "__main__":
+    print(run_retention_once())
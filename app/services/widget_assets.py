@@ -0,0 +1,206 @@
+import hashlib
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Optional
+
+from app.core.logger import logger
+from app.utils.compression import available_encodings, choose_encoding, compress
+
+# ----------------------------------------
+# CHATBOT WIDGET ASSET
+# ----------------------------------------
+# chatbot.js loads on every page view of every customer site, so it is
+# prepared once per process: minified, precompressed at maximum level
+# (gzip, plus brotli when installed) and hashed. Two URLs serve it:
+#
+#   /chatbot.js          the URL customers embed; short max-age with
+#                        stale-while-revalidate, ETag and 304s
+#   /chatbot.<hash>.js   content-addressed; cached for a year, immutable
+#
+# A stale hash (old embed after a deploy) redirects to the current one.
+
+CHATBOT_JS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "chatbot.js")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "instanceof"}
+_SPACES = re.compile(r"[ \t]+")
+_NEWLINE_RUNS = re.compile(r" ?\n[ \n]*")
+
+
+def minify_js(source: str) -> str:
+    """
+    Conservative minifier: drops comments, indentation, blank lines and
+    repeated spaces outside string, template and regex literals. Newlines are
+    kept so automatic semicolon insertion behaves exactly as before.
+    """
+    out = []
+    code = []  # pending code text, normalised on flush
+    i, n = 0, len(source)
+    template_depth = []  # brace depth inside each open ${ ... }
+
+    def flush():
+        if code:
+            # Literals are copied verbatim; only code whitespace is squeezed.
+            out.append(_NEWLINE_RUNS.sub("\n", _SPACES.sub(" ", "".join(code))))
+            code.clear()
+
+    def last_significant() -> str:
+        return "".join(code).rstrip() or "".join(out).rstrip()
+
+    while i < n:
+        ch = source[i]
+        nxt = source[i + 1] if i + 1 < n else ""
+
+        if ch == "/" and nxt == "/":
+            end = source.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        if ch == "/" and nxt == "*":
+            end = source.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            code.append(" ")
+            continue
+
+        if ch in "'\"`" or (ch == "}" and template_depth and template_depth[-1] == 0):
+            flush()
+            if ch == "}":
+                template_depth.pop()
+                quote, start = "`", i
+                i += 1
+            else:
+                quote, start = ch, i
+                i += 1
+            while i < n:
+                c = source[i]
+                if c == "\\":
+                    i += 2
+                    continue
+                if c == quote:
+                    i += 1
+                    break
+                if quote == "`" and c == "$" and source[i + 1:i + 2] == "{":
+                    i += 2
+                    template_depth.append(0)
+                    break
+                if quote != "`" and c == "\n":
+                    break
+                i += 1
+            out.append(source[start:i])
+            continue
+
+        if ch == "/":
+            previous = last_significant()
+            word = re.search(r"[A-Za-z_$]+$", previous)
+            if not previous or previous[-1] in _REGEX_PRECEDERS or (word and word.group() in _REGEX_KEYWORDS):
+                flush()
+                start, in_class = i, False
+                i += 1
+                while i < n and source[i] != "\n":
+                    c = source[i]
+                    if c == "\\":
+                        i += 2
+                        continue
+                    if c == "[":
+                        in_class = True
+                    elif c == "]":
+                        in_class = False
+                    elif c == "/" and not in_class:
+                        i += 1
+                        break
+                    i += 1
+                while i < n and source[i].isalpha():  # flags
+                    i += 1
+                out.append(source[start:i])
+                continue
+
+        if template_depth:
+            if ch == "{":
+                template_depth[-1] += 1
+            elif ch == "}":
+                template_depth[-1] -= 1
+
+        code.append(ch)
+        i += 1
+    flush()
+
+    return "".join(out).strip() + "\n"
+
+
+class StaticAsset:
+    """
+    One file's bytes, precompressed variants and content-hash ETag.
+    """
+
+    def __init__(self, name: str, body: bytes, media_type: str):
+        self.name = name
+        self.media_type = media_type
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.etag = f'"{self.digest}"'
+        self.variants: Dict[Optional[str], bytes] = {None: body}
+        for encoding in available_encodings():
+            compressed = compress(body, encoding, level=11 if encoding == "br" else 9)
+            if len(compressed) < len(body):
+                self.variants[encoding] = compressed
+
+    @property
+    def versioned_path(self) -> str:
+        stem, ext = os.path.splitext(self.name)
+        return f"/{stem}.{self.digest}{ext}"
+
+    def select(self, accept_encoding: Optional[str]):
+        """
+        (encoding or None, body) for this client.
+        """
+        offered = [encoding for encoding in self.variants if encoding]
+        encoding = choose_encoding(accept_encoding, offered)
+        return encoding, self.variants[encoding]
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        # Each representation gets its own strong validator.
+        return self.etag if encoding is None else f'"{self.digest}-{encoding}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """
+        If-None-Match against any representation of the current content.
+        """
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag.strip('"').split("-")[0] == self.digest:
+                return True
+        return False
+
+
+@lru_cache(maxsize=1)
+def get_widget_asset() -> Optional[StaticAsset]:
+    """
+    Minified, precompressed chatbot.js; None when the file is missing.
+    """
+    try:
+        with open(CHATBOT_JS_PATH, encoding="utf-8") as handle:
+            source = handle.read()
+    except FileNotFoundError:
+        logger.warning("[WIDGET] {} not found", CHATBOT_JS_PATH)
+        return None
+
+    try:
+        body = minify_js(source).encode("utf-8")
+    except Exception as e:
+        # Serving the widget matters more than saving bytes.
+        logger.warning("[WIDGET] Minifying chatbot.js failed, serving it as is: {}", e)
+        body = source.encode("utf-8")
+    asset = StaticAsset("chatbot.js", body, "application/javascript; charset=utf-8")
+    logger.info(
+        "[WIDGET] chatbot.js {} -> {} bytes ({}), immutable URL {}",
+        len(source.encode("utf-8")), len(body),
+        ", ".join(f"{encoding} {len(data)}" for encoding, data in asset.variants.items() if encoding) or "uncompressed",
+        asset.versioned_path,
+    )
+    return asset
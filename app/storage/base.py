@@ -0,0 +1,276 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class StorageBackend(ABC):
+    """
+    Persistence for chats, lead states and leads.
+    Implementations: MySQLStorage (production), SQLiteStorage (embedded / local).
+    """
+
+    name = "base"
+
+    # ----------------------------------------
+    # LIFECYCLE
+    # ----------------------------------------
+    @abstractmethod
+    def migrate(self) -> Dict:
+        """Create missing tables/indexes and return detected schema facts."""
+
+    def close(self):
+        """Release any pooled resources."""
+
+    @contextmanager
+    def transaction(self):
+        """Group storage calls on this thread into one commit, where supported."""
+        yield None
+
+    def after_commit(self, callback: Callable[[], None]):
+        """Run `callback` once the open transaction commits; here, immediately."""
+        callback()
+
+    # ----------------------------------------
+    # CHATS
+    # ----------------------------------------
+    @abstractmethod
+    def save_chat_message(self, session_id: str, message: str, sender: str):
+        ...
+
+    @abstractmethod
+    def retrieve_chats(self, session_id: str, limit: int = 20) -> List[Dict]:
+        """Latest `limit` chats (id, message, sender) for a session, newest first."""
+
+    @abstractmethod
+    def page_chats(self, session_id: str, before_id: Optional[int], limit: int) -> List[Dict]:
+        """Keyset page of chats with id < before_id, newest first."""
+
+    @abstractmethod
+    def iter_chats(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        sender: Optional[str] = None,
+        session_id: Optional[str] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict]:
+        """Stream matching chats oldest first without loading them all."""
+
+    @abstractmethod
+    def count_user_messages(self, session_id: str) -> int:
+        ...
+
+    @abstractmethod
+    def get_conversation_messages(self, session_id: str) -> List[Tuple[str, str]]:
+        """All (sender, message) pairs for a session, oldest first."""
+
+    # ----------------------------------------
+    # LEAD STATES
+    # ----------------------------------------
+    @abstractmethod
+    def get_lead_state(self, session_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def get_or_create_lead_state(self, session_id: str) -> str:
+        ...
+
+    @abstractmethod
+    def update_lead_state(self, session_id: str, new_state: str):
+        ...
+
+    @abstractmethod
+    def delete_lead_state(self, session_id: str):
+        ...
+
+    # ----------------------------------------
+    # LEADS
+    # ----------------------------------------
+    @abstractmethod
+    def get_lead(self, session_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def upsert_lead_field(self, session_id: str, field: str, value: str):
+        ...
+
+    @abstractmethod
+    def upsert_lead_fields(self, session_id: str, fields: Dict[str, str]) -> Dict:
+        """
+        Merge any subset of lead fields in one write.
+        Returns {"conflicts": {field: other_session_id}} for emails/phones
+        already owned by another session's lead.
+        """
+
+    @abstractmethod
+    def save_intent_summary(self, session_id: str, summary: str):
+        ...
+
+    @abstractmethod
+    def load_lead_record(self, session_id: str) -> Dict:
+        """
+        Lead state (created as NONE if missing) and lead row in one transaction:
+        {"state": str, "lead": dict | None}
+        """
+
+    @abstractmethod
+    def save_lead_turn(
+        self,
+        session_id: str,
+        new_state: Optional[str],
+        fields: Dict[str, str],
+        lead_session_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        Persist a turn's state change and lead field changes in one transaction.
+        Fields go to lead_session_id's lead when the session was merged into it.
+        Returns the same conflict report as upsert_lead_fields.
+        """
+
+    @abstractmethod
+    def merge_lead_session(self, session_id: str, lead_session_id: str, fields: Dict[str, str]) -> Optional[Dict]:
+        """
+        Attach session_id to the existing lead keyed by lead_session_id, filling
+        its empty fields from `fields` (and the session's own partial row, which
+        is removed). Returns the merged lead, or None if that lead is gone or
+        the schema has no lead_sessions table.
+        """
+
+    @abstractmethod
+    def has_lead_sessions(self) -> bool:
+        ...
+
+    @abstractmethod
+    def iter_lead_contacts(self, after_id: int, limit: int) -> List[Dict]:
+        """Keyset page of {"id", "session_id", "email", "phone"} for leads with contacts."""
+
+    @abstractmethod
+    def find_existing_contacts(self, emails: List[str], phones: List[str]) -> Dict[str, set]:
+        """Which of the given emails/phones already have a lead: {"email": set, "phone": set}."""
+
+    @abstractmethod
+    def find_lead_contacts(self, session_ids: List[str]) -> Dict[str, Dict]:
+        """{session_id: {"email", "phone"}} for the given sessions that have a lead row."""
+
+    @abstractmethod
+    def insert_leads(self, leads: List[Dict]) -> int:
+        """
+        Multi-row insert of new leads (session_id, name, email, phone, intent_summary).
+        Rows hitting a unique key are skipped; returns the number inserted.
+        """
+
+    # ----------------------------------------
+    # RETENTION
+    # ----------------------------------------
+    @abstractmethod
+    def has_chat_timestamps(self) -> bool:
+        ...
+
+    @abstractmethod
+    def find_idle_sessions(self, cutoff: datetime, limit: int) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def fetch_chats_after(self, session_id: str, after_id: int, limit: int) -> List[Dict]:
+        """Chats with id > after_id, oldest first, including id and timestamp."""
+
+    @abstractmethod
+    def delete_chats_through(self, session_id: str, max_id: int, batch_size: int) -> int:
+        """Delete chats with id <= max_id in batches; returns rows deleted."""
+
+    @abstractmethod
+    def save_chat_archive(self, summary: Dict):
+        ...
+
+    # ----------------------------------------
+    # CONVERSATION MEMORY
+    # ----------------------------------------
+    @abstractmethod
+    def get_conversation_memory(self, session_id: str) -> Optional[Dict]:
+        """Running summary and the last chat id folded into it."""
+
+    @abstractmethod
+    def save_conversation_memory(self, session_id: str, summary: str, summarized_through_id: int):
+        ...
+
+    @abstractmethod
+    def delete_conversation_memory(self, session_id: str):
+        ...
+
+    # ----------------------------------------
+    # SESSION AGGREGATES
+    # ----------------------------------------
+    @abstractmethod
+    def get_session_aggregates(self, session_id: str) -> Optional[Dict]:
+        """
+        {"user_message_count", "question_count", "has_contact", "topics", "latest_need"}
+        with topics as a list in first-seen order.
+        """
+
+    @abstractmethod
+    def record_session_message(
+        self,
+        session_id: str,
+        topics: List[str],
+        is_question: bool,
+        has_contact: bool,
+        latest_need: str,
+    ) -> bool:
+        """Fold one user message into the aggregates. True if the row was just created."""
+
+    @abstractmethod
+    def save_session_aggregates(self, session_id: str, aggregates: Dict):
+        """Overwrite the aggregates (used to seed sessions from existing history)."""
+
+    @abstractmethod
+    def delete_session_aggregates(self, session_id: str):
+        ...
+
+    # ----------------------------------------
+    # ANALYTICS ROLLUPS
+    # ----------------------------------------
+    @abstractmethod
+    def increment_rollups(self, day: str, counts: Dict[str, int]):
+        """Add `counts` to the (day, metric) counters in one statement."""
+
+    @abstractmethod
+    def fetch_rollups(self, since_day: str) -> List[Tuple[str, str, int]]:
+        """(day, metric, count) rows for days >= since_day."""
+
+    # ----------------------------------------
+    # LEAD EXPORT OUTBOX
+    # ----------------------------------------
+    @abstractmethod
+    def enqueue_lead_export(self, session_id: str, payload: str, status: str = "pending") -> int:
+        """
+        status "awaiting_intent" holds the row back from the exporter until
+        release_lead_export() attaches the predicted intent.
+        """
+
+    @abstractmethod
+    def release_lead_export(self, export_id: int, payload: str) -> bool:
+        """Replace a held row's payload and make it due now. False if it was not held."""
+
+    @abstractmethod
+    def list_held_lead_exports(self, limit: int) -> List[Dict]:
+        """Rows still awaiting intent: {"id", "session_id", "payload"}."""
+
+    @abstractmethod
+    def claim_lead_exports(self, limit: int, lease_seconds: int) -> List[Dict]:
+        """
+        Lease up to `limit` due pending exports so other exporters skip them.
+        Rows: {"id", "session_id", "payload", "attempts"}.
+        """
+
+    @abstractmethod
+    def lead_export_exists(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def mark_lead_exports_sent(self, export_ids: List[int]):
+        ...
+
+    @abstractmethod
+    def mark_lead_export_failed(self, export_id: int, attempts: int, error: str, next_attempt_at: Optional[datetime]):
+        """Reschedule at next_attempt_at, or dead-letter when it is None."""
@@ -0,0 +1,23 @@
+from functools import lru_cache
+
+from app.core.config import get_settings
+from app.storage.base import StorageBackend
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    """
+    Process-wide storage backend selected by STORAGE_BACKEND (mysql | sqlite).
+    Drivers are imported lazily so SQLite runs without pymysql installed.
+    """
+    backend = get_settings().storage_backend.lower()
+
+    if backend == "sqlite":
+        from app.storage.sqlite_backend import SQLiteStorage
+        return SQLiteStorage()
+
+    if backend == "mysql":
+        from app.storage.mysql_backend import MySQLStorage
+        return MySQLStorage()
+
+    raise ValueError(f"Unknown storage backend: {backend}")
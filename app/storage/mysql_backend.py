@@ -0,0 +1,153 @@
+import threading
+from typing import Dict, Sequence
+
+import pymysql
+
+from app.core.config import get_settings
+from app.core.migrations import inspect_schema, run_migrations
+from app.storage.sql_backend import SQLStorage
+
+# ----------------------------------------
+# PREPARED STATEMENTS
+# ----------------------------------------
+CHAT_INSERT_WITH_TIMESTAMP = """
+    INSERT INTO chats (session_id, message, sender, timestamp)
+    VALUES (%s, %s, %s, NOW())
+"""
+
+CHAT_INSERT_WITHOUT_TIMESTAMP = """
+    INSERT INTO chats (session_id, message, sender)
+    VALUES (%s, %s, %s)
+"""
+
+
+class MySQLStorage(SQLStorage):
+    name = "mysql"
+    integrity_errors = (pymysql.err.IntegrityError,)
+
+    def __init__(self):
+        settings = get_settings()
+        missing = [
+            name.upper() for name in ("db_host", "db_user", "db_password", "db_name")
+            if getattr(settings, name) is None
+        ]
+        if missing:
+            raise ValueError(f"storage_backend=mysql needs {', '.join(missing)}")
+        self._schema_lock = threading.Lock()
+        self._schema: Dict = {}
+
+    # ----------------------------------------
+    # DIALECT
+    # ----------------------------------------
+    def _connect(self):
+        settings = get_settings()
+        return pymysql.connect(
+            host=settings.db_host,
+            user=settings.db_user,
+            password=settings.db_password,
+            database=settings.db_name
+        )
+
+    def _upsert_sql(
+        self,
+        table: str,
+        columns: Sequence[str],
+        key_columns: Sequence[str],
+        updates: Dict[str, str],
+        rows: int = 1,
+    ) -> str:
+        placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * rows)
+        key = key_columns[0]
+        assignments = ", ".join(
+            f"{column} = " + expression.format(
+                old=column, new=f"VALUES({column})", old_key=key, new_key=f"VALUES({key})"
+            )
+            for column, expression in updates.items()
+        )
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {placeholders} "
+            f"ON DUPLICATE KEY UPDATE {assignments}"
+        )
+
+    def _insert_ignore_sql(self, table: str, columns: Sequence[str], rows: int = 1) -> str:
+        placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * rows)
+        return f"INSERT IGNORE INTO {table} ({', '.join(columns)}) VALUES {placeholders}"
+
+    # ----------------------------------------
+    # SCHEMA
+    # ----------------------------------------
+    def _inspect(self) -> Dict:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            try:
+                schema = inspect_schema(cursor)
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+
+        with self._schema_lock:
+            self._schema.update(schema)
+        return schema
+
+    def migrate(self) -> Dict:
+        # Cache what already exists first, so a failing migration still
+        # leaves the hot paths with correct facts.
+        self._inspect()
+
+        conn = self._connect()
+        try:
+            schema = run_migrations(conn)
+        finally:
+            conn.close()
+
+        with self._schema_lock:
+            self._schema.update(schema)
+        return dict(self._schema)
+
+    def _schema_fact(self, key: str) -> bool:
+        # Read-only introspection if startup migrations did not run; DDL
+        # never runs from a request.
+        if key not in self._schema:
+            self._inspect()
+        return self._schema[key]
+
+    def has_chat_timestamps(self) -> bool:
+        return self._schema_fact("chats_has_timestamp")
+
+    def lead_session_is_unique(self) -> bool:
+        return self._schema_fact("leads_session_unique")
+
+    def has_lead_sessions(self) -> bool:
+        return self._schema_fact("has_lead_sessions")
+
+    # ----------------------------------------
+    # CHATS
+    # ----------------------------------------
+    def save_chat_message(self, session_id: str, message: str, sender: str):
+        sql = CHAT_INSERT_WITH_TIMESTAMP if self.has_chat_timestamps() else CHAT_INSERT_WITHOUT_TIMESTAMP
+        with self.transaction() as cursor:
+            self._execute(cursor, sql, (session_id, message, sender))
+
+    # ----------------------------------------
+    # RETENTION
+    # ----------------------------------------
+    def delete_chats_through(self, session_id: str, max_id: int, batch_size: int) -> int:
+        deleted = 0
+        while True:
+            with self.transaction() as cursor:
+                self._execute(
+                    cursor,
+                    """
+                    DELETE FROM chats
+                    WHERE session_id = %s AND id <= %s
+                    ORDER BY id
+                    LIMIT %s
+                    """,
+                    (session_id, max_id, batch_size)
+                )
+                batch_deleted = cursor.rowcount
+            deleted += batch_deleted
+            if batch_deleted < batch_size:
+                return deleted
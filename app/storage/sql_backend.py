@@ -0,0 +1,959 @@
+import threading
+import uuid
+from abc import abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.metrics import DB_CONNECTIONS_IN_USE, DB_CONNECTIONS_OPENED, DB_ERRORS, stage
+from app.storage.base import StorageBackend
+
+LEAD_FIELDS = {"name", "email", "phone", "intent_summary"}
+CONTACT_FIELDS = ("email", "phone")
+
+
+def to_datetime(value) -> Optional[datetime]:
+    # Aggregates such as MAX(timestamp) come back as text from SQLite.
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+class SQLStorage(StorageBackend):
+    """
+    Shared SQL for DB-API backends.
+    Statements use %s placeholders; dialects translate them in `_sql`.
+    """
+
+    # Driver exceptions for a write that hits a unique key.
+    integrity_errors: Tuple[type, ...] = ()
+
+    # ----------------------------------------
+    # DIALECT HOOKS
+    # ----------------------------------------
+    @abstractmethod
+    def _connect(self):
+        """Open (or reuse) a DB-API connection."""
+
+    def _release(self, conn):
+        conn.close()
+
+    def _sql(self, sql: str) -> str:
+        return sql
+
+    @abstractmethod
+    def _upsert_sql(
+        self,
+        table: str,
+        columns: Sequence[str],
+        key_columns: Sequence[str],
+        updates: Dict[str, str],
+        rows: int = 1,
+    ) -> str:
+        """
+        INSERT ... upsert for the dialect.
+        `updates` maps column -> expression using {old} and {new},
+        e.g. {"count": "{old} + {new}", "name": "{new}"}.
+        {old_key} / {new_key} refer to the first key column.
+        """
+
+    @abstractmethod
+    def _insert_ignore_sql(self, table: str, columns: Sequence[str], rows: int = 1) -> str:
+        """
+        Multi-row INSERT that skips rows violating any unique key.
+        """
+
+    # ----------------------------------------
+    # HELPERS
+    # ----------------------------------------
+    @property
+    def _open_transaction(self) -> threading.local:
+        # Per thread, so request threads and background workers never share one.
+        local = self.__dict__.get("_tx_local")
+        if local is None:
+            local = self.__dict__.setdefault("_tx_local", threading.local())
+        return local
+
+    @contextmanager
+    def transaction(self):
+        """
+        One connection and one commit for the block. A nested transaction()
+        on the same thread joins the outer one, so callers can group several
+        storage calls into a single atomic write.
+        """
+        current = self._open_transaction
+        if getattr(current, "cursor", None) is not None:
+            yield current.cursor
+            return
+
+        with stage("db"):
+            conn = self._connect()
+            DB_CONNECTIONS_OPENED.inc()
+            DB_CONNECTIONS_IN_USE.inc()
+            cursor = conn.cursor()
+            current.cursor = cursor
+            current.on_commit = []
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                DB_ERRORS.inc()
+                conn.rollback()
+                raise
+            finally:
+                current.cursor = None
+                callbacks, current.on_commit = current.on_commit, []
+                cursor.close()
+                self._release(conn)
+                DB_CONNECTIONS_IN_USE.dec()
+        # Only reached after a successful commit.
+        for callback in callbacks:
+            callback()
+
+    def after_commit(self, callback: Callable[[], None]):
+        """
+        Run `callback` once the open transaction on this thread commits
+        (dropped on rollback), or right away when none is open.
+        """
+        current = self._open_transaction
+        if getattr(current, "cursor", None) is None:
+            callback()
+        else:
+            current.on_commit.append(callback)
+
+    def _execute(self, cursor, sql: str, params: Tuple = ()):
+        cursor.execute(self._sql(sql), params)
+        return cursor
+
+    def _fetchone(self, sql: str, params: Tuple = ()):
+        with self.transaction() as cursor:
+            return self._execute(cursor, sql, params).fetchone()
+
+    def _fetchall(self, sql: str, params: Tuple = ()):
+        with self.transaction() as cursor:
+            return self._execute(cursor, sql, params).fetchall()
+
+    # ----------------------------------------
+    # CHATS
+    # ----------------------------------------
+    def retrieve_chats(self, session_id: str, limit: int = 20) -> List[Dict]:
+        rows = self._fetchall(
+            """
+            SELECT id, message, sender FROM chats
+            WHERE session_id = %s
+            ORDER BY id DESC
+            LIMIT %s
+            """,
+            (session_id, limit)
+        )
+        return [{"id": row[0], "message": row[1], "sender": row[2]} for row in rows]
+
+    def page_chats(self, session_id: str, before_id: Optional[int], limit: int) -> List[Dict]:
+        timestamp_column = "timestamp" if self.has_chat_timestamps() else "NULL"
+        where = "session_id = %s"
+        params: Tuple = (session_id,)
+        if before_id is not None:
+            where += " AND id < %s"
+            params += (before_id,)
+
+        rows = self._fetchall(
+            f"""
+            SELECT id, sender, message, {timestamp_column} FROM chats
+            WHERE {where}
+            ORDER BY id DESC
+            LIMIT %s
+            """,
+            params + (limit,)
+        )
+        return [
+            {"id": row[0], "sender": row[1], "message": row[2], "timestamp": to_datetime(row[3])}
+            for row in rows
+        ]
+
+    def iter_chats(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        sender: Optional[str] = None,
+        session_id: Optional[str] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict]:
+        has_timestamps = self.has_chat_timestamps()
+        if (start or end) and not has_timestamps:
+            raise ValueError("chats table has no timestamp column; date filters unavailable")
+
+        filters = []
+        params: Tuple = ()
+        if start:
+            filters.append("timestamp >= %s")
+            params += (start,)
+        if end:
+            filters.append("timestamp < %s")
+            params += (end,)
+        if sender:
+            filters.append("sender = %s")
+            params += (sender,)
+        if session_id:
+            filters.append("session_id = %s")
+            params += (session_id,)
+        extra = "".join(f" AND {condition}" for condition in filters)
+        timestamp_column = "timestamp" if has_timestamps else "NULL"
+
+        # Keyset batches: each query is short, so no cursor or lock is held
+        # open while the client reads the stream.
+        last_id = 0
+        while True:
+            rows = self._fetchall(
+                f"""
+                SELECT id, session_id, sender, message, {timestamp_column} FROM chats
+                WHERE id > %s{extra}
+                ORDER BY id ASC
+                LIMIT %s
+                """,
+                (last_id,) + params + (batch_size,)
+            )
+            for row in rows:
+                yield {
+                    "id": row[0],
+                    "session_id": row[1],
+                    "sender": row[2],
+                    "message": row[3],
+                    "timestamp": to_datetime(row[4]),
+                }
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def count_user_messages(self, session_id: str) -> int:
+        row = self._fetchone(
+            """
+            SELECT COUNT(*) FROM chats
+            WHERE session_id = %s AND sender = 'user'
+            """,
+            (session_id,)
+        )
+        return row[0]
+
+    def get_conversation_messages(self, session_id: str) -> List[Tuple[str, str]]:
+        rows = self._fetchall(
+            """
+            SELECT sender, message FROM chats
+            WHERE session_id = %s
+            ORDER BY id ASC
+            """,
+            (session_id,)
+        )
+        return [tuple(row) for row in rows]
+
+    # ----------------------------------------
+    # LEAD STATES
+    # ----------------------------------------
+    def get_lead_state(self, session_id: str) -> Optional[str]:
+        row = self._fetchone(
+            "SELECT current_step FROM lead_states WHERE session_id = %s",
+            (session_id,)
+        )
+        return row[0] if row else None
+
+    def get_or_create_lead_state(self, session_id: str) -> str:
+        with self.transaction() as cursor:
+            row = self._execute(
+                cursor,
+                "SELECT current_step FROM lead_states WHERE session_id = %s",
+                (session_id,)
+            ).fetchone()
+            if row:
+                return row[0]
+
+            self._execute(
+                cursor,
+                """
+                INSERT INTO lead_states (session_id, current_step, updated_at)
+                VALUES (%s, %s, %s)
+                """,
+                (session_id, "NONE", datetime.utcnow())
+            )
+        return "NONE"
+
+    def update_lead_state(self, session_id: str, new_state: str):
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                """
+                UPDATE lead_states
+                SET current_step = %s, updated_at = %s
+                WHERE session_id = %s
+                """,
+                (new_state, datetime.utcnow(), session_id)
+            )
+
+    def delete_lead_state(self, session_id: str):
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                "DELETE FROM lead_states WHERE session_id = %s",
+                (session_id,)
+            )
+
+    # ----------------------------------------
+    # LEADS
+    # ----------------------------------------
+    def _select_lead(self, cursor, session_id: str) -> Optional[Dict]:
+        """
+        The session's lead, following lead_sessions if it was merged into another.
+        """
+        if self.has_lead_sessions():
+            where, params = (
+                "session_id = COALESCE((SELECT lead_session_id FROM lead_sessions WHERE session_id = %s), %s)",
+                (session_id, session_id),
+            )
+        else:
+            where, params = "session_id = %s", (session_id,)
+        row = self._execute(
+            cursor,
+            f"""
+            SELECT session_id, name, email, phone, intent_summary, created_at
+            FROM leads
+            WHERE {where}
+            """,
+            params
+        ).fetchone()
+        if not row:
+            return None
+
+        return {
+            "session_id": row[0],
+            "name": row[1],
+            "email": row[2],
+            "phone": row[3],
+            "intent_summary": row[4],
+            "created_at": row[5]
+        }
+
+    def get_lead(self, session_id: str) -> Optional[Dict]:
+        with self.transaction() as cursor:
+            return self._select_lead(cursor, session_id)
+
+    def upsert_lead_field(self, session_id: str, field: str, value: str):
+        self.upsert_lead_fields(session_id, {field: value})
+
+    def upsert_lead_fields(self, session_id: str, fields: Dict[str, str]) -> Dict:
+        with self.transaction() as cursor:
+            return self._upsert_lead_fields(cursor, session_id, fields)
+
+    def lead_session_is_unique(self) -> bool:
+        """Whether leads.session_id carries a unique key (enables single-statement upserts)."""
+        return False
+
+    def has_lead_sessions(self) -> bool:
+        """Whether the lead_sessions table exists (sessions can be merged into another lead)."""
+        return True
+
+    def _find_contact_owners(self, cursor, session_id: str, fields: Dict[str, str]) -> Dict[str, str]:
+        """
+        Contact fields in `fields` that already belong to another session's lead.
+        Returns {field: owning_session_id}.
+        """
+        contact = {name: fields[name] for name in CONTACT_FIELDS if fields.get(name)}
+        if not contact:
+            return {}
+
+        conditions = " OR ".join(f"{name} = %s" for name in contact)
+        rows = self._execute(
+            cursor,
+            f"SELECT session_id, email, phone FROM leads WHERE {conditions}",
+            tuple(contact.values())
+        ).fetchall()
+
+        # MySQL's collation matches emails case-insensitively; so must this.
+        wanted_email = contact["email"].lower() if contact.get("email") else None
+        owners = {}
+        for owner_session_id, email, phone in rows:
+            if owner_session_id == session_id:
+                continue
+            if wanted_email and email and email.lower() == wanted_email:
+                owners["email"] = owner_session_id
+            if contact.get("phone") and phone == contact["phone"]:
+                owners["phone"] = owner_session_id
+        return owners
+
+    def _upsert_lead_fields(self, cursor, session_id: str, fields: Dict[str, str], retry: bool = True) -> Dict:
+        """
+        Merge any subset of lead fields for a session.
+        Emails/phones owned by another session's lead (unique_email / unique_phone)
+        are left out of the write and reported as conflicts.
+        """
+        invalid = set(fields) - LEAD_FIELDS
+        if invalid:
+            raise ValueError(f"Invalid lead field: {', '.join(sorted(invalid))}")
+
+        conflicts = self._find_contact_owners(cursor, session_id, fields)
+        fields = {name: value for name, value in fields.items() if name not in conflicts}
+        if not fields:
+            return {"conflicts": conflicts}
+
+        try:
+            written = self._write_lead_fields(cursor, session_id, fields)
+        except self.integrity_errors:
+            if not retry:
+                raise
+            written = False
+        if written or not retry or not self._find_contact_owners(cursor, session_id, fields):
+            return {"conflicts": conflicts}
+
+        # Another session took this email/phone between the owner lookup and
+        # the write. Look again and report it as a conflict instead of
+        # claiming the fields were saved.
+        result = self._upsert_lead_fields(cursor, session_id, fields, retry=False)
+        return {"conflicts": {**conflicts, **result["conflicts"]}}
+
+    def _write_lead_fields(self, cursor, session_id: str, fields: Dict[str, str]) -> bool:
+        """
+        Write fields with no known conflicts. False when the write may have
+        been dropped by a unique-key hit on another session's row.
+        """
+        columns = sorted(fields)
+        values = tuple(fields[column] for column in columns)
+
+        if self.lead_session_is_unique():
+            # One statement; the guard keeps a unique-key hit on another
+            # session's row from overwriting that row. That leaves 0 affected
+            # rows (as does rewriting identical values).
+            sql = self._upsert_sql(
+                "leads",
+                ["session_id"] + columns + ["created_at"],
+                ["session_id"],
+                {
+                    column: "CASE WHEN {old_key} = {new_key} THEN {new} ELSE {old} END"
+                    for column in columns
+                },
+            )
+            self._execute(cursor, sql, (session_id,) + values + (datetime.utcnow(),))
+            return cursor.rowcount != 0
+
+        row = self._execute(
+            cursor,
+            "SELECT id FROM leads WHERE session_id = %s",
+            (session_id,)
+        ).fetchone()
+
+        if row:
+            assignments = ", ".join(f"{column} = %s" for column in columns)
+            self._execute(
+                cursor,
+                f"UPDATE leads SET {assignments} WHERE session_id = %s",
+                values + (session_id,)
+            )
+        else:
+            self._execute(
+                cursor,
+                f"""
+                INSERT INTO leads (session_id, {', '.join(columns)}, created_at)
+                VALUES (%s, {', '.join(['%s'] * len(columns))}, %s)
+                """,
+                (session_id,) + values + (datetime.utcnow(),)
+            )
+        return True
+
+    def load_lead_record(self, session_id: str) -> Dict:
+        with self.transaction() as cursor:
+            row = self._execute(
+                cursor,
+                "SELECT current_step FROM lead_states WHERE session_id = %s",
+                (session_id,)
+            ).fetchone()
+            if row:
+                state = row[0]
+            else:
+                state = "NONE"
+                self._execute(
+                    cursor,
+                    """
+                    INSERT INTO lead_states (session_id, current_step, updated_at)
+                    VALUES (%s, %s, %s)
+                    """,
+                    (session_id, state, datetime.utcnow())
+                )
+
+            lead = self._select_lead(cursor, session_id)
+        return {"state": state, "lead": lead}
+
+    def save_lead_turn(
+        self,
+        session_id: str,
+        new_state: Optional[str],
+        fields: Dict[str, str],
+        lead_session_id: Optional[str] = None,
+    ) -> Dict:
+        if new_state is None and not fields:
+            return {"conflicts": {}}
+
+        with self.transaction() as cursor:
+            result = self._upsert_lead_fields(cursor, lead_session_id or session_id, fields)
+            if new_state is not None:
+                self._execute(
+                    cursor,
+                    """
+                    UPDATE lead_states
+                    SET current_step = %s, updated_at = %s
+                    WHERE session_id = %s
+                    """,
+                    (new_state, datetime.utcnow(), session_id)
+                )
+        return result
+
+    def save_intent_summary(self, session_id: str, summary: str):
+        self.upsert_lead_field(session_id, "intent_summary", summary)
+
+    def merge_lead_session(self, session_id: str, lead_session_id: str, fields: Dict[str, str]) -> Optional[Dict]:
+        if not self.has_lead_sessions():
+            # Nowhere to record the merge; the session keeps its own lead.
+            return None
+
+        with self.transaction() as cursor:
+            lead = self._select_lead(cursor, lead_session_id)
+            if lead is None:
+                return None
+
+            # Fold in the session's own partial lead row, then drop it so its
+            # email/phone cannot collide with the merged lead.
+            own = self._execute(
+                cursor,
+                "SELECT name, email, phone, intent_summary FROM leads WHERE session_id = %s",
+                (session_id,)
+            ).fetchone()
+            if own and session_id != lead["session_id"]:
+                previous = dict(zip(("name", "email", "phone", "intent_summary"), own))
+                fields = {**{k: v for k, v in previous.items() if v}, **fields}
+                self._execute(cursor, "DELETE FROM leads WHERE session_id = %s", (session_id,))
+
+            # Existing values win, except the summary, which tracks the latest session.
+            updates = {
+                name: value for name, value in fields.items()
+                if value and (name == "intent_summary" or not lead.get(name))
+            }
+            if updates:
+                conflicts = self._upsert_lead_fields(cursor, lead["session_id"], updates)["conflicts"]
+                lead.update((name, value) for name, value in updates.items() if name not in conflicts)
+
+            self._execute(
+                cursor,
+                self._upsert_sql(
+                    "lead_sessions",
+                    ["session_id", "lead_session_id", "merged_at"],
+                    ["session_id"],
+                    {"lead_session_id": "{new}", "merged_at": "{new}"},
+                ),
+                (session_id, lead["session_id"], datetime.utcnow())
+            )
+        return lead
+
+    def iter_lead_contacts(self, after_id: int, limit: int) -> List[Dict]:
+        rows = self._fetchall(
+            """
+            SELECT id, session_id, email, phone FROM leads
+            WHERE id > %s AND (email IS NOT NULL OR phone IS NOT NULL)
+            ORDER BY id
+            LIMIT %s
+            """,
+            (after_id, limit)
+        )
+        return [
+            {"id": row[0], "session_id": row[1], "email": row[2], "phone": row[3]}
+            for row in rows
+        ]
+
+    def find_existing_contacts(self, emails: List[str], phones: List[str]) -> Dict[str, set]:
+        existing = {"email": set(), "phone": set()}
+        conditions = []
+        params: List[str] = []
+        for column, values in (("email", emails), ("phone", phones)):
+            if values:
+                conditions.append(f"{column} IN ({', '.join(['%s'] * len(values))})")
+                params.extend(values)
+        if not conditions:
+            return existing
+
+        rows = self._fetchall(
+            f"SELECT email, phone FROM leads WHERE {' OR '.join(conditions)}",
+            tuple(params)
+        )
+        # Reported in the caller's spelling; emails match case-insensitively.
+        wanted_emails = {email.lower(): email for email in emails}
+        wanted_phones = set(phones)
+        for email, phone in rows:
+            if email and email.lower() in wanted_emails:
+                existing["email"].add(wanted_emails[email.lower()])
+            if phone in wanted_phones:
+                existing["phone"].add(phone)
+        return existing
+
+    def find_lead_contacts(self, session_ids: List[str]) -> Dict[str, Dict]:
+        if not session_ids:
+            return {}
+        rows = self._fetchall(
+            f"""
+            SELECT session_id, email, phone FROM leads
+            WHERE session_id IN ({', '.join(['%s'] * len(session_ids))})
+            """,
+            tuple(session_ids)
+        )
+        return {row[0]: {"email": row[1], "phone": row[2]} for row in rows}
+
+    def insert_leads(self, leads: List[Dict]) -> int:
+        if not leads:
+            return 0
+
+        columns = ["session_id", "name", "email", "phone", "intent_summary", "created_at"]
+        now = datetime.utcnow()
+        params = []
+        for lead in leads:
+            params.extend(lead.get(column) for column in columns[:-1])
+            params.append(now)
+
+        with self.transaction() as cursor:
+            self._execute(cursor, self._insert_ignore_sql("leads", columns, len(leads)), tuple(params))
+            return cursor.rowcount
+
+    # ----------------------------------------
+    # RETENTION
+    # ----------------------------------------
+    def find_idle_sessions(self, cutoff: datetime, limit: int) -> List[Dict]:
+        rows = self._fetchall(
+            """
+            SELECT session_id, MIN(timestamp), MAX(timestamp)
+            FROM chats
+            GROUP BY session_id
+            HAVING MAX(timestamp) < %s
+            LIMIT %s
+            """,
+            (cutoff, limit)
+        )
+        return [
+            {
+                "session_id": row[0],
+                "first_message_at": to_datetime(row[1]),
+                "last_message_at": to_datetime(row[2]),
+            }
+            for row in rows
+        ]
+
+    def fetch_chats_after(self, session_id: str, after_id: int, limit: int) -> List[Dict]:
+        timestamp_column = "timestamp" if self.has_chat_timestamps() else "NULL"
+        rows = self._fetchall(
+            f"""
+            SELECT id, sender, message, {timestamp_column} FROM chats
+            WHERE session_id = %s AND id > %s
+            ORDER BY id ASC
+            LIMIT %s
+            """,
+            (session_id, after_id, limit)
+        )
+        return [
+            {"id": row[0], "sender": row[1], "message": row[2], "timestamp": row[3]}
+            for row in rows
+        ]
+
+    def save_chat_archive(self, summary: Dict):
+        columns = [
+            "session_id", "message_count", "user_message_count",
+            "first_message_at", "last_message_at", "lead_step", "archive_path", "archived_at",
+        ]
+        # A session can come back to life and be archived again; accumulate counts.
+        sql = self._upsert_sql(
+            "chat_archives",
+            columns,
+            ["session_id"],
+            {
+                "message_count": "{old} + {new}",
+                "user_message_count": "{old} + {new}",
+                "last_message_at": "{new}",
+                "lead_step": "{new}",
+                "archive_path": "{new}",
+                "archived_at": "{new}",
+            },
+        )
+        with self.transaction() as cursor:
+            self._execute(cursor, sql, tuple(summary.get(column) for column in columns))
+
+    # ----------------------------------------
+    # CONVERSATION MEMORY
+    # ----------------------------------------
+    def get_conversation_memory(self, session_id: str) -> Optional[Dict]:
+        row = self._fetchone(
+            """
+            SELECT summary, summarized_through_id, updated_at
+            FROM conversation_memory
+            WHERE session_id = %s
+            """,
+            (session_id,)
+        )
+        if not row:
+            return None
+        return {"summary": row[0], "summarized_through_id": row[1], "updated_at": row[2]}
+
+    def save_conversation_memory(self, session_id: str, summary: str, summarized_through_id: int):
+        sql = self._upsert_sql(
+            "conversation_memory",
+            ["session_id", "summary", "summarized_through_id", "updated_at"],
+            ["session_id"],
+            {"summary": "{new}", "summarized_through_id": "{new}", "updated_at": "{new}"},
+        )
+        with self.transaction() as cursor:
+            self._execute(cursor, sql, (session_id, summary, summarized_through_id, datetime.utcnow()))
+
+    def delete_conversation_memory(self, session_id: str):
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                "DELETE FROM conversation_memory WHERE session_id = %s",
+                (session_id,)
+            )
+
+    # ----------------------------------------
+    # SESSION AGGREGATES
+    # ----------------------------------------
+    def get_session_aggregates(self, session_id: str) -> Optional[Dict]:
+        row = self._fetchone(
+            """
+            SELECT user_message_count, question_count, has_contact, topics, latest_need
+            FROM session_aggregates
+            WHERE session_id = %s
+            """,
+            (session_id,)
+        )
+        if not row:
+            return None
+        return {
+            "user_message_count": row[0],
+            "question_count": row[1],
+            "has_contact": bool(row[2]),
+            "topics": row[3].split(",") if row[3] else [],
+            "latest_need": row[4] or "",
+        }
+
+    def record_session_message(
+        self,
+        session_id: str,
+        topics: List[str],
+        is_question: bool,
+        has_contact: bool,
+        latest_need: str,
+    ) -> bool:
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                "SELECT topics FROM session_aggregates WHERE session_id = %s",
+                (session_id,)
+            )
+            row = cursor.fetchone()
+            known = row[0].split(",") if row and row[0] else []
+            merged = known + [topic for topic in topics if topic not in known]
+
+            # Counters are applied in SQL so concurrent turns never lose a count.
+            sql = self._upsert_sql(
+                "session_aggregates",
+                ["session_id", "user_message_count", "question_count", "has_contact",
+                 "topics", "latest_need", "updated_at"],
+                ["session_id"],
+                {
+                    "user_message_count": "{old} + {new}",
+                    "question_count": "{old} + {new}",
+                    "has_contact": "CASE WHEN {new} > {old} THEN {new} ELSE {old} END",
+                    "topics": "{new}",
+                    "latest_need": "{new}",
+                    "updated_at": "{new}",
+                },
+            )
+            self._execute(
+                cursor,
+                sql,
+                (session_id, 1, int(is_question), int(has_contact),
+                 ",".join(merged) or None, latest_need, datetime.utcnow())
+            )
+        return row is None
+
+    def save_session_aggregates(self, session_id: str, aggregates: Dict):
+        sql = self._upsert_sql(
+            "session_aggregates",
+            ["session_id", "user_message_count", "question_count", "has_contact",
+             "topics", "latest_need", "updated_at"],
+            ["session_id"],
+            {
+                "user_message_count": "{new}",
+                "question_count": "{new}",
+                "has_contact": "{new}",
+                "topics": "{new}",
+                "latest_need": "{new}",
+                "updated_at": "{new}",
+            },
+        )
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                sql,
+                (
+                    session_id,
+                    aggregates["user_message_count"],
+                    aggregates["question_count"],
+                    int(aggregates["has_contact"]),
+                    ",".join(aggregates["topics"]) or None,
+                    aggregates["latest_need"],
+                    datetime.utcnow(),
+                )
+            )
+
+    def delete_session_aggregates(self, session_id: str):
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                "DELETE FROM session_aggregates WHERE session_id = %s",
+                (session_id,)
+            )
+
+    # ----------------------------------------
+    # ANALYTICS ROLLUPS
+    # ----------------------------------------
+    def increment_rollups(self, day: str, counts: Dict[str, int]):
+        counts = {metric: count for metric, count in counts.items() if count}
+        if not counts:
+            return
+
+        sql = self._upsert_sql(
+            "analytics_daily",
+            ["day", "metric", "count"],
+            ["day", "metric"],
+            {"count": "{old} + {new}"},
+            rows=len(counts),
+        )
+        params = []
+        for metric in sorted(counts):
+            params.extend((day, metric, counts[metric]))
+        with self.transaction() as cursor:
+            self._execute(cursor, sql, tuple(params))
+
+    def fetch_rollups(self, since_day: str) -> List[Tuple[str, str, int]]:
+        rows = self._fetchall(
+            "SELECT day, metric, count FROM analytics_daily WHERE day >= %s ORDER BY day",
+            (since_day,)
+        )
+        return [tuple(row) for row in rows]
+
+    # ----------------------------------------
+    # LEAD EXPORT OUTBOX
+    # ----------------------------------------
+    def enqueue_lead_export(self, session_id: str, payload: str, status: str = "pending") -> int:
+        now = datetime.utcnow()
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                """
+                INSERT INTO lead_export_outbox (session_id, payload, status, attempts, next_attempt_at, created_at)
+                VALUES (%s, %s, %s, 0, %s, %s)
+                """,
+                (session_id, payload, status, now, now)
+            )
+            return cursor.lastrowid
+
+    def release_lead_export(self, export_id: int, payload: str) -> bool:
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                """
+                UPDATE lead_export_outbox
+                SET payload = %s, status = 'pending', next_attempt_at = %s
+                WHERE id = %s AND status = 'awaiting_intent'
+                """,
+                (payload, datetime.utcnow(), export_id)
+            )
+            return cursor.rowcount > 0
+
+    def list_held_lead_exports(self, limit: int) -> List[Dict]:
+        rows = self._fetchall(
+            """
+            SELECT id, session_id, payload FROM lead_export_outbox
+            WHERE status = 'awaiting_intent'
+            ORDER BY id
+            LIMIT %s
+            """,
+            (limit,)
+        )
+        return [{"id": row[0], "session_id": row[1], "payload": row[2]} for row in rows]
+
+    def claim_lead_exports(self, limit: int, lease_seconds: int) -> List[Dict]:
+        now = datetime.utcnow()
+        claim_token = uuid.uuid4().hex
+        with self.transaction() as cursor:
+            due = self._execute(
+                cursor,
+                """
+                SELECT id FROM lead_export_outbox
+                WHERE status = 'pending' AND next_attempt_at <= %s
+                ORDER BY id
+                LIMIT %s
+                """,
+                (now, limit)
+            ).fetchall()
+            if not due:
+                return []
+
+            ids = tuple(row[0] for row in due)
+            # Conditional update: rows leased by another exporter meanwhile are skipped.
+            self._execute(
+                cursor,
+                f"""
+                UPDATE lead_export_outbox
+                SET claim_token = %s, next_attempt_at = %s
+                WHERE id IN ({', '.join(['%s'] * len(ids))})
+                  AND status = 'pending' AND next_attempt_at <= %s
+                """,
+                (claim_token, now + timedelta(seconds=lease_seconds)) + ids + (now,)
+            )
+            rows = self._execute(
+                cursor,
+                """
+                SELECT id, session_id, payload, attempts FROM lead_export_outbox
+                WHERE claim_token = %s
+                ORDER BY id
+                """,
+                (claim_token,)
+            ).fetchall()
+
+        return [
+            {"id": row[0], "session_id": row[1], "payload": row[2], "attempts": row[3]}
+            for row in rows
+        ]
+
+    def lead_export_exists(self, session_id: str) -> bool:
+        row = self._fetchone(
+            "SELECT 1 FROM lead_export_outbox WHERE session_id = %s LIMIT 1",
+            (session_id,)
+        )
+        return row is not None
+
+    def mark_lead_exports_sent(self, export_ids: List[int]):
+        if not export_ids:
+            return
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                f"""
+                UPDATE lead_export_outbox
+                SET status = 'sent', sent_at = %s, last_error = NULL
+                WHERE id IN ({', '.join(['%s'] * len(export_ids))})
+                """,
+                (datetime.utcnow(),) + tuple(export_ids)
+            )
+
+    def mark_lead_export_failed(self, export_id: int, attempts: int, error: str, next_attempt_at: Optional[datetime]):
+        status = "pending" if next_attempt_at else "dead"
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                """
+                UPDATE lead_export_outbox
+                SET status = %s, attempts = %s, last_error = %s, next_attempt_at = %s
+                WHERE id = %s
+                """,
+                (status, attempts, error[:1000], next_attempt_at or datetime.utcnow(), export_id)
+            )
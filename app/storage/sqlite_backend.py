@@ -0,0 +1,255 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Sequence
+
+from app.core.config import get_settings
+from app.storage.sql_backend import SQLStorage
+
+# Store datetimes as ISO text and parse them back for TIMESTAMP columns.
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", lambda raw: datetime.fromisoformat(raw.decode()))
+
+# ----------------------------------------
+# SCHEMA (mirrors the MySQL tables)
+# ----------------------------------------
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS chats (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        message TEXT,
+        sender TEXT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_chats_session_id ON chats (session_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_chats_session_sender ON chats (session_id, sender)",
+    """
+    CREATE TABLE IF NOT EXISTS lead_states (
+        session_id TEXT PRIMARY KEY,
+        current_step TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS leads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        name TEXT,
+        email TEXT UNIQUE COLLATE NOCASE,  -- case-insensitive like MySQL's collation
+        phone TEXT UNIQUE,
+        intent_summary TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS unique_session_id ON leads (session_id)",
+    """
+    CREATE TABLE IF NOT EXISTS chat_archives (
+        session_id TEXT PRIMARY KEY,
+        message_count INTEGER NOT NULL DEFAULT 0,
+        user_message_count INTEGER NOT NULL DEFAULT 0,
+        first_message_at TIMESTAMP,
+        last_message_at TIMESTAMP,
+        lead_step TEXT,
+        archive_path TEXT NOT NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS lead_export_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TIMESTAMP NOT NULL,
+        claim_token TEXT,
+        last_error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        sent_at TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_outbox_due ON lead_export_outbox (status, next_attempt_at)",
+    "CREATE INDEX IF NOT EXISTS idx_outbox_claim ON lead_export_outbox (claim_token)",
+    "CREATE INDEX IF NOT EXISTS idx_outbox_session ON lead_export_outbox (session_id)",
+    """
+    CREATE TABLE IF NOT EXISTS conversation_memory (
+        session_id TEXT PRIMARY KEY,
+        summary TEXT NOT NULL,
+        summarized_through_id INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS lead_sessions (
+        session_id TEXT PRIMARY KEY,
+        lead_session_id TEXT NOT NULL,
+        merged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS analytics_daily (
+        day TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, metric)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS session_aggregates (
+        session_id TEXT PRIMARY KEY,
+        user_message_count INTEGER NOT NULL DEFAULT 0,
+        question_count INTEGER NOT NULL DEFAULT 0,
+        has_contact INTEGER NOT NULL DEFAULT 0,
+        topics TEXT,
+        latest_need TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+
+@lru_cache(maxsize=256)
+def _to_qmark(sql: str) -> str:
+    return sql.replace("%s", "?")
+
+
+class SQLiteStorage(SQLStorage):
+    """
+    Embedded backend for local runs, load tests and single-node deployments.
+    One connection per thread; WAL lets readers proceed while a writer commits.
+    """
+
+    name = "sqlite"
+    integrity_errors = (sqlite3.IntegrityError,)
+
+    def __init__(self, path: str = None):
+        self.path = path or get_settings().sqlite_path
+        self._local = threading.local()
+        self._migrated = False
+        self._migrate_lock = threading.Lock()
+
+    # ----------------------------------------
+    # DIALECT
+    # ----------------------------------------
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(
+                self.path,
+                timeout=30,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        if not self._migrated:
+            self._create_schema(conn)
+        return conn
+
+    def _release(self, conn):
+        # Connections are reused per thread.
+        pass
+
+    def _sql(self, sql: str) -> str:
+        return _to_qmark(sql)
+
+    def _upsert_sql(
+        self,
+        table: str,
+        columns: Sequence[str],
+        key_columns: Sequence[str],
+        updates: Dict[str, str],
+        rows: int = 1,
+    ) -> str:
+        placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * rows)
+        key = key_columns[0]
+        assignments = ", ".join(
+            f"{column} = " + expression.format(
+                old=f"{table}.{column}", new=f"excluded.{column}",
+                old_key=f"{table}.{key}", new_key=f"excluded.{key}"
+            )
+            for column, expression in updates.items()
+        )
+        action = f"DO UPDATE SET {assignments}" if assignments else "DO NOTHING"
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {placeholders} "
+            f"ON CONFLICT ({', '.join(key_columns)}) {action}"
+        )
+
+    def _insert_ignore_sql(self, table: str, columns: Sequence[str], rows: int = 1) -> str:
+        placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * rows)
+        return f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES {placeholders}"
+
+    # ----------------------------------------
+    # SCHEMA
+    # ----------------------------------------
+    def _create_schema(self, conn):
+        with self._migrate_lock:
+            if self._migrated:
+                return
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._migrated = True
+
+    def migrate(self) -> Dict:
+        self._connect()
+        return {"chats_has_timestamp": True, "journal_mode": "wal"}
+
+    def has_chat_timestamps(self) -> bool:
+        return True
+
+    def lead_session_is_unique(self) -> bool:
+        return True
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ----------------------------------------
+    # CHATS
+    # ----------------------------------------
+    def save_chat_message(self, session_id: str, message: str, sender: str):
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                """
+                INSERT INTO chats (session_id, message, sender, timestamp)
+                VALUES (%s, %s, %s, %s)
+                """,
+                (session_id, message, sender, datetime.utcnow())
+            )
+
+    # ----------------------------------------
+    # RETENTION
+    # ----------------------------------------
+    def delete_chats_through(self, session_id: str, max_id: int, batch_size: int) -> int:
+        deleted = 0
+        while True:
+            with self.transaction() as cursor:
+                self._execute(
+                    cursor,
+                    """
+                    DELETE FROM chats WHERE id IN (
+                        SELECT id FROM chats
+                        WHERE session_id = %s AND id <= %s
+                        ORDER BY id
+                        LIMIT %s
+                    )
+                    """,
+                    (session_id, max_id, batch_size)
+                )
+                batch_deleted = cursor.rowcount
+            deleted += batch_deleted
+            if batch_deleted < batch_size:
+                return deleted
@@ -0,0 +1,93 @@
+import gzip
+import zlib
+from typing import Dict, Optional, Sequence
+
+# brotli is optional; without it clients get gzip.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def available_encodings() -> tuple:
+    """
+    Content-codings this process can produce, best first.
+    """
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """
+    {"gzip": 1.0, "br": 0.8, "*": 0.1} from an Accept-Encoding header.
+    """
+    weights: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def choose_encoding(header: Optional[str], offered: Sequence[str]) -> Optional[str]:
+    """
+    Best of `offered` (in server preference order) the client accepts, or None
+    for identity. Ties on q go to the server's order.
+    """
+    weights = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in offered:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == "br":
+        if brotli is None:
+            raise ValueError("brotli is not installed")
+        return brotli.compress(data, quality=BROTLI_QUALITY if level is None else level)
+    if encoding == "gzip":
+        # mtime=0 keeps the output byte-identical across runs and workers.
+        return gzip.compress(data, compresslevel=GZIP_LEVEL if level is None else level, mtime=0)
+    raise ValueError(f"Unsupported content-coding: {encoding}")
+
+
+class StreamCompressor:
+    """
+    Incremental gzip/brotli for streamed bodies; each chunk is flushed so
+    clients see rows as they are produced.
+    """
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        self.encoding = encoding
+        if encoding == "br":
+            if brotli is None:
+                raise ValueError("brotli is not installed")
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY if level is None else level)
+        elif encoding == "gzip":
+            self._zlib = zlib.compressobj(GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
+        else:
+            raise ValueError(f"Unsupported content-coding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
@@ -0,0 +1,106 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+# ----------------------------------------
+# SINGLE-PASS KEYWORD MATCHING
+# ----------------------------------------
+# Keywords are compiled into one regex whose alternation is laid out as a
+# trie ("pric(?:e|ing)"), so the engine walks shared prefixes once instead
+# of trying every term at every position. Thousands of terms stay a single
+# scan over the message.
+
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(keyword.lower().split())
+
+
+def _trie_pattern(node: Dict) -> str:
+    # "" marks the end of a keyword inside the trie.
+    terminal = "" in node
+    branches = []
+    for char in sorted(key for key in node if key):
+        token = r"\s+" if char == " " else re.escape(char)
+        branches.append(token + _trie_pattern(node[char]))
+
+    if not branches:
+        return ""
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+
+    # Longer continuations are tried first, so the longest keyword wins.
+    pattern = "(?:" + "|".join(branches) + ")"
+    return pattern + "?" if terminal else pattern
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive, whole-word matcher over a keyword list.
+
+    `plurals` also accepts a trailing "s" ("demos" hits "demo").
+    Hits are reported as the normalized keyword, in keyword-list order.
+    """
+
+    def __init__(self, keywords: Iterable[str], plurals: bool = False):
+        self.keywords: List[str] = []
+        self._priority: Dict[str, int] = {}
+        for keyword in keywords:
+            normalized = normalize_keyword(keyword)
+            if normalized and normalized not in self._priority:
+                self._priority[normalized] = len(self.keywords)
+                self.keywords.append(normalized)
+
+        self._regex: Optional[re.Pattern] = None
+        if self.keywords:
+            trie: Dict = {}
+            for keyword in self.keywords:
+                node = trie
+                for char in keyword:
+                    node = node.setdefault(char, {})
+                node[""] = {}
+
+            suffix = "s?" if plurals else ""
+            self._regex = re.compile(
+                rf"(?<!\w)({_trie_pattern(trie)}){suffix}(?!\w)",
+                re.IGNORECASE,
+            )
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _hits(self, text: str):
+        if self._regex is None or not text:
+            return
+        for match in self._regex.finditer(text):
+            yield normalize_keyword(match.group(1))
+
+    def search(self, text: str) -> bool:
+        return next(self._hits(text), None) is not None
+
+    def find_all(self, text: str) -> List[str]:
+        """
+        Distinct keywords present in `text`, in keyword-list order.
+        """
+        found = set(self._hits(text))
+        return sorted(found, key=self._priority.__getitem__)
+
+    def first(self, text: str) -> Optional[str]:
+        """
+        The highest-priority (earliest listed) keyword present in `text`.
+        """
+        found = self.find_all(text)
+        return found[0] if found else None
+
+    def priority(self, keyword: str) -> int:
+        return self._priority.get(normalize_keyword(keyword), len(self.keywords))
+
+
+def load_keyword_file(path: str) -> List[str]:
+    """
+    One keyword per line; blank lines and `#` comments are ignored.
+    """
+    with open(path, encoding="utf-8") as handle:
+        return [
+            line.strip()
+            for line in handle
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
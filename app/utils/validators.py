@@ -1,5 +1,12 @@
 import re
 
+# Whole words only: "Mary-Call Jones" is a name, "call me" is not.
+NAME_DISALLOWED_TOKENS = frozenset({
+    "price", "pricing", "cost", "demo", "trial", "contact", "call", "email",
+    "consult", "consultation", "services", "partnership", "help", "thanks",
+    "thank", "interested", "information", "details", "support"
+})
+
 # ----------------------------------------
 # EMAIL VALIDATION
 # ----------------------------------------
@@ -8,6 +15,11 @@ def is_valid_email(text: str) -> bool:
     return re.match(email_regex, text.strip()) is not None
 
 
+def normalize_email(text: str) -> str:
+    # Stored lowercased by every write path, so lookups and unique keys agree.
+    return text.strip().lower()
+
+
 # ----------------------------------------
 # INDIA-ONLY PHONE VALIDATION
 # ----------------------------------------
@@ -50,13 +62,7 @@ def is_valid_name(text: str) -> bool:
     if len(words) == 0 or len(words) > 3:
         return False
 
-    disallowed_tokens = {
-        "price", "pricing", "cost", "demo", "trial", "contact", "call", "email",
-        "consult", "consultation", "services", "partnership", "help", "thanks",
-        "thank", "interested", "information", "details", "support"
-    }
-    lowered_words = {w.lower().strip(".") for w in words}
-    if lowered_words & disallowed_tokens:
+    if any(w.lower().strip(".") in NAME_DISALLOWED_TOKENS for w in words):
         return False
 
     return True
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""ns/op of the per-message lead detection and validation functions.
+
+Every /chat turn runs extract_contact_fields, extract_name_candidate,
+is_valid_name, is_casual_message, detect_lead_signal and
+detect_opportunistic_contact (some more than once). Each is timed over
+seeded corpora: short chat, names (ASCII and unicode), contact drops, long
+pasted text, unicode-heavy text and adversarial inputs.
+
+Timing follows pytest-benchmark: calibrate a loop count so one round takes
+--min-round-ms, run --rounds rounds with the GC paused and report
+min/median/mean per call.
+
+    python benchmarks/bench_lead_hot_path.py
+    python benchmarks/bench_lead_hot_path.py --save-baseline
+    python benchmarks/bench_lead_hot_path.py --check --tolerance 0.3
+
+--check compares against benchmarks/baselines/lead_hot_path.json and exits 1
+when any function/corpus is slower than the baseline by more than the
+tolerance. Rounds alternate with a fixed pure-Python calibration loop and
+the gate compares the fastest round relative to the fastest calibration
+round. That cancels CPU speed and most noisy-neighbour drift, so a baseline
+recorded on one machine stays usable on another.
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app.leads.lead_extractor import extract_contact_fields, extract_name_candidate, is_casual_message
+from app.leads.lead_state_service import detect_lead_signal, detect_opportunistic_contact
+from app.utils.validators import is_valid_name
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "lead_hot_path.json")
+
+FUNCTIONS: Dict[str, Callable[[str], object]] = {
+    "extract_contact_fields": extract_contact_fields,
+    "extract_name_candidate": extract_name_candidate,
+    "is_valid_name": is_valid_name,
+    "is_casual_message": is_casual_message,
+    "detect_lead_signal": detect_lead_signal,
+    "detect_opportunistic_contact": detect_opportunistic_contact,
+}
+
+# ----------------------------------------
+# CORPORA
+# ----------------------------------------
+CHAT = [
+    "hi", "hello", "thanks", "ok", "thank you", "hmm",
+    "what does your platform do?",
+    "how does the integration with our website work?",
+    "is my data encrypted at rest and in transit?",
+    "what is the pricing for the business plan?",
+    "can I book a demo with your team next week?",
+    "do you offer a free trial for startups?",
+    "We are evaluating chatbots for our support team of 40 agents.",
+]
+NAMES = [
+    "Asha Sharma", "Rahul", "my name is Maria Garcia", "I'm Chen Wei", "this is Fatima Khan",
+    "John O'Neil", "Anne-Marie Dubois", "Dr. Priya Iyer",
+    "José Álvarez", "Zoë Becker", "Łukasz Nowak", "李雷", "राहुल शर्मा", "محمد حداد",
+    "pricing please", "a", "John Jacob Jingleheimer Schmidt",
+]
+CONTACTS = [
+    "asha.sharma@example.com", "rahul+leads@company.co.in", "9876543210", "+91 98765 43210",
+    "098765-43210", "919876543210", "you can reach me at maria@example.com",
+    "call me on 9876543210 after 5pm", "my email is chen.wei@example.org and phone is +919812345678",
+    "12345", "not-an-email@", "+1 (415) 555-0100",
+]
+UNICODE = [
+    "नमस्ते, क्या आप मूल्य निर्धारण के बारे में बता सकते हैं?",
+    "مرحبا، أريد معرفة الأسعار والعرض التوضيحي",
+    "こんにちは、デモを予約できますか？",
+    "Olá! Quanto custa o plano empresarial? 😊",
+    "¿Tienen una prueba gratuita? ¡Gracias! 🙏🏽",
+    "price 💰 demo 📅 contact 📞 — asap!!!",
+    "Zażółć gęślą jaźń — czy macie wersję próbną?",
+]
+ADVERSARIAL = [
+    "@" * 200,
+    "9" * 500,
+    "a" * 2000 + "@" + "b" * 2000 + ".com",
+    ("-" * 50 + " ") * 40,
+    "my name is " + "x" * 500,
+    " ".join(["price"] * 300),
+]
+
+PARAGRAPH_WORDS = (
+    "our team evaluated several assistants last quarter and we need something that can answer "
+    "questions from internal documentation integrate with the website support escalation to human "
+    "agents and keep customer data inside the region please share details about security compliance "
+    "onboarding timelines and the total cost for roughly fifty thousand conversations each month"
+).split()
+
+
+def long_texts(rng: random.Random, count: int, words: int) -> List[str]:
+    texts = []
+    for index in range(count):
+        body = " ".join(rng.choices(PARAGRAPH_WORDS, k=words))
+        # A pasted email signature on some of them.
+        if index % 2:
+            body += "\n\n--\nAsha Sharma\nHead of Support\nasha.sharma@example.com\n+91 98765 43210"
+        texts.append(body)
+    return texts
+
+
+def build_corpora(seed: int) -> Dict[str, List[str]]:
+    rng = random.Random(seed)
+    return {
+        "chat": CHAT,
+        "names": NAMES,
+        "contacts": CONTACTS,
+        "unicode": UNICODE,
+        "long_pasted": long_texts(rng, 6, 400),  # ~3 KB each
+        "adversarial": ADVERSARIAL,
+    }
+
+
+# ----------------------------------------
+# TIMING
+# ----------------------------------------
+def calibration(_=None):
+    total = 0
+    for value in range(1000):
+        total += value * value % 7
+    return total
+
+
+def time_round(func: Callable, inputs: List[str], loops: int) -> float:
+    gc.disable()
+    try:
+        started = time.perf_counter_ns()
+        for _ in range(loops):
+            for text in inputs:
+                func(text)
+        return (time.perf_counter_ns() - started) / (loops * len(inputs))
+    finally:
+        gc.enable()
+
+
+def calibrate_loops(func: Callable, inputs: List[str], min_round_ms: float) -> int:
+    loops = 1
+    while time_round(func, inputs, loops) * loops * len(inputs) < min_round_ms * 1e6:
+        loops *= 2
+    return loops
+
+
+def measure(func: Callable, inputs: List[str], rounds: int, min_round_ms: float) -> Dict[str, float]:
+    for text in inputs:  # warm caches (compiled regexes, settings)
+        func(text)
+
+    loops = calibrate_loops(func, inputs, min_round_ms)
+    reference_loops = calibrate_loops(calibration, ["x"], min_round_ms)
+
+    samples, reference = [], []
+    for _ in range(rounds):
+        reference.append(time_round(calibration, ["x"], reference_loops))
+        samples.append(time_round(func, inputs, loops))
+    return {
+        "min_ns": round(min(samples), 1),
+        "median_ns": round(statistics.median(samples), 1),
+        "mean_ns": round(statistics.fmean(samples), 1),
+        "stdev_ns": round(statistics.stdev(samples), 1) if len(samples) > 1 else 0.0,
+        "relative": round(min(samples) / min(reference), 5),
+        "rounds": rounds,
+        "calls_per_round": loops * len(inputs),
+    }
+
+
+def run(rounds: int, min_round_ms: float, seed: int, only: List[str]) -> Dict:
+    corpora = build_corpora(seed)
+
+    results: Dict[str, Dict] = {}
+    for name, func in FUNCTIONS.items():
+        if only and name not in only:
+            continue
+        results[name] = {
+            corpus: measure(func, inputs, rounds, min_round_ms)
+            for corpus, inputs in corpora.items()
+        }
+    return {
+        "python": sys.version.split()[0],
+        "seed": seed,
+        "results": results,
+    }
+
+
+# ----------------------------------------
+# REGRESSION GATE
+# ----------------------------------------
+def compare(report: Dict, baseline: Dict, tolerance: float, min_delta_ns: float = 0.0) -> List[Dict]:
+    """
+    Rows for every (function, corpus) in both runs. `regressed` needs both the
+    relative slowdown past tolerance and at least min_delta_ns more per call.
+    """
+    rows = []
+    for name, corpora in report["results"].items():
+        for corpus, stats in corpora.items():
+            previous = baseline["results"].get(name, {}).get(corpus)
+            if not previous:
+                continue
+            ratio = stats["relative"] / previous["relative"]
+            expected = stats["min_ns"] / ratio
+            rows.append({
+                "function": name,
+                "corpus": corpus,
+                "min_ns": stats["min_ns"],
+                "expected_ns": round(expected, 1),
+                "ratio": round(ratio, 3),
+                "regressed": ratio > 1.0 + tolerance and stats["min_ns"] - expected >= min_delta_ns,
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=11)
+    parser.add_argument("--min-round-ms", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--only", nargs="*", default=[], choices=sorted(FUNCTIONS), help="functions to run")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the baseline")
+    parser.add_argument("--check", action="store_true", help="fail on regressions against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown, 0.3 = 30%%")
+    parser.add_argument("--min-delta-ns", type=float, default=100.0, help="ignore slowdowns smaller than this per call")
+    parser.add_argument("--retries", type=int, default=2, help="re-time apparent regressions this many times")
+    args = parser.parse_args()
+
+    report = run(args.rounds, args.min_round_ms, args.seed, args.only)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2, ensure_ascii=False)
+            handle.write("\n")
+
+    exit_code = 0
+    if args.check:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        rows = compare(report, baseline, args.tolerance, args.min_delta_ns)
+        # A shared CPU can slow one measurement; re-time suspects before failing.
+        corpora = build_corpora(args.seed)
+        for _ in range(args.retries):
+            suspects = {(row["function"], row["corpus"]) for row in rows if row["regressed"]}
+            if not suspects:
+                break
+            for name, corpus in suspects:
+                retry = measure(FUNCTIONS[name], corpora[corpus], args.rounds, args.min_round_ms)
+                if retry["relative"] < report["results"][name][corpus]["relative"]:
+                    report["results"][name][corpus] = retry
+            rows = compare(report, baseline, args.tolerance, args.min_delta_ns)
+        report["comparison"] = rows
+        regressions = [row for row in rows if row["regressed"]]
+        report["regressions"] = len(regressions)
+        exit_code = 1 if regressions else 0
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(exit_code)
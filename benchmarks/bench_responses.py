@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Serialization CPU and wire size of typical API responses.
+
+For seeded chat-history pages (/api/chats/{session_id}), a lead record
+(/api/lead/{session_id}), a /chat answer and the analytics summary, this
+measures per request:
+
+  - render time of Starlette's JSONResponse (json.dumps) vs the orjson
+    response class, alone and after FastAPI's jsonable_encoder (which runs
+    for every plain dict an endpoint returns, and usually costs more than
+    the rendering), and orjson on the raw payload without it
+  - body size, and size + CPU of gzip and brotli at the levels the
+    compression middleware uses
+
+end_to_end_speedup is the number that matters for a request (the old
+dict-through-encoder path vs ORJSONResponse returned by the handler);
+orjson_render_speedup covers the render step alone.
+
+    python benchmarks/bench_responses.py
+    python benchmarks/bench_responses.py --payloads history_100 lead --rounds 21
+
+orjson and brotli are optional; their columns are skipped when missing.
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.core.responses import ORJSONResponse, orjson
+from app.utils.compression import BROTLI_QUALITY, GZIP_LEVEL, available_encodings, compress
+
+# ----------------------------------------
+# PAYLOADS
+# ----------------------------------------
+USER_LINES = [
+    "hi", "what does your platform do?", "how much is the business plan?",
+    "can I book a demo next week?", "is my data encrypted at rest?",
+    "we have around 40 support agents, does it scale?", "asha.sharma@example.com",
+    "do you integrate with Google Sheets?", "मूल्य निर्धारण क्या है?", "thanks!",
+]
+BOT_LINES = [
+    "CohrenzAI is an AI-powered chatbot platform that helps businesses convert website visitors into qualified leads.",
+    "Our Standard plan is $300/month and includes unlimited conversations, lead capture and Google Sheets export.",
+    "You can add the widget with a single script tag; it goes live as soon as your knowledge base is trained.",
+    "All data is encrypted in transit (TLS 1.2+) and at rest, and you can request deletion at any time.",
+    "Before we continue, may I know your name?",
+]
+
+
+def chat_history(rng: random.Random, count: int) -> Dict:
+    started = datetime(2026, 3, 1, 9, 30)
+    chats = []
+    for index in range(count):
+        sender = "user" if index % 2 == 0 else "ai"
+        chats.append({
+            "id": 10_000 + count - index,
+            "session_id": "session_1712345678901_k3j9x2m1q",
+            "sender": sender,
+            "message": rng.choice(USER_LINES if sender == "user" else BOT_LINES),
+            "timestamp": started + timedelta(seconds=37 * index),
+        })
+    return {"chats": chats, "next_before_id": chats[-1]["id"] if chats else None}
+
+
+def lead_record(_: random.Random) -> Dict:
+    return {
+        "status": "success",
+        "data": {
+            "id": 4821,
+            "session_id": "session_1712345678901_k3j9x2m1q",
+            "name": "Asha Sharma",
+            "email": "asha.sharma@example.com",
+            "phone": "+919876543210",
+            "intent_summary": (
+                "User intent: interested in pricing, demo, services | Engagement: 9 user message(s) | "
+                "Questioning behavior: asked 6 question(s) | Contact signal: user shared direct contact "
+                "details | Latest user need: can I book a demo next week?"
+            ),
+            "predicted_intent": "Evaluating the Standard plan for a 40-agent support team; wants a demo.",
+            "created_at": datetime(2026, 3, 1, 9, 41, 12),
+        },
+    }
+
+
+def chat_answer(_: random.Random) -> Dict:
+    return {"answer": BOT_LINES[1] + "\n\n" + BOT_LINES[4], "lead_completed": False, "is_lead_flow": True}
+
+
+def analytics(rng: random.Random) -> Dict:
+    day = datetime(2026, 2, 1)
+    return {
+        "days": [
+            {
+                "day": (day + timedelta(days=offset)).date(),
+                "leads_started": rng.randint(20, 80),
+                "leads_completed": rng.randint(5, 40),
+                "by_trigger": {"keyword": rng.randint(5, 40), "opportunistic": rng.randint(0, 10), "proactive": rng.randint(0, 20)},
+            }
+            for offset in range(30)
+        ]
+    }
+
+
+PAYLOADS: Dict[str, Callable[[random.Random], Dict]] = {
+    "chat_answer": chat_answer,
+    "lead": lead_record,
+    "history_20": lambda rng: chat_history(rng, 20),
+    "history_100": lambda rng: chat_history(rng, 100),
+    "analytics_30d": analytics,
+}
+
+RENDERERS: Dict[str, Callable[[object], bytes]] = {"json": JSONResponse(None).render}
+if orjson is not None:
+    RENDERERS["orjson"] = ORJSONResponse(None).render
+
+
+# ----------------------------------------
+# TIMING
+# ----------------------------------------
+def time_round(func: Callable, loops: int) -> float:
+    gc.disable()
+    try:
+        started = time.perf_counter_ns()
+        for _ in range(loops):
+            func()
+        return (time.perf_counter_ns() - started) / loops
+    finally:
+        gc.enable()
+
+
+def measure_us(func: Callable, rounds: int, min_round_ms: float) -> Dict[str, float]:
+    func()
+    loops = 1
+    while time_round(func, loops) * loops < min_round_ms * 1e6:
+        loops *= 2
+    samples = [time_round(func, loops) / 1000 for _ in range(rounds)]
+    return {
+        "min_us": round(min(samples), 2),
+        "median_us": round(statistics.median(samples), 2),
+    }
+
+
+def run(names: List[str], rounds: int, min_round_ms: float, seed: int) -> Dict:
+    results = {}
+    for name in names:
+        payload = PAYLOADS[name](random.Random(seed))
+        encoded = jsonable_encoder(payload)
+        row = {"render": {}, "encode_and_render": {}, "compression": {}}
+
+        for renderer, render in RENDERERS.items():
+            body = render(encoded)
+            row["render"][renderer] = {**measure_us(lambda: render(encoded), rounds, min_round_ms), "bytes": len(body)}
+            row["encode_and_render"][renderer] = measure_us(lambda: render(jsonable_encoder(payload)), rounds, min_round_ms)
+        if orjson is not None:
+            # Returning the response class directly skips jsonable_encoder;
+            # orjson handles datetimes itself.
+            render = RENDERERS["orjson"]
+            row["orjson_without_encoder"] = measure_us(lambda: render(payload), rounds, min_round_ms)
+
+        body = list(RENDERERS.values())[-1](encoded)
+        for encoding in available_encodings():
+            compressed = compress(body, encoding)
+            row["compression"][encoding] = {
+                **measure_us(lambda: compress(body, encoding), rounds, min_round_ms),
+                "bytes": len(compressed),
+                "ratio": round(len(compressed) / len(body), 3),
+            }
+
+        if "orjson" in row["render"]:
+            json_us, orjson_us = row["render"]["json"]["min_us"], row["render"]["orjson"]["min_us"]
+            row["orjson_render_speedup"] = round(json_us / orjson_us, 2) if orjson_us else None
+            # What a request actually saves: a dict returned through
+            # jsonable_encoder + json.dumps before, vs the handler returning
+            # ORJSONResponse itself.
+            before_us = row["encode_and_render"]["json"]["min_us"]
+            after_us = row["orjson_without_encoder"]["min_us"]
+            row["end_to_end_speedup"] = round(before_us / after_us, 2) if after_us else None
+        results[name] = row
+
+    return {
+        "python": sys.version.split()[0],
+        "orjson": getattr(orjson, "__version__", None),
+        "gzip_level": GZIP_LEVEL,
+        "brotli_quality": BROTLI_QUALITY if "br" in available_encodings() else None,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payloads", nargs="*", default=list(PAYLOADS), choices=list(PAYLOADS))
+    parser.add_argument("--rounds", type=int, default=11)
+    parser.add_argument("--min-round-ms", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    report = run(args.payloads, args.rounds, args.min_round_ms, args.seed)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output + "\n")
@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""Recall@k, MRR, search latency and index memory of the PDF retriever.
+
+Builds the knowledge base the way app.app does (pdfs/ -> pages -> recursive
+character chunks -> embeddings -> vector index), but with the deterministic
+FakeEmbeddings from benchmarks/fake_ai.py, so results are reproducible and
+offline. Several chunking/index configurations run side by side over the
+same labeled question set:
+
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py \\
+        --config chunk=1000,overlap=200,index=flat \\
+        --config chunk=1000,overlap=200,index=ivf,nlist=16,nprobe=4 \\
+        --config chunk=500,overlap=100,index=sq8
+
+Config keys: chunk, overlap, index (flat | ivf | sq8 | faiss-flat |
+faiss-ivf | faiss-hnsw), dim, nlist, nprobe, m. The first config is the
+reference; --max-recall-drop exits 1 when any other config loses more
+recall@k than that, so a faster index can't quietly cost answer quality.
+
+Gold set: the PDFs are written by fpdf, and every bold 12pt subheading
+("What is CohrenzAI?", "Leads are not appearing in Google Sheets", "2.2
+Authentication & Authorization" ...) is followed by the body text that
+answers it. Each subheading becomes a query and its body the answer. A
+retrieved chunk counts as relevant when it shares at least half of the
+smaller of the two word 5-gram sets, so the labels don't depend on
+how a config chunks. --questions FILE takes a JSON list of
+{"query": ..., "answer": ...} instead.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_ai import FakeEmbeddings, LatencyModel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PDF_DIR = os.path.join(ROOT, "pdfs")
+
+# app.app: RecursiveCharacterTextSplitter(1000, 200), retriever k = RETRIEVER_K.
+PRODUCTION_CONFIG = "chunk=1000,overlap=200,index=flat"
+PRODUCTION_K = 4
+
+DEFAULT_CONFIGS = [
+    PRODUCTION_CONFIG,
+    "chunk=500,overlap=100,index=flat",
+    "chunk=1500,overlap=300,index=flat",
+    "chunk=1000,overlap=200,index=ivf,nlist=16,nprobe=4",
+    "chunk=1000,overlap=200,index=sq8",
+]
+
+MIN_ANSWER_WORDS = 8
+SHINGLE = 5
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+# ----------------------------------------
+# PDF TEXT
+# ----------------------------------------
+STREAM = re.compile(rb"/Length (\d+)\s*>>\s*stream\r?\n")
+TEXT_OPS = re.compile(rb"/(F\d+) ([\d.]+) Tf|\(((?:\\.|[^\\)])*)\) Tj")
+FONT_REF = re.compile(rb"/(F\d+) (\d+) 0 R")
+BASE_FONT = re.compile(rb"(\d+) 0 obj\s*<<[^>]*?/BaseFont /([\w-]+)", re.S)
+ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "b": "\b", "f": "\f", "(": "(", ")": ")", "\\": "\\"}
+
+
+def _unescape(raw: bytes) -> str:
+    text = raw.decode("latin-1")
+    return re.sub(
+        r"\\([0-7]{1,3}|.)",
+        lambda m: chr(int(m.group(1), 8)) if m.group(1)[0] in "01234567" else ESCAPES.get(m.group(1), m.group(1)),
+        text,
+    )
+
+
+def read_fpdf_lines(path: str) -> List[List[Tuple[str, float, str]]]:
+    """
+    Per page, (font, size, text) for every text line. Good enough for the
+    core-font, Flate-compressed PDFs fpdf writes; not a general parser.
+    """
+    with open(path, "rb") as handle:
+        data = handle.read()
+
+    objects = dict(BASE_FONT.findall(data))
+    fonts = {name.decode(): objects.get(ref, b"").decode() for name, ref in FONT_REF.findall(data)}
+
+    pages = []
+    for match in STREAM.finditer(data):
+        raw = data[match.end():match.end() + int(match.group(1))]
+        try:
+            content = zlib.decompress(raw)
+        except zlib.error:
+            continue  # font programs, images
+        lines, font, size = [], "", 0.0
+        for op in TEXT_OPS.finditer(content):
+            if op.group(1):
+                font, size = fonts.get(op.group(1).decode(), op.group(1).decode()), float(op.group(2))
+            else:
+                lines.append((font, size, _unescape(op.group(3))))
+        if lines:
+            pages.append(lines)
+    return pages
+
+
+def load_pages(folder: str) -> List[Dict]:
+    """
+    [{"text", "source", "page"}] per PDF page. Uses pypdf (what PyPDFLoader
+    wraps) when installed so chunk text matches production exactly.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        PdfReader = None
+
+    pages = []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(".pdf"):
+            continue
+        path = os.path.join(folder, name)
+        if PdfReader is not None:
+            texts = [page.extract_text() or "" for page in PdfReader(path).pages]
+        else:
+            texts = ["\n".join(text for _, _, text in lines) for lines in read_fpdf_lines(path)]
+        pages.extend({"text": text, "source": name, "page": number} for number, text in enumerate(texts))
+    return pages
+
+
+def gold_questions(folder: str) -> List[Dict]:
+    """
+    Bold 12pt subheadings and the body text under them, across all PDFs.
+    """
+    questions = []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(".pdf"):
+            continue
+        current: Optional[Dict] = None
+        for lines in read_fpdf_lines(os.path.join(folder, name)):
+            for font, size, text in lines:
+                if font.endswith("-Bold") and size >= 12:
+                    if current:
+                        questions.append(current)
+                    current = {"query": text.strip(), "answer": "", "source": name} if size == 12 else None
+                elif current is not None and size >= 10:  # skip 8pt footers, 10pt bold page headers
+                    if not (font.endswith("-Bold") and size == 10):
+                        current["answer"] += " " + text
+        if current:
+            questions.append(current)
+
+    return [
+        {**question, "answer": question["answer"].strip()}
+        for question in questions
+        if len(WORD.findall(question["answer"])) >= MIN_ANSWER_WORDS
+    ]
+
+
+def shingles(text: str) -> set:
+    words = [word.lower() for word in WORD.findall(text)]
+    if len(words) < SHINGLE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)}
+
+
+def is_relevant(answer_shingles: set, chunk_shingles: set) -> bool:
+    smaller = min(len(answer_shingles), len(chunk_shingles))
+    return smaller > 0 and len(answer_shingles & chunk_shingles) >= 0.5 * smaller
+
+
+# ----------------------------------------
+# CHUNKING
+# ----------------------------------------
+SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+def _merge(splits: List[str], separator: str, chunk_size: int, overlap: int) -> List[str]:
+    chunks, window, total = [], [], 0
+    for piece in splits:
+        extra = len(separator) if window else 0
+        if window and total + len(piece) + extra > chunk_size:
+            chunks.append(separator.join(window).strip())
+            while window and (total > overlap or total + len(piece) + len(separator) > chunk_size):
+                total -= len(window[0]) + (len(separator) if len(window) > 1 else 0)
+                window.pop(0)
+        window.append(piece)
+        total += len(piece) + (len(separator) if len(window) > 1 else 0)
+    if window:
+        chunks.append(separator.join(window).strip())
+    return [chunk for chunk in chunks if chunk]
+
+
+def split_text(text: str, chunk_size: int, overlap: int, separators: Sequence[str] = SEPARATORS) -> List[str]:
+    """
+    Same algorithm as langchain's RecursiveCharacterTextSplitter (separator
+    dropped at the split, as with keep_separator=False).
+    """
+    separator, remaining = separators[-1], []
+    for index, candidate in enumerate(separators):
+        if candidate == "" or candidate in text:
+            separator, remaining = candidate, list(separators[index + 1:])
+            break
+
+    pieces = text.split(separator) if separator else list(text)
+    chunks, small = [], []
+    for piece in pieces:
+        if len(piece) < chunk_size:
+            small.append(piece)
+            continue
+        if small:
+            chunks.extend(_merge(small, separator, chunk_size, overlap))
+            small = []
+        if remaining:
+            chunks.extend(split_text(piece, chunk_size, overlap, remaining))
+        else:
+            chunks.append(piece)
+    if small:
+        chunks.extend(_merge(small, separator, chunk_size, overlap))
+    return chunks
+
+
+def chunk_pages(pages: List[Dict], chunk_size: int, overlap: int) -> List[Dict]:
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
+        split = splitter.split_text
+    except ImportError:
+        split = lambda text: split_text(text, chunk_size, overlap)
+
+    return [
+        {"text": text, "source": page["source"], "page": page["page"]}
+        for page in pages
+        for text in split(page["text"])
+    ]
+
+
+# ----------------------------------------
+# INDEXES
+# ----------------------------------------
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+class FlatIndex:
+    """
+    Exact inner product over every vector (FAISS IndexFlatIP).
+    """
+
+    def __init__(self, dimensions: int, **_):
+        self.dimensions = dimensions
+        self.vectors: List[List[float]] = []
+
+    def add(self, vectors: List[List[float]]):
+        self.vectors.extend(vectors)
+
+    def search(self, vector: List[float], k: int) -> List[int]:
+        scored = sorted(((_dot(vector, candidate), index) for index, candidate in enumerate(self.vectors)), reverse=True)
+        return [index for _, index in scored[:k]]
+
+    def memory_bytes(self) -> int:
+        return len(self.vectors) * self.dimensions * 4
+
+
+class IVFIndex(FlatIndex):
+    """
+    k-means coarse quantiser with nlist cells; a query scans the nprobe
+    closest cells (FAISS IndexIVFFlat).
+    """
+
+    def __init__(self, dimensions: int, nlist: int = 16, nprobe: int = 4, seed: int = 7, **_):
+        super().__init__(dimensions)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids: List[List[float]] = []
+        self.cells: List[List[int]] = []
+
+    def add(self, vectors: List[List[float]]):
+        super().add(vectors)
+        self._train()
+
+    def _train(self, iterations: int = 10):
+        rng = random.Random(self.seed)
+        count = min(self.nlist, len(self.vectors))
+        self.centroids = [list(vector) for vector in rng.sample(self.vectors, count)]
+        for _ in range(iterations):
+            self.cells = [[] for _ in self.centroids]
+            for index, vector in enumerate(self.vectors):
+                best = max(range(count), key=lambda cell: _dot(vector, self.centroids[cell]))
+                self.cells[best].append(index)
+            for cell, members in enumerate(self.cells):
+                if not members:
+                    continue
+                mean = [sum(values) / len(members) for values in zip(*(self.vectors[i] for i in members))]
+                norm = math.sqrt(_dot(mean, mean)) or 1.0
+                self.centroids[cell] = [value / norm for value in mean]
+
+    def search(self, vector: List[float], k: int) -> List[int]:
+        probes = sorted(range(len(self.centroids)), key=lambda cell: -_dot(vector, self.centroids[cell]))
+        candidates = [index for cell in probes[:self.nprobe] for index in self.cells[cell]]
+        scored = sorted(((_dot(vector, self.vectors[index]), index) for index in candidates), reverse=True)
+        return [index for _, index in scored[:k]]
+
+    def memory_bytes(self) -> int:
+        # float32 vectors + centroids, int64 ids in the inverted lists
+        return super().memory_bytes() + len(self.centroids) * self.dimensions * 4 + len(self.vectors) * 8
+
+
+class SQ8Index(FlatIndex):
+    """
+    int8 scalar quantisation with a per-vector scale (FAISS IndexScalarQuantizer
+    QT_8bit): a quarter of the memory, approximate scores.
+    """
+
+    def __init__(self, dimensions: int, **_):
+        super().__init__(dimensions)
+        self.codes: List[Tuple[float, List[int]]] = []
+
+    def add(self, vectors: List[List[float]]):
+        for vector in vectors:
+            scale = max(abs(value) for value in vector) / 127 or 1.0
+            self.codes.append((scale, [round(value / scale) for value in vector]))
+
+    def search(self, vector: List[float], k: int) -> List[int]:
+        scored = sorted(((scale * _dot(vector, code), index) for index, (scale, code) in enumerate(self.codes)), reverse=True)
+        return [index for _, index in scored[:k]]
+
+    def memory_bytes(self) -> int:
+        return len(self.codes) * (self.dimensions + 4)
+
+
+class FaissIndex:
+    """
+    The real thing, when faiss and numpy are installed.
+    """
+
+    def __init__(self, dimensions: int, kind: str = "flat", nlist: int = 16, nprobe: int = 4, m: int = 32, **_):
+        import faiss
+        import numpy
+
+        self._faiss, self._numpy = faiss, numpy
+        if kind == "ivf":
+            self.index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dimensions), dimensions, nlist, faiss.METRIC_INNER_PRODUCT)
+            self.index.nprobe = nprobe
+        elif kind == "hnsw":
+            self.index = faiss.IndexHNSWFlat(dimensions, m, faiss.METRIC_INNER_PRODUCT)
+        else:
+            self.index = faiss.IndexFlatIP(dimensions)
+
+    def add(self, vectors: List[List[float]]):
+        matrix = self._numpy.asarray(vectors, dtype="float32")
+        if not self.index.is_trained:
+            self.index.train(matrix)
+        self.index.add(matrix)
+
+    def search(self, vector: List[float], k: int) -> List[int]:
+        _, ids = self.index.search(self._numpy.asarray([vector], dtype="float32"), k)
+        return [int(index) for index in ids[0] if index >= 0]
+
+    def memory_bytes(self) -> int:
+        return len(self._faiss.serialize_index(self.index))
+
+
+INDEXES = {
+    "flat": FlatIndex,
+    "ivf": IVFIndex,
+    "sq8": SQ8Index,
+    "faiss-flat": lambda dimensions, **options: FaissIndex(dimensions, "flat", **options),
+    "faiss-ivf": lambda dimensions, **options: FaissIndex(dimensions, "ivf", **options),
+    "faiss-hnsw": lambda dimensions, **options: FaissIndex(dimensions, "hnsw", **options),
+}
+
+
+# ----------------------------------------
+# BENCHMARK
+# ----------------------------------------
+def parse_config(spec: str) -> Dict:
+    config = {"chunk": 1000, "overlap": 200, "index": "flat", "dim": 256, "nlist": 16, "nprobe": 4, "m": 32}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, value = item.partition("=")
+        if key not in config:
+            raise ValueError(f"Unknown config key {key!r} in {spec!r}")
+        config[key] = value if key == "index" else int(value)
+    if config["index"] not in INDEXES:
+        raise ValueError(f"Unknown index {config['index']!r}; choose from {', '.join(INDEXES)}")
+    return config
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(math.ceil(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "mean_ms": round(statistics.fmean(values), 3) if values else 0.0,
+    }
+
+
+def run_config(spec: str, pages: List[Dict], questions: List[Dict], ks: List[int], latency: str, seed: int) -> Dict:
+    config = parse_config(spec)
+    embeddings = FakeEmbeddings(dimensions=config["dim"], latency=LatencyModel.parse(latency, seed))
+
+    chunks = chunk_pages(pages, config["chunk"], config["overlap"])
+    chunk_shingles = [shingles(chunk["text"]) for chunk in chunks]
+
+    started = time.perf_counter()
+    vectors = embeddings.embed_documents([chunk["text"] for chunk in chunks])
+    embed_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index = INDEXES[config["index"]](config["dim"], nlist=config["nlist"], nprobe=config["nprobe"], m=config["m"], seed=seed)
+    index.add(vectors)
+    build_seconds = time.perf_counter() - started
+
+    depth = max(ks)
+    hits = {k: 0 for k in ks}
+    reciprocal_ranks, embed_ms, search_ms, answerable = [], [], [], 0
+    for question in questions:
+        answer = shingles(question["answer"])
+        relevant = {position for position, chunk in enumerate(chunk_shingles) if is_relevant(answer, chunk)}
+        if not relevant:
+            continue  # answer not recoverable from the extracted text
+        answerable += 1
+
+        started = time.perf_counter()
+        vector = embeddings.embed_query(question["query"])
+        embed_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        ranked = index.search(vector, depth)
+        search_ms.append((time.perf_counter() - started) * 1000)
+
+        rank = next((position + 1 for position, chunk_id in enumerate(ranked) if chunk_id in relevant), None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        for k in ks:
+            hits[k] += bool(rank and rank <= k)
+
+    return {
+        "config": spec,
+        "chunks": len(chunks),
+        "mean_chunk_chars": round(statistics.fmean(len(chunk["text"]) for chunk in chunks), 1) if chunks else 0.0,
+        "questions": answerable,
+        **{f"recall@{k}": round(hits[k] / answerable, 4) if answerable else 0.0 for k in ks},
+        f"mrr@{depth}": round(statistics.fmean(reciprocal_ranks), 4) if reciprocal_ranks else 0.0,
+        "embed_query": summarize(embed_ms),
+        "search": summarize(search_ms),
+        "embed_documents_s": round(embed_seconds, 3),
+        "build_s": round(build_seconds, 3),
+        "index_bytes": index.memory_bytes(),
+    }
+
+
+def compare(results: List[Dict], k: int, max_drop: float) -> List[Dict]:
+    reference = results[0][f"recall@{k}"]
+    return [
+        {
+            "config": result["config"],
+            f"recall@{k}": result[f"recall@{k}"],
+            "drop": round(reference - result[f"recall@{k}"], 4),
+            "regressed": reference - result[f"recall@{k}"] > max_drop,
+        }
+        for result in results[1:]
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdfs", default=PDF_DIR)
+    parser.add_argument("--config", action="append", help="repeatable; the first one is the reference")
+    parser.add_argument("--questions", help="JSON list of {query, answer} instead of the PDF subheadings")
+    parser.add_argument("--questions-only", action="store_true", help="only subheadings phrased as questions")
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, PRODUCTION_K, 10])
+    parser.add_argument("--embed-latency", default="fixed:0", help="FakeEmbeddings latency, e.g. normal:40,10")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--max-recall-drop", type=float, help=f"fail when recall@{PRODUCTION_K} drops more than this")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pdfs)
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as handle:
+            questions = json.load(handle)
+    else:
+        questions = gold_questions(args.pdfs)
+    if args.questions_only:
+        questions = [question for question in questions if question["query"].endswith("?")]
+
+    ks = sorted(set(args.ks) | {PRODUCTION_K})
+    results = [
+        run_config(spec, pages, questions, ks, args.embed_latency, args.seed)
+        for spec in (args.config or DEFAULT_CONFIGS)
+    ]
+    report = {
+        "pages": len(pages),
+        "gold_questions": len(questions),
+        "k": PRODUCTION_K,
+        "results": results,
+    }
+
+    exit_code = 0
+    if args.max_recall_drop is not None:
+        rows = compare(results, PRODUCTION_K, args.max_recall_drop)
+        report["comparison"] = rows
+        exit_code = 1 if any(row["regressed"] for row in rows) else 0
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output + "\n")
+    sys.exit(exit_code)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Per-export latency of the Google Sheets client: rebuilt per call vs cached.
+
+Runs against benchmarks/fake_sheets_server.py so no Google account or network
+is needed. "rebuild" reproduces the old behaviour (load credentials and run
+discovery.build for every export); "cached" uses the process-wide client.
+
+    python benchmarks/bench_sheets_client.py --exports 200 --latency-ms 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_sheets_server import start_fake_sheets_server
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    return {
+        "exports": len(samples_ms),
+        "mean_ms": round(statistics.fmean(samples_ms), 3),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+    }
+
+
+def run(exports: int, latency_ms: float):
+    server, state = start_fake_sheets_server(latency_ms=latency_ms)
+    os.environ["GOOGLE_SHEETS_API_ENDPOINT"] = f"http://127.0.0.1:{server.server_port}/"
+    os.environ.setdefault("GOOGLE_SHEET_ID", "bench-sheet")
+
+    # Import after the env is set: the module reads it at import time.
+    from app.integrations import google_sheets
+
+    lead = {
+        "session_id": "bench-session",
+        "name": "Bench User",
+        "email": "bench@example.com",
+        "phone": "9876543210",
+        "intent_summary": "User intent: interested in pricing, demo",
+    }
+    row = google_sheets.lead_to_row(lead)
+
+    def export_rebuilt():
+        # Old path: credentials + discovery + fresh transport every export.
+        service = google_sheets.build_sheets_service()
+        service.spreadsheets().values().append(
+            spreadsheetId=google_sheets.SPREADSHEET_ID,
+            range=f"{google_sheets.SHEET_NAME}!A1",
+            valueInputOption="RAW",
+            insertDataOption="INSERT_ROWS",
+            body={"values": [row]},
+        ).execute()
+
+    def export_cached():
+        google_sheets.append_rows_to_sheet([row])
+
+    results = {}
+    for label, export in (("rebuild", export_rebuilt), ("cached", export_cached)):
+        export()  # warm-up (first cached call builds the client)
+        samples = []
+        for _ in range(exports):
+            started = time.perf_counter()
+            export()
+            samples.append((time.perf_counter() - started) * 1000.0)
+        results[label] = summarize(samples)
+
+    results["speedup_mean"] = round(results["rebuild"]["mean_ms"] / results["cached"]["mean_ms"], 2)
+    results["rows_received"] = len(state.rows)
+    server.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--exports", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated Sheets API latency")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.exports, args.latency_ms), indent=2))
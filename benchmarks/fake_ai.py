@@ -0,0 +1,193 @@
+"""Deterministic stand-ins for Azure OpenAI: embeddings, chat model, vector store.
+
+Used by the load and retrieval benchmarks so they run offline with stable
+results. Each fake can sleep according to a latency distribution:
+
+    fixed:50            always 50 ms
+    uniform:20,80       uniform between 20 and 80 ms
+    normal:300,50       mean 300 ms, sd 50 (clipped at 0)
+    lognormal:800,0.5   median 800 ms, sigma 0.5 (long right tail)
+"""
+
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+class LatencyModel:
+    def __init__(self, kind: str = "fixed", params: Sequence[float] = (0.0,), seed: int = 0):
+        self.kind = kind
+        self.params = tuple(params)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: int = 0) -> "LatencyModel":
+        kind, _, raw = (spec or "fixed:0").partition(":")
+        params = tuple(float(value) for value in raw.split(",") if value) or (0.0,)
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        return cls(kind, params, seed)
+
+    def sample_ms(self) -> float:
+        with self._lock:
+            if self.kind == "uniform":
+                return self._random.uniform(self.params[0], self.params[1])
+            if self.kind == "normal":
+                return max(0.0, self._random.gauss(self.params[0], self.params[1]))
+            if self.kind == "lognormal":
+                return self._random.lognormvariate(math.log(max(self.params[0], 1e-9)), self.params[1])
+            return self.params[0]
+
+    def sleep(self):
+        delay_ms = self.sample_ms()
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+    def __repr__(self):
+        return f"{self.kind}:{','.join(str(value) for value in self.params)}"
+
+
+def _bucket(feature: str, dimensions: int) -> Tuple[int, float]:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dimensions, 1.0 if (value >> 63) & 1 else -1.0
+
+
+class FakeEmbeddings:
+    """
+    Feature-hashed bag of words (+ bigrams), L2-normalised. Same text, same
+    vector; texts sharing words land close together, so retrieval is meaningful.
+    Implements the LangChain Embeddings interface (embed_query / embed_documents).
+    """
+
+    def __init__(self, dimensions: int = 256, latency: Optional[LatencyModel] = None, bigrams: bool = True):
+        self.dimensions = dimensions
+        self.latency = latency or LatencyModel()
+        self.bigrams = bigrams
+
+    def _vector(self, text: str) -> List[float]:
+        tokens = [token.lower() for token in TOKEN.findall(text)]
+        features = tokens + ([f"{a} {b}" for a, b in zip(tokens, tokens[1:])] if self.bigrams else [])
+        vector = [0.0] * self.dimensions
+        for feature in features:
+            index, sign = _bucket(feature, self.dimensions)
+            vector[index] += sign
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.latency.sleep()
+        return self._vector(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.latency.sleep()
+        return [self._vector(text) for text in texts]
+
+    def __call__(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+class InMemoryVectorStore:
+    """
+    Brute-force inner-product search over normalised vectors (what FAISS
+    IndexFlatIP does), in pure Python so the benchmarks need no numpy/faiss.
+    """
+
+    def __init__(self, embeddings: FakeEmbeddings):
+        self.embeddings = embeddings
+        self.documents: List[SimpleNamespace] = []
+        self.vectors: List[List[float]] = []
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embeddings: FakeEmbeddings, metadatas: Optional[List[Dict]] = None):
+        store = cls(embeddings)
+        store.add_texts(texts, metadatas)
+        return store
+
+    def add_texts(self, texts: List[str], metadatas: Optional[List[Dict]] = None):
+        metadatas = metadatas or [{} for _ in texts]
+        self.vectors.extend(self.embeddings._vector(text) for text in texts)
+        self.documents.extend(
+            SimpleNamespace(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)
+        )
+
+    def similarity_search_with_score_by_vector(self, vector: List[float], k: int = 4):
+        scored = [
+            (sum(a * b for a, b in zip(vector, candidate)), index)
+            for index, candidate in enumerate(self.vectors)
+        ]
+        scored.sort(key=lambda item: -item[0])
+        return [(self.documents[index], score) for score, index in scored[:k]]
+
+    def similarity_search_by_vector(self, vector: List[float], k: int = 4):
+        return [document for document, _ in self.similarity_search_with_score_by_vector(vector, k)]
+
+    def memory_bytes(self) -> int:
+        # float32 equivalent, as a real index would store it.
+        return len(self.vectors) * self.embeddings.dimensions * 4
+
+
+CANNED_ANSWERS = [
+    "CohrenzAI offers conversational assistants, document Q&A and workflow automation.",
+    "Our plans start with a free tier; Business and Enterprise add SSO, SLAs and priority support.",
+    "You can integrate the widget with a single script tag and a public key.",
+    "All data is encrypted in transit and at rest, and we support regional data residency.",
+    "Support is available by email around the clock, with phone support on Enterprise plans.",
+]
+
+
+class FakeChatModel:
+    """
+    invoke(prompt) -> object with .content and .usage_metadata, like a
+    LangChain AIMessage. The answer is picked from the prompt hash.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, prompt) -> SimpleNamespace:
+        text = str(prompt)
+        digest = int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16)
+        content = CANNED_ANSWERS[digest % len(CANNED_ANSWERS)]
+        return SimpleNamespace(
+            content=content,
+            usage_metadata={
+                "input_tokens": len(TOKEN.findall(text)),
+                "output_tokens": len(TOKEN.findall(content)),
+            },
+        )
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.calls += 1
+        self.latency.sleep()
+        return self._answer(prompt)
+
+    def batch(self, prompts):
+        with self._lock:
+            self.calls += 1
+        self.latency.sleep()
+        return [self._answer(prompt) for prompt in prompts]
+
+
+class SimplePromptTemplate:
+    """
+    str.format stand-in for langchain_core PromptTemplate when it isn't installed.
+    """
+
+    def __init__(self, template: str, input_variables: List[str]):
+        self.template = template
+        self.input_variables = input_variables
+
+    def invoke(self, values: Dict) -> str:
+        return self.template.format(**values)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Local fake of the Google Sheets values.append endpoint.
+
+Point the app at it with GOOGLE_SHEETS_API_ENDPOINT=http://127.0.0.1:<port>/
+(and any GOOGLE_SHEET_ID). Appended rows are kept in memory and can be read
+back with GET /rows. Latency and failure rate are configurable so retries,
+backoff and dead-lettering can be exercised offline.
+
+    python benchmarks/fake_sheets_server.py --port 8089 --fail-rate 0.2
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APPEND_PATH = re.compile(r"^/v4/spreadsheets/(?P<sheet_id>[^/]+)/values/(?P<range>[^/?]+):append")
+
+
+class FakeSheetsState:
+    def __init__(self, latency_ms: float = 0.0, fail_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.rows = []
+        self.append_calls = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state: FakeSheetsState):
+    class FakeSheetsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith("/rows"):
+                with state.lock:
+                    self._send_json(200, {"rows": state.rows, "append_calls": state.append_calls})
+                return
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b"{}"
+
+            match = APPEND_PATH.match(self.path)
+            if not match:
+                self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+                return
+
+            if state.latency_ms:
+                time.sleep(state.latency_ms / 1000.0)
+            if state.fail_rate and random.random() < state.fail_rate:
+                self._send_json(503, {"error": {"code": 503, "message": "Backend Error"}})
+                return
+
+            values = json.loads(raw or b"{}").get("values", [])
+            with state.lock:
+                state.rows.extend(values)
+                state.append_calls += 1
+
+            self._send_json(200, {
+                "spreadsheetId": match.group("sheet_id"),
+                "updates": {
+                    "spreadsheetId": match.group("sheet_id"),
+                    "updatedRange": match.group("range"),
+                    "updatedRows": len(values),
+                },
+            })
+
+    return FakeSheetsHandler
+
+
+def start_fake_sheets_server(port: int = 0, latency_ms: float = 0.0, fail_rate: float = 0.0):
+    """
+    Start in a daemon thread. Returns (server, state); the bound port is server.server_port.
+    """
+    state = FakeSheetsState(latency_ms=latency_ms, fail_rate=fail_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, name="fake-sheets", daemon=True)
+    thread.start()
+    return server, state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, _ = start_fake_sheets_server(args.port, args.latency_ms, args.fail_rate)
+    print(f"Fake Sheets API on http://127.0.0.1:{server.server_port}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""End-to-end load test of /chat and /api/lead with fake AI and a local DB.
+
+Starts the FastAPI app under uvicorn on SQLite, swaps Azure OpenAI for the
+deterministic fakes in benchmarks/fake_ai.py (each with its own latency
+distribution) and points the Sheets export at benchmarks/fake_sheets_server.py.
+Workers then replay synthetic multi-turn conversations (greetings, product
+and pricing questions, email/phone drops, the lead form) at the requested
+concurrency and the run is summarised as JSON.
+
+    python benchmarks/load_test.py --concurrency 32 --conversations 400 \
+        --llm-latency lognormal:800,0.5 --embed-latency normal:40,10
+
+Exit status is 1 when --max-p95-ms or --min-rps is given and not met.
+Client and server share one process, so compare runs made on the same
+machine rather than reading the numbers as production capacity.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_ai import FakeChatModel, FakeEmbeddings, InMemoryVectorStore, LatencyModel, SimplePromptTemplate
+from benchmarks.fake_sheets_server import start_fake_sheets_server
+
+# ----------------------------------------
+# SYNTHETIC CONVERSATIONS
+# ----------------------------------------
+GREETINGS = ["hi", "hello", "hey there", "good morning"]
+QUESTIONS = [
+    "what does your platform do?",
+    "how does the integration with our website work?",
+    "is my data encrypted at rest?",
+    "which languages does the assistant support?",
+    "can it answer questions from our own documents?",
+    "what happens if the assistant does not know an answer?",
+]
+PRICING = [
+    "what is the pricing for the business plan?",
+    "how much does it cost for 10,000 conversations a month?",
+    "can I book a demo with your team?",
+    "do you offer a free trial?",
+]
+CLOSINGS = ["thanks", "thank you", "ok great"]
+FIRST_NAMES = ["Asha", "Rahul", "Maria", "Chen", "Fatima", "John", "Priya", "Lukas", "Aiko", "Omar"]
+LAST_NAMES = ["Sharma", "Patel", "Garcia", "Wei", "Khan", "Smith", "Iyer", "Becker", "Sato", "Haddad"]
+
+# kind -> weight
+CONVERSATION_MIX = {
+    "browse": 3,      # greeting, questions, thanks (LLM path only)
+    "pricing": 3,     # pricing keyword starts the lead flow in /chat
+    "email_drop": 1,  # opportunistic contact: a bare email address
+    "phone_drop": 1,  # opportunistic contact: a bare phone number
+    "form": 2,        # lead flow started in /chat, answered through /api/lead
+    "proactive": 1,   # enough questions to hit the proactive threshold
+}
+
+
+def make_contact(rng: random.Random, index: int) -> Dict[str, str]:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return {
+        "name": f"{first} {last}",
+        "email": f"{first.lower()}.{last.lower()}.{index}@example.com",
+        "phone": f"9{rng.randrange(10 ** 8, 10 ** 9)}",
+    }
+
+
+def make_conversation(rng: random.Random, index: int) -> Dict:
+    kinds, weights = zip(*CONVERSATION_MIX.items())
+    kind = rng.choices(kinds, weights)[0]
+    contact = make_contact(rng, index)
+    script = [rng.choice(GREETINGS)]
+    if kind == "browse":
+        script += rng.sample(QUESTIONS, 2) + [rng.choice(CLOSINGS)]
+    elif kind in ("pricing", "form"):
+        script += [rng.choice(QUESTIONS), rng.choice(PRICING)]
+    elif kind == "email_drop":
+        # Opportunistic detection needs the message to be just the contact.
+        script += [rng.choice(QUESTIONS), contact["email"]]
+    elif kind == "phone_drop":
+        script += [rng.choice(QUESTIONS), contact["phone"]]
+    elif kind == "proactive":
+        script += rng.sample(QUESTIONS, 4)
+    return {
+        "session_id": f"load-{index}-{rng.randrange(16 ** 8):08x}",
+        "kind": kind,
+        "script": script,
+        "contact": contact,
+        "lead_via": "/api/lead" if kind == "form" else "/chat",
+    }
+
+
+def reply_for_prompt(answer: str, contact: Dict[str, str]):
+    """
+    The contact detail the bot just asked for, if any.
+    """
+    text = answer.lower()
+    if "name" in text:
+        return contact["name"]
+    if "email" in text:
+        return contact["email"]
+    if "phone" in text:
+        return contact["phone"]
+    return None
+
+
+# ----------------------------------------
+# APP UNDER TEST
+# ----------------------------------------
+def configure_environment(args, sheets_port: int, workdir: str):
+    # Settings are read once, so everything must be in place before importing app.
+    os.environ.update({
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "load.db"),
+        "GOOGLE_SHEET_ID": "load-test",
+        "GOOGLE_SHEETS_API_ENDPOINT": f"http://127.0.0.1:{sheets_port}/",
+        "SHEETS_EXPORT_POLL_SECONDS": "0.5",
+        "RATE_LIMIT_ENABLED": "true" if args.rate_limit else "false",
+        "LLM_MAX_CONCURRENCY": str(args.llm_concurrency),
+        "RETENTION_ENABLED": "false",
+        "SLOW_REQUEST_LOG_PATH": "",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    })
+    # Never reach a real Azure deployment from a load test.
+    os.environ.pop("AZURE_OPENAI_ENDPOINT", None)
+    os.environ.pop("OPENAI_API_KEY", None)
+
+
+def install_fakes(args):
+    import app.app as chat_app
+    from app.services.conversation_memory import set_summarizer
+    from app.services.intent_prediction import set_intent_predictor
+
+    embeddings = FakeEmbeddings(latency=LatencyModel.parse(args.embed_latency, seed=args.seed))
+    llm = FakeChatModel(latency=LatencyModel.parse(args.llm_latency, seed=args.seed + 1))
+    rng = random.Random(args.seed)
+    vocabulary = " ".join(QUESTIONS + PRICING).split()
+    corpus = [" ".join(rng.choices(vocabulary, k=120)) for _ in range(args.chunks)]
+    vector_store = InMemoryVectorStore.from_texts(corpus, embeddings)
+
+    chat_app.embeddings = embeddings
+    chat_app.vector_store = vector_store
+    chat_app.retriever = vector_store
+    chat_app.llm = llm
+    chat_app.embeddings_setup = True
+    if not hasattr(chat_app, "PromptTemplate"):
+        try:
+            from langchain_core.prompts import PromptTemplate
+        except ImportError:
+            PromptTemplate = SimplePromptTemplate
+        chat_app.PromptTemplate = PromptTemplate
+
+    set_summarizer(lambda summary, messages: str(llm.invoke(f"{summary}\n{messages}").content))
+    set_intent_predictor(lambda transcripts: [str(reply.content) for reply in llm.batch(transcripts)])
+    return chat_app.app, llm
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app, port: int):
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name="uvicorn", daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("uvicorn did not start")
+        time.sleep(0.05)
+    return server, thread
+
+
+# ----------------------------------------
+# DRIVER
+# ----------------------------------------
+class Results:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, int] = {}
+        self.errors: List[str] = []
+        self.conversations = 0
+        self.leads_completed = 0
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, status, elapsed_ms: float):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(elapsed_ms)
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+
+
+def post(client, results: Results, endpoint: str, payload: Dict):
+    started = time.perf_counter()
+    try:
+        response = client.post(endpoint, json=payload)
+        status = response.status_code
+        body = response.json() if status == 200 else {}
+    except Exception as e:
+        status, body = "error", {}
+        with results._lock:
+            if len(results.errors) < 20:
+                results.errors.append(f"{endpoint}: {e}")
+    results.record(endpoint, status, (time.perf_counter() - started) * 1000.0)
+    return body
+
+
+def run_conversation(client, results: Results, conversation: Dict, max_turns: int = 12):
+    session_id, contact = conversation["session_id"], conversation["contact"]
+    pending = list(conversation["script"])
+    turns, completed = 0, False
+    while pending and turns < max_turns:
+        message = pending.pop(0)
+        body = post(client, results, "/chat", {"session_id": session_id, "message": message})
+        turns += 1
+        if body.get("lead_completed"):
+            completed = True
+        if body.get("is_lead_flow") or "may i know your name" in body.get("answer", "").lower():
+            if conversation["lead_via"] == "/api/lead":
+                completed = fill_lead_form(client, results, session_id, contact, body.get("answer", "")) or completed
+            else:
+                reply = reply_for_prompt(body.get("answer", ""), contact)
+                if reply and not completed:
+                    pending.insert(0, reply)
+    with results._lock:
+        results.conversations += 1
+        results.leads_completed += int(completed)
+
+
+def fill_lead_form(client, results: Results, session_id: str, contact: Dict, prompt: str) -> bool:
+    for _ in range(4):
+        reply = reply_for_prompt(prompt, contact)
+        if not reply:
+            return False
+        body = post(client, results, "/api/lead", {"session_id": session_id, "user_message": reply})
+        if body.get("lead_completed"):
+            return True
+        prompt = body.get("message") or ""
+    return False
+
+
+def drive(base_url: str, conversations: List[Dict], concurrency: int, results: Results) -> float:
+    import httpx
+
+    queue_lock = threading.Lock()
+    remaining = list(reversed(conversations))
+
+    def worker():
+        with httpx.Client(base_url=base_url, timeout=60.0) as client:
+            while True:
+                with queue_lock:
+                    if not remaining:
+                        return
+                    conversation = remaining.pop()
+                run_conversation(client, results, conversation)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return time.perf_counter() - started
+
+
+# ----------------------------------------
+# REPORT
+# ----------------------------------------
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    if not samples_ms:
+        return {"requests": 0}
+    return {
+        "requests": len(samples_ms),
+        "mean_ms": round(statistics.fmean(samples_ms), 3),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3),
+    }
+
+
+def scrape_counters(base_url: str) -> Dict[str, float]:
+    """
+    Unlabelled and labelled counter totals from /metrics (histograms skipped).
+    """
+    import httpx
+
+    counters: Dict[str, float] = {}
+    for line in httpx.get(f"{base_url}/metrics").text.splitlines():
+        if line.startswith("#") or "_bucket" in line or not line.strip():
+            continue
+        name, _, value = line.rpartition(" ")
+        if name.startswith("chatbot_stage_seconds"):
+            continue
+        counters[name] = float(value)
+    return counters
+
+
+def stage_means_ms(base_url: str) -> Dict[str, float]:
+    import httpx
+
+    sums: Dict[str, float] = {}
+    counts: Dict[str, float] = {}
+    for line in httpx.get(f"{base_url}/metrics").text.splitlines():
+        for suffix, target in (("_sum", sums), ("_count", counts)):
+            prefix = f"chatbot_stage_seconds{suffix}" + '{stage="'
+            if line.startswith(prefix):
+                stage, _, value = line[len(prefix):].partition('"} ')
+                target[stage] = float(value)
+    return {stage: round(sums[stage] / counts[stage] * 1000.0, 3) for stage in sums if counts.get(stage)}
+
+
+def run(args) -> Tuple[Dict, bool]:
+    sheets_server, sheets_state = start_fake_sheets_server(latency_ms=args.sheets_latency_ms)
+    workdir = tempfile.mkdtemp(prefix="chatbot-load-")
+    configure_environment(args, sheets_server.server_port, workdir)
+    app, llm = install_fakes(args)
+
+    port = free_port()
+    server, thread = start_server(app, port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    rng = random.Random(args.seed)
+    if args.warmup:
+        drive(base_url, [make_conversation(rng, -i - 1) for i in range(args.warmup)], args.concurrency, Results())
+    counters_before = scrape_counters(base_url)
+
+    conversations = [make_conversation(rng, i) for i in range(args.conversations)]
+    results = Results()
+    elapsed = drive(base_url, conversations, args.concurrency, results)
+
+    counters_after = scrape_counters(base_url)
+    stages = stage_means_ms(base_url)
+    time.sleep(args.drain_seconds)  # let the intent worker and Sheets exporter catch up
+    server.should_exit = True
+    thread.join(timeout=10)
+    sheets_server.shutdown()
+
+    all_samples = [sample for samples in results.samples.values() for sample in samples]
+    requests = len(all_samples)
+    report = {
+        "config": {
+            "concurrency": args.concurrency,
+            "conversations": args.conversations,
+            "llm_latency": args.llm_latency,
+            "embed_latency": args.embed_latency,
+            "llm_concurrency": args.llm_concurrency,
+            "rate_limit": args.rate_limit,
+            "mix": CONVERSATION_MIX,
+            "seed": args.seed,
+        },
+        "duration_s": round(elapsed, 3),
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "conversations_per_s": round(results.conversations / elapsed, 2) if elapsed else 0.0,
+        "latency": summarize(all_samples),
+        "endpoints": {endpoint: summarize(samples) for endpoint, samples in sorted(results.samples.items())},
+        "statuses": results.statuses,
+        "errors": results.errors,
+        "leads_completed": results.leads_completed,
+        "llm_calls": llm.calls,
+        "sheets_rows": len(sheets_state.rows),
+        "stage_mean_ms": stages,
+        "counters": {
+            name: value - counters_before.get(name, 0.0)
+            for name, value in sorted(counters_after.items())
+            if value - counters_before.get(name, 0.0)
+        },
+    }
+
+    passed = True
+    if args.max_p95_ms is not None and report["latency"].get("p95_ms", 0) > args.max_p95_ms:
+        passed = False
+    if args.min_rps is not None and report["throughput_rps"] < args.min_rps:
+        passed = False
+    report["passed"] = passed
+    return report, passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10, help="conversations run before measuring")
+    parser.add_argument("--llm-latency", default="lognormal:300,0.4", help="fake LLM latency distribution")
+    parser.add_argument("--embed-latency", default="normal:30,8", help="fake embedding latency distribution")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="LLM_MAX_CONCURRENCY for the app")
+    parser.add_argument("--sheets-latency-ms", type=float, default=20.0)
+    parser.add_argument("--chunks", type=int, default=300, help="documents in the fake vector store")
+    parser.add_argument("--rate-limit", action="store_true", help="keep admission rate limits on")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--drain-seconds", type=float, default=1.0)
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="fail if overall p95 exceeds this")
+    parser.add_argument("--min-rps", type=float, default=None, help="fail if throughput is below this")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    report, passed = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,40 @@
+# Multi-worker serving:  gunicorn -c gunicorn.conf.py app.app:app
+#
+# The PDF knowledge index is built once in the master before any worker
+# starts; each worker then memory-maps it read-only (see
+# app/services/knowledge_index.py), so adding workers doesn't add index
+# memory. Per-process state to keep in mind with N workers:
+#   - RATE_LIMIT_BACKEND=redis to share rate limits (the default is per worker)
+#   - /metrics and the lead dedupe index are per worker
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Workers import the app themselves: forking after the Azure clients exist
+# would share their connection pools between processes.
+preload_app = False
+
+
+def on_starting(server):
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if not (os.getenv("AZURE_OPENAI_ENDPOINT") and os.getenv("OPENAI_API_KEY")):
+        return
+    try:
+        from app.core.config import get_settings
+        from app.services.knowledge_index import azure_embeddings, ensure_knowledge_index
+
+        settings = get_settings()
+        if settings.knowledge_index_enabled:
+            path = ensure_knowledge_index(settings.knowledge_pdf_dir, azure_embeddings(), settings.knowledge_index_dir)
+            server.log.info("Knowledge index ready: %s", path)
+    except Exception as e:
+        # Workers fall back to building it themselves (one at a time, under the lock).
+        server.log.warning("Knowledge index prebuild failed: %s", e)
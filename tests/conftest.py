@@ -0,0 +1,23 @@
+import pytest
+
+from app.core.config import get_settings
+from app.leads import lead_index
+from app.storage.factory import get_storage
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """
+    A migrated SQLite database per test, behind the usual get_storage().
+    """
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "chatbot.db"))
+    monkeypatch.setattr(lead_index, "_index", lead_index.LeadIndex())
+    get_settings.cache_clear()
+    get_storage.cache_clear()
+    store = get_storage()
+    store.migrate()
+    yield store
+    store.close()
+    get_storage.cache_clear()
+    get_settings.cache_clear()
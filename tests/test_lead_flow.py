@@ -0,0 +1,142 @@
+import pytest
+
+from app.leads.lead_extractor import COMPILED_LEAD_FLOW, process_lead_input
+from app.leads.lead_flow import LeadRecord, TurnInput, run_lead_turn
+from app.leads.lead_index import get_lead_index
+
+EMAIL = "asha@example.com"
+PHONE = "9876543210"
+THANK_YOU = "Thank you! Our team will reach out to you shortly!"
+
+
+def start_session(storage, session_id, state, **fields):
+    storage.load_lead_record(session_id)
+    storage.update_lead_state(session_id, state)
+    if fields:
+        storage.upsert_lead_fields(session_id, fields)
+
+
+def exported_sessions(storage):
+    return [row[0] for row in storage._fetchall("SELECT session_id FROM lead_export_outbox ORDER BY id")]
+
+
+# (state, stored fields, message) -> (reply, next state, stored fields after).
+# Replies and states are those of the pre-table process_lead_input branches;
+# a reply of None means the message falls through to normal chat.
+BRANCHES = {
+    "name: casual passes": (
+        "ASKED_NAME", {}, "hi",
+        None, "ASKED_NAME", {},
+    ),
+    "name: completes with stored email and phone": (
+        "ASKED_NAME", {"email": EMAIL, "phone": PHONE}, "Asha Sharma",
+        THANK_YOU, "COMPLETED", {"name": "Asha Sharma", "email": EMAIL, "phone": PHONE},
+    ),
+    "name: asks phone with stored email": (
+        "ASKED_NAME", {"email": EMAIL}, "my name is Asha Sharma",
+        "Great! May I also have your phone number?", "ASKED_PHONE", {"name": "Asha Sharma"},
+    ),
+    "name: asks email": (
+        "ASKED_NAME", {}, "Asha Sharma",
+        "Thanks! Could you please share your email address?", "ASKED_EMAIL", {"name": "Asha Sharma"},
+    ),
+    "name: email instead of name": (
+        "ASKED_NAME", {}, EMAIL,
+        "Got your email! Still need your name though. What's your name?", "ASKED_NAME", {"email": EMAIL},
+    ),
+    "name: phone instead of name": (
+        "ASKED_NAME", {}, "+91 98765 43210",
+        "Got your phone! But I still need your name. What's your name?", "ASKED_NAME", {"phone": PHONE},
+    ),
+    "name: anything else": (
+        "ASKED_NAME", {}, "???",
+        "Could you please tell me your name?", "ASKED_NAME", {},
+    ),
+    "email: completes with stored phone": (
+        "ASKED_EMAIL", {"name": "Asha Sharma", "phone": PHONE}, EMAIL,
+        THANK_YOU, "COMPLETED", {"email": EMAIL, "phone": PHONE},
+    ),
+    "email: asks phone": (
+        "ASKED_EMAIL", {"name": "Asha Sharma"}, EMAIL,
+        "Great. May I also have your phone number?", "ASKED_PHONE", {"email": EMAIL},
+    ),
+    "email: phone instead of email": (
+        "ASKED_EMAIL", {"name": "Asha Sharma"}, PHONE,
+        "Got your phone! I still need your email address. What's your email?", "ASKED_EMAIL", {"phone": PHONE},
+    ),
+    "email: casual passes": (
+        "ASKED_EMAIL", {"name": "Asha Sharma"}, "thanks",
+        None, "ASKED_EMAIL", {},
+    ),
+    "email: invalid": (
+        "ASKED_EMAIL", {"name": "Asha Sharma"}, "not an email",
+        "That doesn't seem like a valid email. Could you re-enter it?", "ASKED_EMAIL", {},
+    ),
+    "phone: completes": (
+        "ASKED_PHONE", {"name": "Asha Sharma", "email": EMAIL}, PHONE,
+        THANK_YOU, "COMPLETED", {"phone": PHONE},
+    ),
+    "phone: casual passes": (
+        "ASKED_PHONE", {"name": "Asha Sharma", "email": EMAIL}, "ok",
+        None, "ASKED_PHONE", {},
+    ),
+    "phone: invalid": (
+        "ASKED_PHONE", {"name": "Asha Sharma", "email": EMAIL}, "12345",
+        "Please enter a valid 10-digit Indian phone number.", "ASKED_PHONE", {},
+    ),
+    "completed: passes": (
+        "COMPLETED", {"name": "Asha Sharma", "email": EMAIL, "phone": PHONE}, "Asha Sharma",
+        None, "COMPLETED", {},
+    ),
+}
+
+
+@pytest.mark.parametrize("branch", sorted(BRANCHES))
+def test_transition_matches_baseline_branch(storage, branch):
+    state, stored, message, reply, next_state, expected_fields = BRANCHES[branch]
+    start_session(storage, "s1", state, **stored)
+
+    result = process_lead_input("s1", message)
+
+    assert result["message"] == reply
+    assert result["handled"] == (reply is not None)
+    completes = next_state == "COMPLETED" and state != "COMPLETED"
+    assert result["lead_completed"] == completes
+    assert storage.get_lead_state("s1") == next_state
+    lead = storage.get_lead("s1") or {}
+    for name, value in expected_fields.items():
+        assert lead.get(name) == value
+    assert storage.lead_export_exists("s1") == completes
+
+
+def test_email_and_phone_without_name_keeps_asking_for_name():
+    # A single message cannot hold both, so this row is checked on the table alone.
+    lead = LeadRecord(session_id="s1", state="ASKED_NAME")
+    turn = TurnInput(name=None, email=EMAIL, phone=PHONE, is_casual=False)
+
+    transition = run_lead_turn(COMPILED_LEAD_FLOW, lead, turn)
+
+    assert transition.message == "I got your email and phone! Now, could you please tell me your name?"
+    assert lead.state == "ASKED_NAME"
+    assert lead.changes == {"email": EMAIL, "phone": PHONE}
+
+
+@pytest.mark.parametrize("warm_index", [False, True])
+def test_repeat_visitor_merges_without_a_second_export(storage, warm_index):
+    start_session(storage, "first", "ASKED_PHONE", name="Asha Sharma", email=EMAIL)
+    assert process_lead_input("first", PHONE)["lead_completed"]
+    if warm_index:
+        get_lead_index().replace([storage.get_lead("first")])
+
+    # Same person in a new session: the email belongs to the first lead.
+    start_session(storage, "second", "ASKED_NAME")
+    process_lead_input("second", "Asha S")
+    process_lead_input("second", EMAIL.upper())
+    result = process_lead_input("second", PHONE)
+
+    assert result["lead_completed"]
+    assert storage.get_lead_state("second") == "COMPLETED"
+    merged = storage.get_lead("second")
+    assert merged["session_id"] == "first"
+    assert (merged["name"], merged["email"], merged["phone"]) == ("Asha Sharma", EMAIL, PHONE)
+    assert exported_sessions(storage) == ["first"]
@@ -0,0 +1,81 @@
+import asyncio
+
+from app.leads.lead_import import LeadImport, import_leads
+from app.storage.sqlite_backend import SQLiteStorage
+
+
+def run_import(body: bytes, fmt: str = "csv", batch_size: int = 500):
+    async def chunks():
+        # Small chunks so records and quoted fields span reads.
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    return asyncio.run(import_leads(chunks(), fmt, batch_size))
+
+
+def test_report_lists_every_rejected_row(storage):
+    storage.upsert_lead_fields("existing", {"email": "taken@example.com"})
+    body = (
+        "name,email,phone\n"
+        "Asha Sharma,asha@example.com,9876543210\n"
+        "Ravi,not-an-email,\n"
+        "Meera,TAKEN@example.com,\n"
+        "Asha Again,asha@example.com,\n"
+        ",,\n"
+        '"Kumar Jr",kumar@example.com,"98765 43211"\n'
+        "too,many,columns,here\n"
+    ).encode()
+
+    report = run_import(body)
+
+    assert (report["rows"], report["imported"], report["rejected"]) == (7, 2, 5)
+    assert report["errors"] == [
+        {"row": 2, "errors": ["invalid email"]},
+        {"row": 3, "errors": ["email already exists"]},
+        {"row": 4, "errors": ["duplicate email in file"]},
+        {"row": 5, "errors": ["email or phone is required"]},
+        {"row": 7, "errors": ["Expected 3 columns, got 4"]},
+    ]
+    assert storage.find_existing_contacts(["kumar@example.com"], ["9876543211"]) == {
+        "email": {"kumar@example.com"}, "phone": {"9876543211"},
+    }
+
+
+def test_ndjson_parse_errors_keep_their_row_numbers(storage):
+    body = b'{"email": "a@example.com"}\n{broken\n\n["not", "an", "object"]\n{"phone": "9876543210"}\n'
+
+    report = run_import(body, fmt="ndjson")
+
+    assert report["imported"] == 2
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert report["errors"][0]["errors"][0].startswith("Invalid JSON")
+    assert report["errors"][1]["errors"] == ["Expected a JSON object"]
+
+
+def test_rows_skipped_by_the_insert_are_reported(storage, monkeypatch):
+    # Written after the import's duplicate check ran, as by a concurrent chat.
+    storage.upsert_lead_fields("chat-session", {"phone": "9876543210"})
+    storage.upsert_lead_fields("import-taken", {"email": "old@example.com"})
+    find_existing = SQLiteStorage.find_existing_contacts
+    calls = []
+
+    def stale_first_check(self, emails, phones):
+        calls.append(emails)
+        if len(calls) == 1:
+            return {"email": set(), "phone": set()}
+        return find_existing(self, emails, phones)
+
+    monkeypatch.setattr(SQLiteStorage, "find_existing_contacts", stale_first_check)
+    job = LeadImport()
+    job.add(1, {"name": "Asha", "email": "asha@example.com"}, None)
+    job.add(2, {"name": "Ravi", "phone": "98765 43210"}, None)
+    job.add(3, {"name": "Meera", "email": "meera@example.com", "session_id": "import-taken"}, None)
+
+    job.flush()
+
+    report = job.report()
+    assert report["imported"] == 1
+    assert report["errors"] == [
+        {"row": 2, "errors": ["phone already exists"]},
+        {"row": 3, "errors": ["session_id already exists"]},
+    ]
@@ -0,0 +1,54 @@
+from app.storage.sqlite_backend import SQLiteStorage
+
+EMAIL = "asha@example.com"
+PHONE = "9876543210"
+
+
+def test_upsert_reports_contacts_owned_by_another_lead(storage):
+    storage.upsert_lead_fields("owner", {"email": EMAIL, "phone": PHONE})
+
+    result = storage.upsert_lead_fields("other", {"name": "Asha", "email": EMAIL.upper(), "phone": PHONE})
+
+    assert result["conflicts"] == {"email": "owner", "phone": "owner"}
+    other = storage.get_lead("other")
+    assert (other["name"], other["email"], other["phone"]) == ("Asha", None, None)
+    owner = storage.get_lead("owner")
+    assert (owner["email"], owner["phone"]) == (EMAIL, PHONE)
+
+
+def test_upsert_of_own_contacts_is_not_a_conflict(storage):
+    storage.upsert_lead_fields("owner", {"email": EMAIL})
+
+    assert storage.upsert_lead_fields("owner", {"email": EMAIL, "phone": PHONE}) == {"conflicts": {}}
+    assert storage.get_lead("owner")["phone"] == PHONE
+
+
+def test_contact_taken_after_the_owner_lookup_is_reported(storage, monkeypatch):
+    storage.upsert_lead_fields("owner", {"email": EMAIL})
+    lookups = []
+    find_owners = SQLiteStorage._find_contact_owners
+
+    def stale_first_lookup(self, cursor, session_id, fields):
+        lookups.append(session_id)
+        # The first lookup runs before a concurrent writer commits.
+        return {} if len(lookups) == 1 else find_owners(self, cursor, session_id, fields)
+
+    monkeypatch.setattr(SQLiteStorage, "_find_contact_owners", stale_first_lookup)
+
+    result = storage.upsert_lead_fields("other", {"name": "Asha", "email": EMAIL})
+
+    assert len(lookups) > 1
+    assert result["conflicts"] == {"email": "owner"}
+    assert storage.get_lead("other")["name"] == "Asha"
+    assert storage.get_lead("owner")["email"] == EMAIL
+
+
+def test_save_lead_turn_keeps_state_when_a_contact_conflicts(storage):
+    storage.upsert_lead_fields("owner", {"phone": PHONE})
+    storage.load_lead_record("other")
+
+    result = storage.save_lead_turn("other", "ASKED_EMAIL", {"name": "Asha", "phone": PHONE})
+
+    assert result["conflicts"] == {"phone": "owner"}
+    assert storage.get_lead_state("other") == "ASKED_EMAIL"
+    assert storage.get_lead("other")["phone"] is None
@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import pytest
+
+from app.core.config import get_settings
+from app.integrations import google_sheets, sheets_outbox
+from app.integrations.sheets_outbox import enqueue_lead_export, flush_once
+
+LEAD = {"session_id": "s1", "name": "Asha Sharma", "email": "asha@example.com", "phone": "9876543210"}
+
+
+@pytest.fixture
+def sheet(monkeypatch, storage):
+    """Captures appended rows; set `sheet.error` to make the append fail."""
+    class FakeSheet:
+        rows = []
+        error = None
+
+    def append_rows_to_sheet(rows):
+        if FakeSheet.error:
+            raise FakeSheet.error
+        FakeSheet.rows.extend(rows)
+
+    monkeypatch.setattr(google_sheets, "append_rows_to_sheet", append_rows_to_sheet)
+    monkeypatch.setattr(sheets_outbox.random, "uniform", lambda low, high: 1.0)
+    return FakeSheet
+
+
+def outbox(storage):
+    rows = storage._fetchall("SELECT status, attempts, next_attempt_at, last_error FROM lead_export_outbox ORDER BY id")
+    return [dict(zip(("status", "attempts", "next_attempt_at", "last_error"), row)) for row in rows]
+
+
+def make_due(storage):
+    with storage.transaction() as cursor:
+        storage._execute(cursor, "UPDATE lead_export_outbox SET next_attempt_at = %s", (datetime(2000, 1, 1),))
+
+
+def test_claimed_rows_are_leased(storage):
+    enqueue_lead_export(LEAD)
+
+    first = storage.claim_lead_exports(10, lease_seconds=60)
+    assert [export["session_id"] for export in first] == ["s1"]
+    assert storage.claim_lead_exports(10, lease_seconds=60) == []
+
+    # An expired lease (exporter died mid-send) is claimed again.
+    make_due(storage)
+    assert [export["id"] for export in storage.claim_lead_exports(10, lease_seconds=60)] == [first[0]["id"]]
+
+
+def test_flush_sends_and_marks_rows(storage, sheet):
+    enqueue_lead_export(LEAD)
+
+    assert flush_once() == {"sent": 1, "failed": 0, "dead": 0}
+    assert len(sheet.rows) == 1 and "asha@example.com" in sheet.rows[0]
+    assert outbox(storage)[0]["status"] == "sent"
+    assert flush_once() == {"sent": 0, "failed": 0, "dead": 0}
+
+
+def test_failed_batch_backs_off_exponentially(storage, sheet):
+    sheet.error = RuntimeError("quota exceeded")
+    enqueue_lead_export(LEAD)
+    base = get_settings().sheets_export_backoff_seconds
+
+    assert flush_once() == {"sent": 0, "failed": 1, "dead": 0}
+    row = outbox(storage)[0]
+    assert (row["status"], row["attempts"], row["last_error"]) == ("pending", 1, "quota exceeded")
+    delay = (row["next_attempt_at"] - datetime.utcnow()).total_seconds()
+    assert base - 5 < delay <= base
+
+    # Not due yet: nothing to send.
+    assert flush_once() == {"sent": 0, "failed": 0, "dead": 0}
+
+    make_due(storage)
+    flush_once()
+    row = outbox(storage)[0]
+    assert row["attempts"] == 2
+    delay = (row["next_attempt_at"] - datetime.utcnow()).total_seconds()
+    assert 2 * base - 5 < delay <= 2 * base
+
+
+def test_rows_are_dead_lettered_after_max_attempts(storage, sheet, monkeypatch):
+    monkeypatch.setenv("SHEETS_EXPORT_MAX_ATTEMPTS", "2")
+    get_settings.cache_clear()
+    sheet.error = RuntimeError("forbidden")
+    enqueue_lead_export(LEAD)
+
+    flush_once()
+    make_due(storage)
+    assert flush_once() == {"sent": 0, "failed": 1, "dead": 1}
+    assert outbox(storage)[0]["status"] == "dead"
+
+    sheet.error = None
+    assert flush_once() == {"sent": 0, "failed": 0, "dead": 0}
+    assert sheet.rows == []
+
+
+def test_unreadable_payload_is_dead_lettered_at_once(storage, sheet):
+    storage.enqueue_lead_export("broken", "{not json")
+    enqueue_lead_export(LEAD)
+
+    assert flush_once() == {"sent": 1, "failed": 0, "dead": 1}
+    assert [row["status"] for row in outbox(storage)] == ["dead", "sent"]
@@ -0,0 +1,25 @@
+import pytest
+
+from app.utils.validators import is_valid_name
+
+
+@pytest.mark.parametrize("name", [
+    "Anne Smith-Price",
+    "Mary-Call Jones",
+    "Jean-Luc Picard",
+    "O'Contact",
+    "Asha Sharma",
+])
+def test_names_containing_disallowed_words_inside_tokens_are_valid(name):
+    assert is_valid_name(name)
+
+
+@pytest.mark.parametrize("text", [
+    "pricing",
+    "call me",
+    "Demo please",
+    "thanks.",
+    "need help",
+])
+def test_standalone_disallowed_words_are_rejected(text):
+    assert not is_valid_name(text)
@@ -0,0 +1,94 @@
+import shutil
+import subprocess
+
+import pytest
+
+from app.services import widget_assets
+from app.services.widget_assets import CHATBOT_JS_PATH, get_widget_asset, minify_js
+
+NODE = shutil.which("node")
+needs_node = pytest.mark.skipif(NODE is None, reason="node is not installed")
+
+# Each snippet prints a value; the minified copy must print the same.
+SNIPPETS = {
+    "strings": r'''
+        var a = "http://example.com // not a comment";   // trailing comment
+        var b = 'it\'s   /* not */   a comment';
+        var c = "tab\tand  double  spaces";
+        console.log(JSON.stringify([a, b, c]));
+    ''',
+    "templates": r'''
+        const name = "Asha";
+        const nested = `outer ${ `inner ${ name + "}" }` }   done`;
+        const obj = `${ JSON.stringify({ a: { b: 1 } }) }`;
+        const multi = `line one
+            line two   // kept`;
+        console.log(JSON.stringify([nested, obj, multi]));
+    ''',
+    "regex literals": r'''
+        const slash = /[/]+/g;
+        const escaped = /a\/b/;
+        const words = "a//b/c".split(slash);
+        const ok = escaped.test("a/b");
+        function f(x) { return /^\d+$/.test(x); }
+        var total = 10 / 2 / 5;   // division, not a regex
+        console.log(JSON.stringify([words, ok, f("42"), total]));
+    ''',
+    "asi": r'''
+        let x = 1
+        let y = x
+        ++y
+        const z = [1, 2]
+        /* block
+           comment */
+        console.log(JSON.stringify([x, y, z]))
+    ''',
+}
+
+
+def run_node(source: str, tmp_path, name: str) -> subprocess.CompletedProcess:
+    path = tmp_path / name
+    path.write_text(source, encoding="utf-8")
+    return subprocess.run([NODE, str(path)], capture_output=True, text=True, timeout=30)
+
+
+def test_minify_drops_comments_and_indentation():
+    minified = minify_js(SNIPPETS["strings"])
+    assert "trailing comment" not in minified
+    assert "// not a comment" in minified
+    assert "/* not */   a comment" in minified
+    assert "\n " not in minified
+
+
+@needs_node
+@pytest.mark.parametrize("name", sorted(SNIPPETS))
+def test_minified_snippet_behaves_the_same(name, tmp_path):
+    original = run_node(SNIPPETS[name], tmp_path, "original.js")
+    minified = run_node(minify_js(SNIPPETS[name]), tmp_path, "minified.js")
+    assert original.returncode == 0, original.stderr
+    assert minified.returncode == 0, minified.stderr
+    assert minified.stdout == original.stdout
+
+
+@needs_node
+def test_minified_widget_parses(tmp_path):
+    with open(CHATBOT_JS_PATH, encoding="utf-8") as handle:
+        source = handle.read()
+    path = tmp_path / "chatbot.min.js"
+    path.write_text(minify_js(source), encoding="utf-8")
+    result = subprocess.run([NODE, "--check", str(path)], capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+
+
+def test_widget_served_unminified_when_minify_fails(monkeypatch):
+    def broken(source):
+        raise IndexError("tokenizer bug")
+
+    monkeypatch.setattr(widget_assets, "minify_js", broken)
+    get_widget_asset.cache_clear()
+    try:
+        asset = get_widget_asset()
+        with open(CHATBOT_JS_PATH, encoding="utf-8") as handle:
+            assert asset.variants[None] == handle.read().encode("utf-8")
+    finally:
+        get_widget_asset.cache_clear()